@@ -0,0 +1,299 @@
+"""Offline end-to-end benchmark of the indexer and chat services.
+
+Usage:
+    python dev/e2e_benchmark [--text-files 40] [--pdf-files 10] [--requests 64] [--concurrency 8]
+                             [--output data/benchmarks/e2e-<commit>.json] [--baseline previous.json]
+
+Starts the real indexer and chat services next to a fake OpenAI server (fixed first-token and
+per-token delays) and a deterministic fake embedder, so no network, GPU or API key is needed.
+Vectors are kept by the NumPy storage backend in a temporary directory: it is file based, so the
+two services share it the way they would share Qdrant, which an in-memory Qdrant client cannot do.
+
+A synthetic corpus of text files and PDFs is indexed from scratch (files, chunks and MB per
+second), then /chat, /v1/chat/completions and its streaming variant are loaded at a fixed
+concurrency (p50/p95/p99 latency and time to first byte of content). Results are written as JSON
+together with the commit, and --baseline prints the change against an earlier result file.
+Retrieval settings (e.g. RETRIEVAL__SPECULATIVE_ENABLED) are passed through from the environment.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+from rich.console import Console
+from rich.table import Table
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+import corpus  # noqa: E402
+from start import SERVICES  # noqa: E402
+
+STARTUP_TIMEOUT = 120.0
+INDEX_TIMEOUT = 1800.0
+PORTS = {"openai": 13100, "embedder": 13103, "indexer": 13102, "chat": 13101}
+SCENARIOS = ("chat", "completions", "completions_stream")
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _env(pythonpath: list[str], workdir: Path, args: argparse.Namespace) -> dict:
+    env = os.environ.copy()
+    env.update({
+        "PYTHONPATH": os.pathsep.join(pythonpath + [env.get("PYTHONPATH", "")]),
+        "STORAGE__BACKEND": "numpy",
+        "STORAGE__PATH": str(workdir / "vectors"),
+        "EMBEDDING__PUBLIC_URL": f"http://127.0.0.1:{PORTS['embedder']}/embed",
+        "EMBEDDING__VECTOR_SIZE": str(args.vector_size),
+        "INDEXER__KNOWLEDGE_BASE_DIR": str(workdir / "knowledge_base"),
+        "INDEXER__MANIFEST_PATH": str(workdir / "index_manifest.json"),
+        "INDEXER__START_ON_STARTUP": "false",
+        "INDEXER__TEXT_FILES_ENABLED": "true",
+        "ANSWER_CACHE__ENABLED": "false",
+        "OPENAI__API_KEY": "benchmark",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{PORTS['openai']}/v1",
+        "SERVER__PUBLIC_URL": f"http://127.0.0.1:{PORTS['chat']}",
+        "SERVER__LOG_LEVEL": "WARNING",
+        "FAKE_OPENAI_FIRST_TOKEN_MS": str(args.first_token_ms),
+        "FAKE_OPENAI_TOKEN_MS": str(args.token_ms),
+        "FAKE_OPENAI_TOKENS": str(args.tokens),
+        "FAKE_OPENAI_REWRITE_MS": str(args.rewrite_ms),
+    })
+    return env
+
+
+@contextmanager
+def _service(name: str, app: str, pythonpath: list[str], workdir: Path, args: argparse.Namespace):
+    port = PORTS[name]
+    log = open(workdir / f"{name}.log", "wb")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=_env(pythonpath, workdir, args),
+        cwd=ROOT,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+    try:
+        started = time.perf_counter()
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"{name} exited with code {process.returncode}, see {workdir / f'{name}.log'}")
+            try:
+                if urllib.request.urlopen(f"http://127.0.0.1:{port}/status", timeout=1).status == 200:
+                    break
+            except (urllib.error.URLError, OSError):
+                pass
+            if time.perf_counter() - started > STARTUP_TIMEOUT:
+                raise TimeoutError(f"{name} did not become healthy in {STARTUP_TIMEOUT:.0f}s")
+            time.sleep(0.05)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        log.close()
+
+
+def _pythonpath(name: str) -> list[str]:
+    return next(service["pythonpath"] for service in SERVICES if service["name"] == name)
+
+
+async def measure_indexing(indexer_url: str, corpus_bytes: int) -> dict:
+    async with httpx.AsyncClient(base_url=indexer_url, timeout=30) as client:
+        started = time.perf_counter()
+        (await client.post("/index", params={"full": "true"})).raise_for_status()
+        while True:
+            status = (await client.get("/status")).json()
+            if status["status"] == "failed":
+                raise RuntimeError(f"Indexing failed: {(status['progress'] or {}).get('last_errors')}")
+            if status["status"] in ("done", "stopped"):
+                break
+            if time.perf_counter() - started > INDEX_TIMEOUT:
+                raise TimeoutError(f"Indexing did not finish in {INDEX_TIMEOUT:.0f}s")
+            await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    progress = status["progress"] or {}
+    return {
+        "seconds": round(elapsed, 3),
+        "files": progress.get("files_done", 0),
+        "files_failed": progress.get("files_failed", 0),
+        "chunks": progress.get("chunks_produced", 0),
+        "files_per_second": round(progress.get("files_done", 0) / elapsed, 2),
+        "chunks_per_second": round(progress.get("chunks_produced", 0) / elapsed, 1),
+        "mb_per_second": round(corpus_bytes / 1e6 / elapsed, 3),
+        "stage_seconds": progress.get("stage_seconds", {}),
+    }
+
+
+def _request(scenario: str, question: str) -> tuple[str, dict]:
+    if scenario == "chat":
+        return "/chat", {"question": question}
+    body = {"model": "rag", "messages": [{"role": "user", "content": question}]}
+    return "/v1/chat/completions", body | {"stream": scenario == "completions_stream"}
+
+
+async def measure_scenario(chat_url: str, scenario: str, questions: list[str], concurrency: int) -> dict:
+    latencies: list[float] = []
+    first_bytes: list[float] = []
+    errors = 0
+    pending = list(reversed(questions))
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        while pending:
+            path, body = _request(scenario, pending.pop())
+            started = time.perf_counter()
+            first = None
+            try:
+                async with client.stream("POST", path, json=body) as response:
+                    response.raise_for_status()
+                    # For streams this is the first SSE content event; otherwise the first body bytes.
+                    async for line in response.aiter_lines():
+                        if first is None and (scenario != "completions_stream" or line.startswith("data: {")):
+                            first = time.perf_counter() - started
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            first_bytes.append(first if first is not None else latencies[-1])
+
+    started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=chat_url, timeout=120) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": round(len(latencies) / elapsed, 2),
+        **{f"p{int(q * 100)}": round(percentile(latencies, q), 4) for q in (0.5, 0.95, 0.99)},
+        **{f"ttft_p{int(q * 100)}": round(percentile(first_bytes, q), 4) for q in (0.5, 0.95, 0.99)},
+    }
+
+
+def _change(current: float, baseline: float | None) -> str:
+    if not baseline:
+        return ""
+    return f" ({(current - baseline) / baseline:+.0%})"
+
+
+def report(console: Console, results: dict, baseline: dict | None) -> None:
+    indexing, previous = results["indexing"], (baseline or {}).get("indexing", {})
+    table = Table(title=f"Indexing ({indexing['files']} files, {indexing['chunks']} chunks)")
+    for column in ("Seconds", "Files/s", "Chunks/s", "MB/s", "Failed"):
+        table.add_column(column, justify="right")
+    table.add_row(
+        f"{indexing['seconds']:.2f}{_change(indexing['seconds'], previous.get('seconds'))}",
+        f"{indexing['files_per_second']:.1f}{_change(indexing['files_per_second'], previous.get('files_per_second'))}",
+        f"{indexing['chunks_per_second']:.0f}{_change(indexing['chunks_per_second'], previous.get('chunks_per_second'))}",
+        f"{indexing['mb_per_second']:.2f}{_change(indexing['mb_per_second'], previous.get('mb_per_second'))}",
+        str(indexing["files_failed"]),
+    )
+    console.print(table)
+
+    columns = ("throughput", "p50", "p95", "p99", "ttft_p50", "ttft_p95", "ttft_p99")
+    table = Table(title=f"Chat (concurrency {results['params']['concurrency']}, seconds)")
+    table.add_column("Scenario")
+    for column in columns + ("errors",):
+        table.add_column(column, justify="right")
+    for scenario, stats in results["scenarios"].items():
+        previous = (baseline or {}).get("scenarios", {}).get(scenario, {})
+        cells = [f"{stats[column]:.3f}{_change(stats[column], previous.get(column))}" for column in columns]
+        table.add_row(scenario, *cells, str(stats["errors"]))
+    console.print(table)
+    if baseline:
+        console.print(f"Compared with {baseline.get('commit', '?')} from {baseline.get('timestamp', '?')}")
+
+
+async def run_load(chat_url: str, args: argparse.Namespace) -> dict:
+    questions = corpus.questions(args.requests)
+    # Warm up imports, connections and the OpenAI client before measuring.
+    await measure_scenario(chat_url, "completions", questions[: args.concurrency], args.concurrency)
+    return {
+        scenario: await measure_scenario(chat_url, scenario, questions, args.concurrency)
+        for scenario in SCENARIOS
+        if scenario in args.scenario
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--text-files", type=int, default=40)
+    parser.add_argument("--pdf-files", type=int, default=10)
+    parser.add_argument("--paragraphs", type=int, default=20, help="paragraphs per document")
+    parser.add_argument("--vector-size", type=int, default=256)
+    parser.add_argument("--requests", type=int, default=64, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--scenario", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--first-token-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=10.0)
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument("--rewrite-ms", type=float, default=200.0)
+    parser.add_argument("--workdir", type=Path, help="keep the corpus, vectors and service logs here (must be empty)")
+    parser.add_argument("--output", type=Path, help="result file (default data/benchmarks/e2e-<commit>.json)")
+    parser.add_argument("--baseline", type=Path, help="earlier result file to compare with")
+    args = parser.parse_args()
+    # Vectors, manifest or extra files left by an earlier run would skew the indexing numbers.
+    if args.workdir and args.workdir.exists() and any(args.workdir.iterdir()):
+        parser.error(f"--workdir {args.workdir} is not empty")
+
+    console = Console()
+    commit = _git_commit()
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+
+    with ExitStack() as stack:
+        workdir = args.workdir or Path(stack.enter_context(tempfile.TemporaryDirectory(prefix="e2e-benchmark-")))
+        workdir.mkdir(parents=True, exist_ok=True)
+        corpus_bytes = corpus.generate(workdir / "knowledge_base", args.text_files, args.pdf_files, args.paragraphs)
+        console.print(f"Corpus: {args.text_files} text files, {args.pdf_files} PDFs, {corpus_bytes / 1e6:.1f} MB")
+
+        stand_in_path = [HERE, os.path.join(ROOT, "packages")]
+        stack.enter_context(_service("openai", "fake_openai:app", stand_in_path, workdir, args))
+        stack.enter_context(_service("embedder", "fake_embedder:app", stand_in_path, workdir, args))
+        indexer_url = stack.enter_context(_service("indexer", "main:app", _pythonpath("indexer"), workdir, args))
+        chat_url = stack.enter_context(_service("chat", "main:app", _pythonpath("chat"), workdir, args))
+
+        indexing = asyncio.run(measure_indexing(indexer_url, corpus_bytes))
+        scenarios = asyncio.run(run_load(chat_url, args))
+
+    results = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "params": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        "retrieval": {key: value for key, value in os.environ.items() if key.startswith("RETRIEVAL__")},
+        "indexing": indexing,
+        "scenarios": scenarios,
+    }
+    output = args.output or Path(ROOT) / "data" / "benchmarks" / f"e2e-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+
+    report(console, results, baseline)
+    console.print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Deterministic synthetic knowledge base: plain text files and multi-page PDFs.
+
+Every document is about one topic, so benchmark questions can be generated that the fake
+embedder (which hashes tokens) will match to the right chunks.
+"""
+
+import random
+from pathlib import Path
+
+TOPICS = [
+    "vector databases", "chunk overlap", "query rewriting", "hybrid retrieval", "answer caching",
+    "embedding models", "reranking", "context packing", "index quantization", "streaming responses",
+    "audio transcription", "document parsing", "latency budgets", "batch inference", "evaluation metrics",
+]
+
+_WORDS = (
+    "system data model query index vector search result latency throughput memory cache request "
+    "response token chunk document source page score rank batch worker queue storage cluster node "
+    "replica shard segment filter payload metric budget prompt answer context retrieval pipeline"
+).split()
+
+
+def _sentence(rng: random.Random, topic: str) -> str:
+    words = rng.sample(_WORDS, rng.randint(8, 16))
+    words.insert(rng.randrange(len(words)), topic)
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraphs(rng: random.Random, topic: str, count: int) -> list[str]:
+    return [" ".join(_sentence(rng, topic) for _ in range(rng.randint(3, 6))) for _ in range(count)]
+
+
+def _pdf_text(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: Path, pages: list[list[str]]) -> None:
+    """Write a minimal PDF with one Helvetica text block per page that pypdf can extract."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for lines in pages:
+        stream = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({_pdf_text(line)}) '" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        page_ids.append(len(objects) + 1)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>"
+
+    body = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    body += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(body)
+
+
+def _wrap(paragraph: str, width: int = 90) -> list[str]:
+    lines, line = [], ""
+    for word in paragraph.split():
+        if line and len(line) + len(word) + 1 > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}".strip()
+    return lines + [line] if line else lines
+
+
+def generate(directory: Path, text_files: int, pdf_files: int, paragraphs: int = 20, pdf_pages: int = 4,
+             seed: int = 0) -> int:
+    """Fill `directory` with the corpus and return its size in bytes."""
+    rng = random.Random(seed)
+    directory.mkdir(parents=True, exist_ok=True)
+    for i in range(text_files):
+        topic = TOPICS[i % len(TOPICS)]
+        text = f"# {topic.title()}\n\n" + "\n\n".join(_paragraphs(rng, topic, paragraphs))
+        (directory / f"doc_{i:04d}.txt").write_text(text, encoding="utf-8")
+    for i in range(pdf_files):
+        topic = TOPICS[(i + text_files) % len(TOPICS)]
+        per_page = max(1, paragraphs // pdf_pages)
+        pages = [
+            [line for paragraph in _paragraphs(rng, topic, per_page) for line in _wrap(paragraph)][:60]
+            for _ in range(pdf_pages)
+        ]
+        write_pdf(directory / f"report_{i:04d}.pdf", pages)
+    return sum(path.stat().st_size for path in directory.iterdir())
+
+
+def questions(count: int, seed: int = 1) -> list[str]:
+    rng = random.Random(seed)
+    return [f"How does {TOPICS[i % len(TOPICS)]} affect {rng.choice(_WORDS)} {rng.choice(_WORDS)}?" for i in range(count)]
@@ -0,0 +1,60 @@
+"""Deterministic embedder stand-in with the same /embed, /rerank and /status API as the real one.
+
+Vectors hash each token into one of `embedding.vector_size` signed dimensions and are
+normalized, so texts sharing words are close and results do not change between runs. Rerank
+scores are the share of query tokens found in the passage. No model is loaded.
+"""
+
+import zlib
+
+import numpy as np
+from fastapi import FastAPI, Header
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from shared import embedding_codec
+from shared.config import config
+from shared.lexical import tokenize
+
+app = FastAPI(title="Fake embedder")
+
+
+class EmbedRequest(BaseModel):
+    inputs: list[str]
+
+
+class RerankRequest(BaseModel):
+    query: str
+    passages: list[str]
+
+
+def _embed(texts: list[str]) -> np.ndarray:
+    size = config.embedding.vector_size
+    vectors = np.zeros((len(texts), size), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for token in tokenize(text):
+            digest = zlib.crc32(token.encode())
+            vectors[row, digest % size] += 1.0 if digest & 0x80000000 else -1.0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+@app.post("/embed")
+def embed(request: EmbedRequest, accept: str | None = Header(default=None)):
+    embeddings = _embed(request.inputs)
+    media_type = embedding_codec.negotiate(accept)
+    if media_type == embedding_codec.JSON_MEDIA_TYPE:
+        return {"embeddings": embeddings.tolist()}
+    return Response(content=embedding_codec.encode(embeddings, media_type), media_type=media_type)
+
+
+@app.post("/rerank")
+def rerank(request: RerankRequest) -> dict:
+    query = set(tokenize(request.query))
+    scores = [len(query & set(tokenize(passage))) / max(len(query), 1) for passage in request.passages]
+    return {"scores": scores}
+
+
+@app.get("/status")
+def status() -> dict:
+    return {"status": "ok"}
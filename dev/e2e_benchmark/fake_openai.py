@@ -0,0 +1,87 @@
+"""OpenAI-compatible /v1/chat/completions stand-in with configurable latency.
+
+Query rewrite requests (recognised by their system prompt) are answered with the last user
+message, so retrieval sees the question itself; every other request gets a canned answer of
+FAKE_OPENAI_TOKENS tokens. Streaming sends the first token after FAKE_OPENAI_FIRST_TOKEN_MS and
+each following one after FAKE_OPENAI_TOKEN_MS; a non-streaming answer takes the same total time.
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+FIRST_TOKEN_MS = float(os.environ.get("FAKE_OPENAI_FIRST_TOKEN_MS", "300"))
+TOKEN_MS = float(os.environ.get("FAKE_OPENAI_TOKEN_MS", "10"))
+TOKENS = int(os.environ.get("FAKE_OPENAI_TOKENS", "100"))
+REWRITE_MS = float(os.environ.get("FAKE_OPENAI_REWRITE_MS", "200"))
+
+app = FastAPI(title="Fake OpenAI")
+
+
+def _is_rewrite(messages: list[dict]) -> bool:
+    return bool(messages) and messages[0]["role"] == "system" and "search quer" in messages[0]["content"]
+
+
+def _rewrite(messages: list[dict]) -> str:
+    lines = [line for line in messages[-1]["content"].splitlines() if line.strip()]
+    last = lines[-1] if lines else ""
+    return last.split(":", 1)[1].strip() if last.startswith(("user:", "assistant:")) else last.strip()
+
+
+def _tokens() -> list[str]:
+    return [f"word{i % 50} " for i in range(TOKENS)]
+
+
+def _completion(model: str, content: str) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": TOKENS, "total_tokens": TOKENS},
+    }
+
+
+def _chunk(completion_id: str, model: str, delta: dict, finish_reason: str | None = None) -> str:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+async def _stream(model: str):
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+    for i, token in enumerate(_tokens()):
+        await asyncio.sleep((FIRST_TOKEN_MS if i == 0 else TOKEN_MS) / 1000)
+        yield _chunk(completion_id, model, {"content": token})
+    yield _chunk(completion_id, model, {}, "stop")
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model, messages = body.get("model", "fake"), body.get("messages", [])
+    if _is_rewrite(messages):
+        await asyncio.sleep(REWRITE_MS / 1000)
+        return _completion(model, _rewrite(messages))
+    if body.get("stream"):
+        return StreamingResponse(_stream(model), media_type="text/event-stream")
+    await asyncio.sleep((FIRST_TOKEN_MS + TOKEN_MS * (TOKENS - 1)) / 1000)
+    return _completion(model, "".join(_tokens()))
+
+
+@app.get("/status")
+def status() -> dict:
+    return {"status": "ok"}
@@ -0,0 +1,97 @@
+"""Throughput and agreement of the embedder's model backends on CPU.
+
+Usage:
+    python dev/embedding_backend_benchmark.py [--model sentence-transformers/all-MiniLM-L6-v2]
+        [--backends sentence_transformers torch_int8 onnx] [--texts 512] [--batch-size 32] [--threads 4]
+
+Each backend loads the same (small, local) model and embeds the same synthetic texts in
+batches of `--batch-size`, as the service's batcher would. Reported are the load time, texts
+per second after a warm-up batch, and the cosine similarity of each vector to the one computed
+by the first backend listed: a mean well below 0.99 means the backend would change retrieval
+results. Quantized and ONNX vectors are cached separately by the service, so switching is safe.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "packages"))
+sys.path.insert(0, os.path.join(ROOT, "packages", "embedder", "src"))
+
+from backends import BACKENDS, create_backend  # noqa: E402
+
+WORDS = (
+    "vector database query index chunk overlap retrieval latency throughput embedding model batch "
+    "token context answer source page score rank cache memory storage cluster replica prompt"
+).split()
+
+
+def make_texts(count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    # Mixed lengths, from short queries to chunk-sized passages.
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.choice((8, 32, 96)))) for _ in range(count)]
+
+
+def embed_all(backend, texts: list[str], batch_size: int) -> np.ndarray:
+    batches = [backend.embed_documents(texts[i : i + batch_size]) for i in range(0, len(texts), batch_size)]
+    return np.concatenate([np.asarray(batch, dtype=np.float32) for batch in batches])
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return np.sum(a * b, axis=1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKENDS),
+                        default=["sentence_transformers", "torch_int8", "onnx"])
+    parser.add_argument("--texts", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0, help="0 keeps the runtime default")
+    args = parser.parse_args()
+
+    console = Console()
+    texts = make_texts(args.texts)
+    reference: np.ndarray | None = None
+
+    table = Table(title=f"{args.model}: {args.texts} texts, batch {args.batch_size}")
+    for column in ("Backend", "Load", "Texts/s", "Cosine mean", "Cosine min"):
+        table.add_column(column, justify="right")
+
+    for name in args.backends:
+        started = time.perf_counter()
+        backend = create_backend(name, args.model, args.threads)
+        load_seconds = time.perf_counter() - started
+
+        backend.embed_documents(texts[: args.batch_size])
+        started = time.perf_counter()
+        vectors = embed_all(backend, texts, args.batch_size)
+        elapsed = time.perf_counter() - started
+
+        if reference is None:
+            reference = vectors
+        agreement = cosine(vectors, reference)
+        table.add_row(
+            name,
+            f"{load_seconds:.1f}s",
+            f"{len(texts) / elapsed:.0f}",
+            f"{agreement.mean():.4f}",
+            f"{agreement.min():.4f}",
+        )
+        del backend
+
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
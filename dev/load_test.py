@@ -0,0 +1,111 @@
+"""Concurrent load test for the chat service.
+
+Usage:
+    python dev/load_test.py [--url http://localhost:3001] [--concurrency 1 2 4 8 16] [--requests 32]
+
+For each concurrency level the script keeps that many requests in flight against
+/v1/chat/completions (non-streaming) until `--requests` have completed, then reports throughput
+and latency percentiles. With a non-blocking retrieval path throughput should grow with
+concurrency until OpenAI, the embedder or Qdrant saturate.
+
+With --stream the time to first token (first SSE content event) is reported as well. Run it once
+with RETRIEVAL__SPECULATIVE_ENABLED=false and once with true to compare the retrieval modes; the
+chat service also keeps per-mode TTFT histograms under /status.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from rich.console import Console
+from rich.table import Table
+
+QUESTIONS = [
+    "What are the production Do's for RAG?",
+    "How does chunk overlap affect retrieval quality?",
+    "What is a vector database used for?",
+    "Which evaluation metrics are useful for RAG systems?",
+]
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+async def run_level(client: httpx.AsyncClient, url: str, concurrency: int, total: int, stream: bool) -> dict:
+    latencies: list[float] = []
+    first_tokens: list[float] = []
+    errors = 0
+    next_request = 0
+
+    async def worker() -> None:
+        nonlocal next_request, errors
+        while next_request < total:
+            question = QUESTIONS[next_request % len(QUESTIONS)]
+            next_request += 1
+            body = {"model": "rag", "messages": [{"role": "user", "content": question}], "stream": stream}
+            started = time.perf_counter()
+            try:
+                async with client.stream("POST", f"{url}/v1/chat/completions", json=body) as response:
+                    response.raise_for_status()
+                    first_token = None
+                    async for line in response.aiter_lines():
+                        if first_token is None and line.startswith("data: {"):
+                            first_token = time.perf_counter() - started
+                if first_token is not None:
+                    first_tokens.append(first_token)
+                latencies.append(time.perf_counter() - started)
+            except httpx.HTTPError:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "throughput": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p95": percentile(latencies, 0.95) if latencies else 0.0,
+        "ttft_p50": statistics.median(first_tokens) if first_tokens else 0.0,
+        "ttft_p95": percentile(first_tokens, 0.95) if first_tokens else 0.0,
+        "errors": errors,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:3001")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--stream", action="store_true", help="use stream=true requests")
+    args = parser.parse_args()
+
+    table = Table(title=f"Load test: {args.url}/v1/chat/completions")
+    columns = ["Concurrency", "Throughput (req/s)", "p50 (s)", "p95 (s)"]
+    if args.stream:
+        columns += ["TTFT p50 (s)", "TTFT p95 (s)"]
+    for column in columns + ["Errors"]:
+        table.add_column(column, justify="right")
+
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    async with httpx.AsyncClient(timeout=120.0, limits=limits) as client:
+        for concurrency in args.concurrency:
+            result = await run_level(client, args.url, concurrency, args.requests, args.stream)
+            row = [
+                str(result["concurrency"]),
+                f"{result['throughput']:.2f}",
+                f"{result['p50']:.2f}",
+                f"{result['p95']:.2f}",
+            ]
+            if args.stream:
+                row += [f"{result['ttft_p50']:.2f}", f"{result['ttft_p95']:.2f}"]
+            table.add_row(*row, str(result["errors"]))
+
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
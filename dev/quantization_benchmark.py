@@ -0,0 +1,172 @@
+"""Recall, memory and latency of quantized Qdrant collections against float32.
+
+Usage:
+    python dev/quantization_benchmark.py [--host localhost] [--port 6333] [--points 20000] [--queries 200]
+                                         [--k 10] [--oversampling 1 2 4] [--from-collection]
+
+Vectors are either synthetic (clustered, unit-normalized) or, with --from-collection, copied from
+the configured collection. They are loaded into temporary collections (float32, scalar int8 and
+binary quantization) on a running Qdrant; local mode ignores quantization, so a server is needed.
+Recall@k is measured against exact NumPy top-k; memory is the estimated RAM held by the vectors
+Qdrant keeps resident (originals go to disk when quantized).
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    CollectionStatus,
+    Distance,
+    PointStruct,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams,
+)
+from rich.console import Console
+from rich.table import Table
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "packages"))
+
+from shared.config import config  # noqa: E402
+
+COLLECTION_PREFIX = "bench_quantization"
+UPLOAD_BATCH = 512
+
+QUANTIZATION_MODES = {
+    "float32": None,
+    "scalar": ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)),
+    "binary": BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True)),
+}
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def synthetic_vectors(count: int, dim: int, clusters: int = 64) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    members = centers[rng.integers(0, clusters, size=count)]
+    return normalize(members + 0.6 * rng.standard_normal((count, dim)).astype(np.float32))
+
+
+def collection_vectors(client: QdrantClient, limit: int) -> np.ndarray:
+    vectors, offset = [], None
+    while len(vectors) < limit:
+        points, offset = client.scroll(
+            collection_name=config.qdrant.collection, limit=min(1024, limit - len(vectors)),
+            offset=offset, with_vectors=True, with_payload=False,
+        )
+        for point in points:
+            vector = point.vector.get("", point.vector) if isinstance(point.vector, dict) else point.vector
+            vectors.append(vector)
+        if offset is None:
+            break
+    return normalize(np.asarray(vectors, dtype=np.float32))
+
+
+def resident_bytes(mode: str, count: int, dim: int) -> int:
+    if mode == "scalar":
+        return count * dim
+    if mode == "binary":
+        return count * ((dim + 7) // 8)
+    return count * dim * 4
+
+
+def load_collection(client: QdrantClient, name: str, vectors: np.ndarray, mode: str) -> None:
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(
+        collection_name=name,
+        vectors_config=VectorParams(size=vectors.shape[1], distance=Distance.COSINE, on_disk=mode != "float32"),
+        quantization_config=QUANTIZATION_MODES[mode],
+    )
+    for start in range(0, len(vectors), UPLOAD_BATCH):
+        batch = vectors[start:start + UPLOAD_BATCH]
+        client.upsert(
+            collection_name=name,
+            points=[PointStruct(id=start + i, vector=v.tolist()) for i, v in enumerate(batch)],
+        )
+    while client.get_collection(name).status != CollectionStatus.GREEN:
+        time.sleep(0.5)
+
+
+def measure(client: QdrantClient, name: str, queries: np.ndarray, truth: np.ndarray, k: int,
+            params: SearchParams | None) -> dict:
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        result = client.query_points(collection_name=name, query=query.tolist(), limit=k, search_params=params)
+        latencies.append(time.perf_counter() - started)
+        hits += len({p.id for p in result.points} & set(expected.tolist()))
+    ordered = sorted(latencies)
+    return {
+        "recall": hits / (len(queries) * k),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": ordered[min(int(0.95 * len(ordered)), len(ordered) - 1)] * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=config.qdrant.host)
+    parser.add_argument("--port", type=int, default=config.qdrant.port)
+    parser.add_argument("--points", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=config.embedding.vector_size)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=config.qdrant.search_k)
+    parser.add_argument("--oversampling", type=float, nargs="+", default=[1.0, 2.0, 4.0])
+    parser.add_argument("--from-collection", action="store_true", help="use vectors from the configured collection")
+    args = parser.parse_args()
+
+    client = QdrantClient(host=args.host, port=args.port)
+    vectors = collection_vectors(client, args.points) if args.from_collection else synthetic_vectors(args.points, args.dim)
+    rng = np.random.default_rng(1)
+    queries = normalize(vectors[rng.choice(len(vectors), size=args.queries)] + 0.05 * rng.standard_normal(
+        (args.queries, vectors.shape[1])).astype(np.float32))
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.k]
+
+    table = Table(title=f"Quantization: {len(vectors)} x {vectors.shape[1]} vectors, recall@{args.k}")
+    for column in ("Mode", "Oversampling", "Rescore", f"Recall@{args.k}", "p50 (ms)", "p95 (ms)", "Vector RAM (MB)"):
+        table.add_column(column, justify="right")
+
+    for mode in QUANTIZATION_MODES:
+        name = f"{COLLECTION_PREFIX}_{mode}"
+        load_collection(client, name, vectors, mode)
+        memory = resident_bytes(mode, len(vectors), vectors.shape[1]) / 2**20
+        if mode == "float32":
+            settings = [(None, None)]
+        else:
+            settings = [(oversampling, rescore) for oversampling in args.oversampling for rescore in (False, True)]
+        for oversampling, rescore in settings:
+            params = None
+            if oversampling is not None:
+                params = SearchParams(quantization=QuantizationSearchParams(rescore=rescore, oversampling=oversampling))
+            result = measure(client, name, queries, truth, args.k, params)
+            table.add_row(
+                mode,
+                "-" if oversampling is None else f"{oversampling:g}",
+                "-" if rescore is None else str(rescore),
+                f"{result['recall']:.3f}",
+                f"{result['p50_ms']:.1f}",
+                f"{result['p95_ms']:.1f}",
+                f"{memory:.1f}",
+            )
+        client.delete_collection(name)
+
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Prompt tokens saved by cross-encoder reranking against the time it adds.
+
+Usage:
+    python dev/rerank_benchmark.py [--questions questions.txt] [--candidates 30] [--top-n 5]
+
+For each question the script retrieves `--candidates` chunks from the configured storage (the
+embedder and the storage must be running), then packs two contexts: the plain top `search_k`
+hits, as sent without reranking, and the `--top-n` hits after calling the embedder's /rerank.
+It reports the estimated prompt tokens of both and the reranking latency.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from rich.console import Console
+from rich.table import Table
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "packages"))
+sys.path.insert(0, os.path.join(ROOT, "packages", "chat", "src"))
+
+from context_packer import estimate_tokens, pack_context  # noqa: E402
+from shared.config import config  # noqa: E402
+from shared.services.embedder import embedder  # noqa: E402
+from shared.services.knowledge_storage import KnowledgeStorage  # noqa: E402
+
+QUESTIONS = [
+    "What are the production Do's for RAG?",
+    "How does chunk overlap affect retrieval quality?",
+    "What is a vector database used for?",
+    "Which evaluation metrics are useful for RAG systems?",
+]
+# Large enough that packing only merges chunks and never drops any.
+UNLIMITED_BUDGET = 10**9
+
+
+def context_tokens(points) -> int:
+    blocks = pack_context(points, lambda source: f"[Source: {source}]", token_budget=UNLIMITED_BUDGET)
+    return estimate_tokens("\n\n".join(blocks))
+
+
+async def measure(storage: KnowledgeStorage, question: str, candidates: int, top_n: int) -> dict:
+    hits = await storage.afetch_payloads(await storage.asearch(await embedder.aembed_query(question), candidates))
+    started = time.perf_counter()
+    scores = await embedder.arerank(question, [h.payload["text"] for h in hits])
+    rerank_seconds = time.perf_counter() - started
+    reranked = [h for _, h in sorted(zip(scores.tolist(), hits), key=lambda item: item[0], reverse=True)[:top_n]]
+    return {
+        "baseline_tokens": context_tokens(hits[:config.qdrant.search_k]),
+        "rerank_tokens": context_tokens(reranked),
+        "rerank_ms": rerank_seconds * 1000,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", help="file with one question per line")
+    parser.add_argument("--candidates", type=int, default=config.rerank.candidates)
+    parser.add_argument("--top-n", type=int, default=config.rerank.top_n)
+    args = parser.parse_args()
+
+    questions = QUESTIONS
+    if args.questions:
+        with open(args.questions) as f:
+            questions = [line.strip() for line in f if line.strip()]
+
+    storage = KnowledgeStorage()
+    results = [await measure(storage, q, args.candidates, args.top_n) for q in questions]
+
+    table = Table(title=f"Reranking {args.candidates} candidates to {args.top_n} (baseline: top {config.qdrant.search_k})")
+    for column in ("Question", "Baseline tokens", "Reranked tokens", "Saved", "Rerank (ms)"):
+        table.add_column(column, justify="right")
+    for question, result in zip(questions, results):
+        table.add_row(
+            question[:50],
+            str(result["baseline_tokens"]),
+            str(result["rerank_tokens"]),
+            str(result["baseline_tokens"] - result["rerank_tokens"]),
+            f"{result['rerank_ms']:.0f}",
+        )
+    baseline = statistics.mean(r["baseline_tokens"] for r in results)
+    reranked = statistics.mean(r["rerank_tokens"] for r in results)
+    table.add_section()
+    table.add_row(
+        "mean",
+        f"{baseline:.0f}",
+        f"{reranked:.0f}",
+        f"{baseline - reranked:.0f}",
+        f"{statistics.mean(r['rerank_ms'] for r in results):.0f}",
+    )
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+"""Measure import time and time-to-healthy for each Python service.
+
+Usage:
+    python dev/startup_benchmark.py [--runs 3] [--top 10] [--service chat ...]
+
+Each service is imported in a fresh interpreter with `-X importtime` (reporting the slowest
+imported packages), then started with uvicorn and polled until its /status endpoint answers 200;
+the embedder answers 503 until its model is loaded, so its time includes loading the model.
+External dependencies (Qdrant, the embedder for the indexer) should be running for the startup
+numbers to be meaningful; the import numbers do not need them.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from rich.console import Console
+from rich.table import Table
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from start import SERVICES  # noqa: E402
+
+STARTUP_TIMEOUT = 300.0
+
+
+def _env(service: dict) -> dict:
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.pathsep.join(service["pythonpath"] + [env.get("PYTHONPATH", "")])
+    return env
+
+
+def measure_import(service: dict) -> tuple[float, dict[str, int]]:
+    module = service["app"].split(":")[0]
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=_env(service),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed = float(result.stdout.strip().splitlines()[-1])
+
+    # Lines look like "import time:  self [us] |  cumulative | <indent>name". The largest cumulative
+    # time seen for any module of a root package approximates what importing that package costs.
+    packages: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue
+        root = name.strip().split(".")[0]
+        if root != module:
+            packages[root] = max(packages.get(root, 0), int(cumulative))
+    return elapsed, packages
+
+
+def measure_startup(service: dict) -> float:
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", service["app"], "--port", str(service["port"]), "--log-level", "warning"],
+        env=_env(service),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < STARTUP_TIMEOUT:
+            if process.poll() is not None:
+                raise RuntimeError(f"{service['name']} exited with code {process.returncode}")
+            try:
+                if urllib.request.urlopen(service["health_url"], timeout=1).status == 200:
+                    return time.perf_counter() - started
+            except (urllib.error.URLError, OSError):
+                pass
+            time.sleep(0.05)
+        raise TimeoutError(f"{service['name']} did not become healthy in {STARTUP_TIMEOUT:.0f}s")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="slowest packages to list per service")
+    parser.add_argument("--service", action="append", choices=[s["name"] for s in SERVICES])
+    args = parser.parse_args()
+
+    console = Console()
+    summary = Table(title="Service startup")
+    for column in ("Service", "Import (median)", "Healthy after (median)"):
+        summary.add_column(column)
+
+    for service in SERVICES:
+        if args.service and service["name"] not in args.service:
+            continue
+
+        import_times, startup_times = [], []
+        packages: dict[str, int] = {}
+        for _ in range(args.runs):
+            elapsed, packages = measure_import(service)
+            import_times.append(elapsed)
+            startup_times.append(measure_startup(service))
+
+        summary.add_row(
+            service["name"],
+            f"{statistics.median(import_times):.2f}s",
+            f"{statistics.median(startup_times):.2f}s",
+        )
+
+        imports = Table(title=f"{service['name']}: slowest imported packages")
+        imports.add_column("Package")
+        imports.add_column("Cumulative", justify="right")
+        for name, cumulative in sorted(packages.items(), key=lambda item: item[1], reverse=True)[: args.top]:
+            imports.add_row(name, f"{cumulative / 1000:.1f}ms")
+        console.print(imports)
+
+    console.print(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from context import context
+from shared.config import config
+from shared.services.embedder import embedder
+
+
+@dataclass
+class AnswerCacheStats:
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+
+    def as_dict(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+@dataclass
+class CacheLookup:
+    """What `find` saw: the question vector (None when caching is disabled), passed back to `store`."""
+
+    vector: np.ndarray | None = None
+    instructions_key: str = ""
+    generation: int | None = None
+
+
+class SemanticAnswerCache:
+    """Answers looked up by cosine similarity between question embeddings.
+
+    Entries belong to one index generation. The generation stored by the indexer is re-read at
+    most every `generation_check_seconds`; when it changes every entry is dropped, so answers
+    never outlive the content they were produced from. Answers given under different system
+    instructions are kept apart, since the same question can be answered differently.
+    """
+
+    def __init__(self) -> None:
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._settings = config.answer_cache
+        self._vectors = np.empty((0, config.embedding.vector_size), dtype=np.float32)
+        self._answers: list[str] = []
+        self._created: list[float] = []
+        self._instructions: list[str] = []
+        self._generation: int | None = None
+        self._generation_checked = 0.0
+        self.stats = AnswerCacheStats()
+
+    def __len__(self) -> int:
+        return len(self._answers)
+
+    def clear(self) -> None:
+        self._vectors = self._vectors[:0]
+        self._answers = []
+        self._created = []
+        self._instructions = []
+
+    async def _check_generation(self) -> None:
+        now = time.monotonic()
+        if now - self._generation_checked < self._settings.generation_check_seconds:
+            return
+        self._generation_checked = now
+        generation = await context.storage.aget_generation()
+        if generation != self._generation:
+            if self._answers:
+                self.logger.info("Index generation %s -> %s, dropping %d cached answers",
+                                 self._generation, generation, len(self._answers))
+                self.stats.invalidations += 1
+            self.clear()
+            self._generation = generation
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @staticmethod
+    def _instructions_key(instructions: str) -> str:
+        return hashlib.sha256(instructions.encode()).hexdigest() if instructions else ""
+
+    async def find(self, question: str, instructions: str = "") -> tuple[CacheLookup, str | None]:
+        """Return what `store` needs for the answer and a cached answer, if any.
+
+        `instructions` is the system prompt the question is answered under.
+        """
+        if not self._settings.enabled:
+            return CacheLookup(), None
+        vector = self._normalize(await embedder.aembed_query(question))
+        instructions_key = self._instructions_key(instructions)
+        answer = await self.lookup(vector, instructions_key)
+        return CacheLookup(vector, instructions_key, self._generation), answer
+
+    async def lookup(self, vector: np.ndarray, instructions_key: str = "") -> str | None:
+        await self._check_generation()
+        if not self._answers:
+            self.stats.misses += 1
+            return None
+
+        scores = self._vectors @ vector
+        scores[np.asarray(self._instructions) != instructions_key] = -np.inf
+        best = int(np.argmax(scores))
+        fresh = time.monotonic() - self._created[best] <= self._settings.ttl_seconds
+        if scores[best] >= self._settings.similarity_threshold and fresh:
+            self.stats.hits += 1
+            self.logger.debug("Answer cache hit (similarity %.3f)", scores[best])
+            return self._answers[best]
+        self.stats.misses += 1
+        return None
+
+    def store(self, lookup: CacheLookup, answer: str) -> None:
+        if lookup.vector is None or not answer:
+            return
+        if lookup.generation != self._generation:
+            # The index changed while the answer was generated; it may be built on removed content.
+            return
+        if len(self._answers) >= self._settings.max_entries:
+            # Oldest entries go first; they are also the first to expire.
+            drop = len(self._answers) - self._settings.max_entries + 1
+            self._vectors = self._vectors[drop:]
+            self._answers = self._answers[drop:]
+            self._created = self._created[drop:]
+            self._instructions = self._instructions[drop:]
+        self._vectors = np.vstack([self._vectors, lookup.vector[np.newaxis, :]])
+        self._answers.append(answer)
+        self._created.append(time.monotonic())
+        self._instructions.append(lookup.instructions_key)
+
+
+answer_cache = SemanticAnswerCache()
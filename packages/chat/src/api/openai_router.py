@@ -6,8 +6,10 @@ from fastapi import APIRouter
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+from answer_cache import CacheLookup, answer_cache
 from context import context
 from shared.config import config
+from shared import metrics
 from shared.services.embedder import embedder
 from shared.services.file_manager import file_manager
 from llm import llm
@@ -15,6 +17,13 @@ from llm import llm
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Request start to first streamed token, per retrieval mode, so both modes can be compared.
+TTFT = metrics.histogram("chat_time_to_first_token_seconds", "Request start to first streamed token", ("mode",))
+
+
+def _retrieval_mode() -> str:
+    return "speculative" if config.retrieval.speculative_enabled else "sequential"
+
 
 class Message(BaseModel):
     role: str
@@ -42,25 +51,19 @@ def list_models():
     }
 
 
-@router.post("/v1/chat/completions")
-async def chat_completions(request: OpenAIChatRequest):
-    last_message = request.messages[-1].content if request.messages else ""
-    context_chunks = context.get_chunks(last_message)
-    messages = [m.model_dump() for m in request.messages]
+def _is_single_question(messages: list[Message]) -> bool:
+    """Only stand-alone questions are cached; follow-ups depend on the conversation before them."""
+    turns = [m for m in messages if m.role != "system"]
+    return len(turns) == 1 and turns[0].role == "user"
 
-    if request.stream:
-        return StreamingResponse(
-            llm.stream(messages, context_chunks),
-            media_type="text/event-stream",
-        )
 
-    answer = llm.chat_messages(messages, context_chunks)
+def _completion_response(model: str, answer: str) -> dict:
     completion_id = f"chatcmpl-{uuid.uuid4().hex}"
     return {
         "id": completion_id,
         "object": "chat.completion",
         "created": int(time.time()),
-        "model": request.model,
+        "model": model,
         "choices": [
             {
                 "index": 0,
@@ -69,3 +72,36 @@ async def chat_completions(request: OpenAIChatRequest):
             }
         ],
     }
+
+
+@router.post("/v1/chat/completions")
+async def chat_completions(request: OpenAIChatRequest):
+    started = time.perf_counter()
+    last_message = request.messages[-1].content if request.messages else ""
+    cache_lookup, cached_answer = CacheLookup(), None
+    if _is_single_question(request.messages):
+        instructions = "\n".join(m.content for m in request.messages if m.role == "system")
+        cache_lookup, cached_answer = await answer_cache.find(last_message, instructions)
+
+    if cached_answer is not None:
+        if request.stream:
+            return StreamingResponse(llm.replay(cached_answer), media_type="text/event-stream")
+        return _completion_response(request.model, cached_answer)
+
+    messages = [m.model_dump() for m in request.messages]
+    context_chunks = await context.get_conversation_chunks(messages, cache_lookup.vector)
+
+    if request.stream:
+        return StreamingResponse(
+            llm.stream(
+                messages,
+                context_chunks,
+                on_complete=lambda answer: answer_cache.store(cache_lookup, answer),
+                on_first_token=lambda: TTFT.labels(_retrieval_mode()).observe(time.perf_counter() - started),
+            ),
+            media_type="text/event-stream",
+        )
+
+    answer = await llm.chat_messages(messages, context_chunks)
+    answer_cache.store(cache_lookup, answer)
+    return _completion_response(request.model, answer)
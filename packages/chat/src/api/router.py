@@ -3,10 +3,13 @@ import logging
 from fastapi import APIRouter
 from pydantic import BaseModel
 
+from answer_cache import answer_cache
+from api.openai_router import TTFT
 from context import context
 from shared.services.embedder import embedder
 from shared.services.file_manager import file_manager
 from llm import llm
+from query_rewriter import query_rewriter
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -21,16 +24,27 @@ class ChatResponse(BaseModel):
 
 
 @router.post("/chat")
-def chat(request: ChatRequest) -> ChatResponse:
+async def chat(request: ChatRequest) -> ChatResponse:
     question = request.question
     logger.debug("Question: %s", question)
 
-    context_chunks = context.get_chunks(question)
-    answer = llm.chat(question, context_chunks)
+    cache_lookup, cached_answer = await answer_cache.find(question)
+    if cached_answer is not None:
+        return ChatResponse(answer=cached_answer)
+
+    context_chunks = await context.get_chunks(question, cache_lookup.vector)
+    answer = await llm.chat(question, context_chunks)
     logger.debug("Answer length: %d chars", len(answer))
+    answer_cache.store(cache_lookup, answer)
     return ChatResponse(answer=answer)
 
 
 @router.get("/status")
 def status():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "rewrite": query_rewriter.stats.as_dict(),
+        "answer_cache": answer_cache.stats.as_dict(),
+        "speculation": context.speculation.as_dict(),
+        "ttft": {mode: TTFT.labels(mode).as_dict() for mode in ("sequential", "speculative")},
+    }
@@ -1,4 +1,16 @@
-from llm import llm
+import asyncio
+import time
+from dataclasses import dataclass
+
+import httpx
+import numpy as np
+from qdrant_client.models import ScoredPoint
+
+from context_packer import pack_context
+from fusion import reciprocal_rank_fusion
+from query_rewriter import query_rewriter
+from shared import lexical, metrics
+from shared.config import config
 from shared.services.file_manager import file_manager
 from shared.services.knowledge_storage import KnowledgeStorage
 from shared.services.embedder import embedder
@@ -7,24 +19,182 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+STAGE_SECONDS = metrics.histogram("chat_retrieval_stage_seconds", "Time per retrieval stage", ("stage",))
+
+
+def _format_source(source: str) -> str:
+    return f"[Source: [{source}]({file_manager.get_public_url(source)})]"
+
+
+def _discard(task: asyncio.Task) -> None:
+    task.cancel()
+    # Retrieve a failure that happened before the cancel so it is not reported as unhandled.
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+def _similarity(message: str, query: str) -> float:
+    a, b = set(lexical.tokenize(message)), set(lexical.tokenize(query))
+    return len(a & b) / len(a | b) if a | b else 0.0
+
+
+@dataclass
+class SpeculationStats:
+    accepted: int = 0
+    researched: int = 0
+    cancelled: int = 0
+
+    def as_dict(self) -> dict:
+        total = self.accepted + self.researched
+        return {
+            "accepted": self.accepted,
+            "researched": self.researched,
+            "cancelled": self.cancelled,
+            "accept_rate": round(self.accepted / total, 3) if total else 0.0,
+        }
 
 
 class Context:
     def __init__(self):
-        self.storage = KnowledgeStorage()
+        self._storage: KnowledgeStorage | None = None
+        self.speculation = SpeculationStats()
+        # (generation, has lexical index) of the live collection, and when it was last checked.
+        self._lexical: tuple[int, bool] | None = None
+        self._lexical_checked = 0.0
+
+    @property
+    def storage(self) -> KnowledgeStorage:
+        # Connected on first query so the service starts without waiting on Qdrant.
+        if self._storage is None:
+            self._storage = KnowledgeStorage()
+        return self._storage
+
+    async def get_chunks(self, question: str, question_vector: np.ndarray | None = None) -> list[str]:
+        return await self.get_conversation_chunks([{"role": "user", "content": question}], question_vector)
 
-    def get_chunks(self, question: str) -> list[str]:
-        search_query = llm.extract_search_query(question)
-        if not search_query:
+    async def get_conversation_chunks(
+        self, messages: list[dict], question_vector: np.ndarray | None = None
+    ) -> list[str]:
+        """Context for the last user message, retrieved with one or more rewritten queries.
+
+        `question_vector` is the embedding of the last message if the caller already has it (the
+        answer cache does); a query that is the message unchanged is then not embedded again.
+        """
+        rerank = config.rerank.enabled
+        limit = config.rerank.candidates if rerank else config.qdrant.search_k
+        known = {messages[-1]["content"].strip(): question_vector} if question_vector is not None else {}
+        if config.retrieval.speculative_enabled and messages:
+            queries, results = await self._speculative_search(messages, limit, known)
+        else:
+            with STAGE_SECONDS.time("rewrite"):
+                queries = await query_rewriter.rewrite_conversation(messages)
+            results = await self._search(queries, limit, known) if queries else []
+        if not queries:
             return []
 
-        vector = embedder.embed_query(search_query)
-        results = self.storage.search(vector)
-        logger.debug("Found %d chunks: %s", len(results), [r.payload["source"] for r in results])
-        return [
-            f"[Source: [{r.payload['source']}]({file_manager.get_public_url(r.payload['source'])})]\n{r.payload['text']}"
-            for r in results
-        ]
+        with STAGE_SECONDS.time("fetch_payloads"):
+            results = await self.storage.afetch_payloads(results)
+        if rerank:
+            with STAGE_SECONDS.time("rerank"):
+                results = await self._rerank(queries, results)
+        logger.debug("Found %d chunks for %s: %s", len(results), queries, [r.payload["source"] for r in results])
+        with STAGE_SECONDS.time("pack"):
+            return pack_context(results, _format_source)
+
+    async def _speculative_search(
+        self, messages: list[dict], limit: int, known: dict[str, np.ndarray]
+    ) -> tuple[list[str], list[ScoredPoint]]:
+        """Search the raw message while the rewrite runs, then keep or replace those results.
+
+        A SKIP rewrite cancels the speculative search; a rewrite that differs from the message
+        (and finished within `speculative_accept_after_ms`) is searched again.
+        """
+        settings = config.retrieval
+        message = messages[-1]["content"]
+        started = time.perf_counter()
+        speculative = asyncio.create_task(self._search([message], limit, known))
+        try:
+            with STAGE_SECONDS.time("rewrite"):
+                queries = await query_rewriter.rewrite_conversation(messages)
+        except BaseException:
+            _discard(speculative)
+            raise
+        rewrite_ms = (time.perf_counter() - started) * 1000
+
+        if not queries:
+            _discard(speculative)
+            self.speculation.cancelled += 1
+            return queries, []
+
+        close = len(queries) == 1 and _similarity(message, queries[0]) >= settings.speculative_similarity
+        late = 0 < settings.speculative_accept_after_ms <= rewrite_ms
+        if close or late:
+            self.speculation.accepted += 1
+            return queries, await speculative
+
+        _discard(speculative)
+        self.speculation.researched += 1
+        logger.debug("Speculative results rejected for %s (rewrite took %.0f ms)", queries, rewrite_ms)
+        return queries, await self._search(queries, limit, known)
+
+    async def _rerank(self, queries: list[str], results: list[ScoredPoint]) -> list[ScoredPoint]:
+        """Keep the `top_n` candidates by cross-encoder score; on failure keep the retrieval order.
+
+        Candidates were fused from every sub-query, so each is scored against all of them and
+        keeps its best score.
+        """
+        top_n = config.rerank.top_n
+        passages = [r.payload["text"] for r in results]
+        try:
+            per_query = await asyncio.gather(*(embedder.arerank(query, passages) for query in queries))
+        except httpx.HTTPError as e:
+            logger.warning("Reranking failed (%s), using retrieval order", e)
+            return results[:top_n]
+        scores = [max(candidate) for candidate in zip(*(s.tolist() for s in per_query))]
+        ranked = sorted(zip(scores, results), key=lambda item: item[0], reverse=True)[:top_n]
+        return [r.model_copy(update={"score": score}) for score, r in ranked]
+
+    async def _has_lexical_index(self) -> bool:
+        """Whether the live collection can be searched lexically, re-checked when the generation changes.
+
+        A collection built before hybrid retrieval was enabled has no lexical index until the
+        indexer has rebuilt it; until then queries are dense only.
+        """
+        now = time.monotonic()
+        if self._lexical is not None and now - self._lexical_checked < config.answer_cache.generation_check_seconds:
+            return self._lexical[1]
+        self._lexical_checked = now
+        generation = await self.storage.aget_generation()
+        if self._lexical is None or self._lexical[0] != generation:
+            available = await asyncio.to_thread(self.storage.has_lexical_index)
+            if not available:
+                logger.warning("Collection has no lexical index yet, searching dense vectors only")
+            self._lexical = (generation, available)
+        return self._lexical[1]
+
+    async def _search(
+        self, queries: list[str], limit: int, known: dict[str, np.ndarray] | None = None
+    ) -> list[ScoredPoint]:
+        """Embed all queries in one call, search them in one batch and merge every list by weighted RRF.
+
+        Queries found in `known` (stripped text -> vector) are not embedded again.
+        """
+        settings = config.retrieval
+        known = known or {}
+        missing = [query for query in queries if query.strip() not in known]
+        with STAGE_SECONDS.time("embed_queries"):
+            embedded = dict(zip(missing, await embedder.aembed_texts(missing)))
+        vectors = np.stack([embedded[q] if q in embedded else known[q.strip()] for q in queries])
+        hybrid = settings.hybrid_enabled and await self._has_lexical_index()
+        with STAGE_SECONDS.time("search"):
+            dense, lexical_results = await self.storage.asearch_batch(vectors, queries if hybrid else None, limit)
+        if len(dense) == 1 and not lexical_results:
+            return dense[0]
+        return reciprocal_rank_fusion(
+            dense + lexical_results,
+            weights=[settings.dense_weight] * len(dense) + [settings.lexical_weight] * len(lexical_results),
+            k=settings.rrf_k,
+            limit=limit,
+        )
 
 
-context = Context()
\ No newline at end of file
+context = Context()
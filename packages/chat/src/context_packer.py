@@ -0,0 +1,87 @@
+import math
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from qdrant_client.models import ScoredPoint
+
+from shared.config import config
+
+# Overlapping text shorter than this is not trusted as overlap; the chunks are joined as they are.
+MIN_OVERLAP_CHARS = 8
+GAP_SEPARATOR = "\n[...]\n"
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / config.context.chars_per_token)
+
+
+def overlap_length(previous: str, following: str) -> int:
+    """Length of the longest suffix of `previous` that starts `following` (the splitter's overlap)."""
+    # The splitter overlaps whole pieces, so the shared text may be a little longer than `overlap`.
+    longest = min(len(previous), len(following), config.chunking.overlap * 2)
+    for length in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(following[:length]):
+            return length
+    return 0
+
+
+@dataclass
+class _SourceHits:
+    best_score: float
+    chunks: dict[int, str] = field(default_factory=dict)
+
+    def merged_runs(self) -> list[str]:
+        """Chunk texts joined into runs of consecutive indexes, overlap removed."""
+        runs: list[str] = []
+        previous_index = None
+        for index in sorted(self.chunks):
+            text = self.chunks[index]
+            if previous_index is not None and index == previous_index + 1:
+                shared = overlap_length(runs[-1], text)
+                runs[-1] += text[shared:] if shared else "\n" + text
+            else:
+                runs.append(text)
+            previous_index = index
+        return runs
+
+
+def pack_context(
+    points: list[ScoredPoint],
+    format_source: Callable[[str], str],
+    token_budget: int | None = None,
+) -> list[str]:
+    """Turn ranked hits into one context block per source within a token budget.
+
+    Hits are taken in score order while they fit the budget; a hit next to one already taken
+    only pays for the text that is not overlap. Blocks are ordered by their best hit, cite the
+    source once (`format_source` renders the header) and merge consecutive chunks.
+    """
+    budget = config.context.token_budget if token_budget is None else token_budget
+    sources: dict[str, _SourceHits] = {}
+    used = 0
+    for point in sorted(points, key=lambda p: p.score, reverse=True):
+        source, index, text = point.payload["source"], point.payload["index"], point.payload["text"]
+        hits = sources.get(source)
+        if hits is not None and index in hits.chunks:
+            continue
+
+        shared = 0
+        if hits is not None:
+            if index - 1 in hits.chunks:
+                shared += overlap_length(hits.chunks[index - 1], text)
+            if index + 1 in hits.chunks:
+                shared += overlap_length(text, hits.chunks[index + 1])
+        header = estimate_tokens(format_source(source)) if hits is None else 0
+        cost = header + estimate_tokens(text[:len(text) - shared] if shared < len(text) else "")
+        if used + cost > budget:
+            continue
+
+        used += cost
+        if hits is None:
+            hits = sources[source] = _SourceHits(best_score=point.score)
+        hits.chunks[index] = text
+
+    return [
+        f"{format_source(source)}\n{GAP_SEPARATOR.join(hits.merged_runs())}"
+        for source, hits in sorted(sources.items(), key=lambda item: item[1].best_score, reverse=True)
+    ]
@@ -0,0 +1,22 @@
+from qdrant_client.models import ScoredPoint
+
+
+def reciprocal_rank_fusion(
+    result_lists: list[list[ScoredPoint]],
+    weights: list[float],
+    k: int,
+    limit: int,
+) -> list[ScoredPoint]:
+    """Merge ranked lists by weighted reciprocal rank: score = sum(weight / (k + rank)).
+
+    Points found by several lists are returned once, carrying their fused score.
+    """
+    scores: dict[int | str, float] = {}
+    points: dict[int | str, ScoredPoint] = {}
+    for results, weight in zip(result_lists, weights):
+        for rank, point in enumerate(results, start=1):
+            scores[point.id] = scores.get(point.id, 0.0) + weight / (k + rank)
+            points.setdefault(point.id, point)
+
+    ranked = sorted(scores, key=scores.get, reverse=True)[:limit]
+    return [points[point_id].model_copy(update={"score": scores[point_id]}) for point_id in ranked]
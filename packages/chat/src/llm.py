@@ -1,37 +1,72 @@
 import json
 import logging
+import re
 import time
 import uuid
-from collections.abc import AsyncIterator
-
-from openai import AsyncOpenAI, OpenAI
+from collections.abc import AsyncIterator, Callable
+from functools import cached_property
+from typing import TYPE_CHECKING
 
+from shared import metrics
 from shared.config import config
 import prompts
 
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
 MODEL_NAME = config.openai.chat_model
 
+LLM_SECONDS = metrics.histogram("llm_request_seconds", "OpenAI call duration until the full answer", ("operation",))
+LLM_TTFT = metrics.histogram("llm_time_to_first_token_seconds", "OpenAI streaming call start to first content token")
+LLM_IN_FLIGHT = metrics.gauge("llm_requests_in_flight", "OpenAI calls in progress", ("operation",))
+
+# "- ", "* ", "• ", "1. " or "2) " in front of a query; digits that are part of the query stay.
+LIST_MARKER = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+
 
 def _build_system_message(context_chunks: list[str]) -> str:
     context = "\n\n".join(context_chunks) if context_chunks else ""
     return prompts.system(context=context)
 
 
+def _parse_queries(content: str, max_queries: int) -> list[str]:
+    """One query per line of the model's answer, without list markers; SKIP lines are dropped."""
+    lines = [LIST_MARKER.sub("", line).strip() for line in content.splitlines()]
+    return [line for line in lines if line and line != "SKIP"][:max_queries]
+
+
+def _sse_chunk(completion_id: str, created: int, content: str) -> str:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": MODEL_NAME,
+        "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}],
+    }
+    return f"data: {json.dumps(payload)}\n\n"
+
+
 class LLM:
     def __init__(self) -> None:
         self.logger = logging.getLogger(self.__class__.__name__)
-        self._client = OpenAI(api_key=config.openai.api_key)
-        self._async_client = AsyncOpenAI(api_key=config.openai.api_key)
 
-    def extract_search_query(self, question: str) -> str | None:
+    # The openai package is imported on first use; it is a large part of the service's import time.
+    @cached_property
+    def _async_client(self) -> "AsyncOpenAI":
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(api_key=config.openai.api_key)
+
+    async def extract_search_query(self, question: str) -> str | None:
         """Rewrite a user question into a search-optimized query. Returns None if no search needed."""
-        response = self._client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[
-                {"role": "system", "content": prompts.extract_search_query()},
-                {"role": "user", "content": question},
-            ],
-        )
+        with LLM_IN_FLIGHT.track("rewrite"), LLM_SECONDS.time("rewrite"):
+            response = await self._async_client.chat.completions.create(
+                model=MODEL_NAME,
+                messages=[
+                    {"role": "system", "content": prompts.extract_search_query()},
+                    {"role": "user", "content": question},
+                ],
+            )
         rewritten = response.choices[0].message.content.strip()
         if rewritten == "SKIP":
             self.logger.debug("Query skipped (no search needed): '%s'", question)
@@ -39,46 +74,80 @@ class LLM:
         self.logger.debug("Rewrote query: '%s' -> '%s'", question, rewritten)
         return rewritten
 
-    def chat(self, question: str, context_chunks: list[str]) -> str:
+    async def extract_search_queries(self, messages: list[dict], max_queries: int) -> list[str]:
+        """Stand-alone search queries for the last message of a conversation. Empty if no search needed."""
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        with LLM_IN_FLIGHT.track("rewrite"), LLM_SECONDS.time("rewrite"):
+            response = await self._async_client.chat.completions.create(
+                model=MODEL_NAME,
+                messages=[
+                    {"role": "system", "content": prompts.extract_search_queries(max_queries)},
+                    {"role": "user", "content": transcript},
+                ],
+            )
+        queries = _parse_queries(response.choices[0].message.content, max_queries)
+        self.logger.debug("Conversation queries: %s", queries)
+        return queries
+
+    async def chat(self, question: str, context_chunks: list[str]) -> str:
         """Single-turn chat used by the /chat endpoint."""
-        return self.chat_messages([{"role": "user", "content": question}], context_chunks)
+        return await self.chat_messages([{"role": "user", "content": question}], context_chunks)
 
-    def chat_messages(self, messages: list[dict], context_chunks: list[str]) -> str:
+    async def chat_messages(self, messages: list[dict], context_chunks: list[str]) -> str:
         """Multi-turn chat used by /v1/chat/completions (non-streaming)."""
         full_messages = [{"role": "system", "content": _build_system_message(context_chunks)}] + messages
         self.logger.debug("Calling %s with %d messages", MODEL_NAME, len(full_messages))
-        response = self._client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=full_messages,
-        )
+        with LLM_IN_FLIGHT.track("chat"), LLM_SECONDS.time("chat"):
+            response = await self._async_client.chat.completions.create(
+                model=MODEL_NAME,
+                messages=full_messages,
+            )
         return response.choices[0].message.content
 
-    async def stream(self, messages: list[dict], context_chunks: list[str]) -> AsyncIterator[str]:
-        """Multi-turn streaming chat used by /v1/chat/completions (stream=True)."""
+    async def stream(
+        self,
+        messages: list[dict],
+        context_chunks: list[str],
+        on_complete: Callable[[str], None] | None = None,
+        on_first_token: Callable[[], None] | None = None,
+    ) -> AsyncIterator[str]:
+        """Multi-turn streaming chat used by /v1/chat/completions (stream=True).
+
+        `on_first_token` is called when the first content arrives; `on_complete` receives the full
+        answer once the stream has finished.
+        """
         full_messages = [{"role": "system", "content": _build_system_message(context_chunks)}] + messages
         self.logger.debug("Streaming %s with %d messages", MODEL_NAME, len(full_messages))
         completion_id = f"chatcmpl-{uuid.uuid4().hex}"
         created = int(time.time())
+        parts: list[str] = []
 
-        response = await self._async_client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=full_messages,
-            stream=True,
-        )
-        async for chunk in response:
-            if chunk.choices and chunk.choices[0].delta.content:
-                payload = {
-                    "id": completion_id,
-                    "object": "chat.completion.chunk",
-                    "created": created,
-                    "model": MODEL_NAME,
-                    "choices": [
-                        {"index": 0, "delta": {"content": chunk.choices[0].delta.content}, "finish_reason": None}
-                    ],
-                }
-                yield f"data: {json.dumps(payload)}\n\n"
+        with LLM_IN_FLIGHT.track("stream"), LLM_SECONDS.time("stream"):
+            started = time.perf_counter()
+            response = await self._async_client.chat.completions.create(
+                model=MODEL_NAME,
+                messages=full_messages,
+                stream=True,
+            )
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if not parts:
+                        LLM_TTFT.labels().observe(time.perf_counter() - started)
+                        if on_first_token is not None:
+                            on_first_token()
+                    parts.append(chunk.choices[0].delta.content)
+                    yield _sse_chunk(completion_id, created, chunk.choices[0].delta.content)
 
         yield "data: [DONE]\n\n"
+        if on_complete is not None:
+            on_complete("".join(parts))
 
+    async def replay(self, answer: str, piece_size: int = 64) -> AsyncIterator[str]:
+        """Stream a ready answer (e.g. from the answer cache) in the same SSE format as `stream`."""
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        for start in range(0, len(answer), piece_size):
+            yield _sse_chunk(completion_id, created, answer[start : start + piece_size])
+        yield "data: [DONE]\n\n"
 
 llm = LLM()
@@ -9,6 +9,7 @@ from fastapi.staticfiles import StaticFiles
 from rich.logging import RichHandler
 
 from shared.config import config
+from shared.tracing import instrument
 
 
 logging.basicConfig(
@@ -25,6 +26,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+instrument(app)
 app.include_router(router)
 app.include_router(openai_router)
 app.mount("/files", StaticFiles(directory=file_manager.knowledge_base_dir), name="files")
@@ -20,6 +20,17 @@ def system(context: str = "") -> str:
     return prompt
 
 
+def extract_search_queries(max_queries: int) -> str:
+    return (
+        "Your task is to extract search queries from the conversation below to find relevant information in a vector database.\n"
+        "Focus on the information need of the last user message; use the earlier messages only to resolve what it refers to.\n"
+        f"Write between 1 and {max_queries} stand-alone, search-optimized questions, one per line, most important first. "
+        "Use several only when the message asks about several distinct things.\n"
+        "Return ONLY the queries, nothing else.\n"
+        "Return SKIP only if the last message is purely conversational with no information need."
+    )
+
+
 def extract_search_query() -> str:
     return (
         "Your task is to extract a search query from the user's message to find relevant information in a vector database.\n"
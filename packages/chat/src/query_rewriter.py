@@ -0,0 +1,167 @@
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from llm import llm
+from shared.config import config
+
+CHITCHAT = {
+    "hi", "hello", "hey", "hiya", "yo", "good morning", "good afternoon", "good evening",
+    "thanks", "thank you", "thx", "ty", "thanks a lot", "thank you very much", "cheers",
+    "ok", "okay", "k", "cool", "great", "nice", "awesome", "perfect", "got it", "sounds good",
+    "bye", "goodbye", "see you", "see ya", "good night", "how are you", "who are you",
+}
+QUESTION_START = re.compile(
+    r"^(what|which|who|whom|whose|when|where|why|how|is|are|was|were|do|does|did|can|could|"
+    r"should|would|will|list|explain|describe|compare|define)\b"
+)
+# Words that only make sense with conversation history; such messages still need the LLM.
+CONTEXT_REFERENCES = re.compile(r"\b(it|this|that|these|those|they|them|he|she|above|previous|second|first|last)\b")
+
+
+def normalize(message: str) -> str:
+    return " ".join(message.lower().split())
+
+
+@dataclass
+class RewriteStats:
+    cache_hits: int = 0
+    heuristic_skips: int = 0
+    heuristic_passthroughs: int = 0
+    llm_calls: int = 0
+    llm_seconds: float = 0.0
+
+    @property
+    def avg_llm_seconds(self) -> float:
+        return self.llm_seconds / self.llm_calls if self.llm_calls else 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        avoided = self.cache_hits + self.heuristic_skips + self.heuristic_passthroughs
+        total = avoided + self.llm_calls
+        return avoided / total if total else 0.0
+
+    @property
+    def seconds_saved(self) -> float:
+        """Estimated by pricing each avoided call at the mean observed LLM rewrite latency."""
+        return (self.cache_hits + self.heuristic_skips + self.heuristic_passthroughs) * self.avg_llm_seconds
+
+    def as_dict(self) -> dict:
+        return {
+            "cache_hits": self.cache_hits,
+            "heuristic_skips": self.heuristic_skips,
+            "heuristic_passthroughs": self.heuristic_passthroughs,
+            "llm_calls": self.llm_calls,
+            "hit_rate": round(self.hit_rate, 3),
+            "avg_llm_seconds": round(self.avg_llm_seconds, 3),
+            "seconds_saved": round(self.seconds_saved, 1),
+        }
+
+
+class QueryRewriter:
+    """Front of `LLM.extract_search_query`: a TTL/LRU cache plus heuristics that avoid the round trip.
+
+    Obvious small talk is answered with SKIP and short, self-contained questions are used as
+    they are; everything else goes to the LLM and the result (including SKIP) is cached.
+    """
+
+    def __init__(self) -> None:
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._settings = config.rewrite
+        self._cache: OrderedDict[str, tuple[float, str | tuple[str, ...] | None]] = OrderedDict()
+        self.stats = RewriteStats()
+
+    def _heuristic(self, key: str, message: str) -> tuple[bool, str | None]:
+        """Return (decided, query). `decided` is False when the LLM is needed."""
+        if not self._settings.heuristics_enabled:
+            return False, None
+
+        bare = key.strip(" !.?,")
+        if bare in CHITCHAT:
+            self.stats.heuristic_skips += 1
+            return True, None
+
+        words = key.split()
+        if (
+            key.endswith("?")
+            and key.count("?") == 1
+            and "\n" not in message.strip()
+            and self._settings.min_passthrough_words <= len(words) <= self._settings.max_passthrough_words
+            and QUESTION_START.match(key)
+            and not CONTEXT_REFERENCES.search(key)
+        ):
+            self.stats.heuristic_passthroughs += 1
+            return True, message.strip()
+        return False, None
+
+    def _cache_get(self, key: str) -> tuple[bool, str | tuple[str, ...] | None]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return False, None
+        stored_at, query = entry
+        if time.monotonic() - stored_at > self._settings.cache_ttl_seconds:
+            del self._cache[key]
+            return False, None
+        self._cache.move_to_end(key)
+        return True, query
+
+    def _cache_put(self, key: str, query: str | tuple[str, ...] | None) -> None:
+        self._cache[key] = (time.monotonic(), query)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._settings.cache_size:
+            self._cache.popitem(last=False)
+
+    async def rewrite(self, message: str) -> str | None:
+        """Search query for a message, or None when no search is needed."""
+        key = normalize(message)
+        if not key:
+            return None
+
+        found, query = self._cache_get(key)
+        if found:
+            self.stats.cache_hits += 1
+            return query
+
+        decided, query = self._heuristic(key, message)
+        if decided:
+            self.logger.debug("Rewrite fast path: '%s' -> %r", message, query)
+            return query
+
+        started = time.perf_counter()
+        query = await llm.extract_search_query(message)
+        self.stats.llm_calls += 1
+        self.stats.llm_seconds += time.perf_counter() - started
+        self._cache_put(key, query)
+        return query
+
+    async def rewrite_conversation(self, messages: list[dict]) -> list[str]:
+        """Search queries for the last user message; earlier turns are used to resolve references.
+
+        A single question goes through `rewrite`; follow-ups are sent to the LLM together with the
+        last `history_messages` messages and may produce several sub-queries.
+        """
+        turns = [m for m in messages if m["role"] != "system"]
+        if not turns:
+            return []
+        if len(turns) == 1:
+            query = await self.rewrite(turns[-1]["content"])
+            return [query] if query else []
+
+        history = turns[-config.retrieval.history_messages:]
+        key = "\n".join(f"{m['role']}:{normalize(m['content'])}" for m in history)
+        found, queries = self._cache_get(key)
+        if found:
+            self.stats.cache_hits += 1
+            return list(queries)
+
+        started = time.perf_counter()
+        queries = await llm.extract_search_queries(history, config.retrieval.max_sub_queries)
+        self.stats.llm_calls += 1
+        self.stats.llm_seconds += time.perf_counter() - started
+        self._cache_put(key, tuple(queries))
+        return queries
+
+
+query_rewriter = QueryRewriter()
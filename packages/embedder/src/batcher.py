@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from shared import metrics
+
+Vector = list[float]
+
+FORWARD_SECONDS = metrics.histogram("embedder_forward_pass_seconds", "Model forward pass duration", ("batcher",))
+QUEUED_ITEMS = metrics.gauge("embedder_queued_items", "Texts or pairs waiting for a forward pass", ("batcher",))
+
+
+@dataclass
+class _Pending:
+    texts: list[str]
+    future: asyncio.Future
+
+
+@dataclass
+class BatcherStats:
+    batches: int = 0
+    texts: int = 0
+    last_batch_size: int = 0
+    max_batch_size: int = 0
+
+    @property
+    def avg_batch_size(self) -> float:
+        return self.texts / self.batches if self.batches else 0.0
+
+
+class DynamicBatcher:
+    """Coalesces texts from concurrent requests into shared forward passes.
+
+    A background task waits for the first request, then keeps collecting for up to `max_wait_ms`
+    or until `max_texts` texts are queued. The collected texts are sorted by length and split into
+    forward passes of `forward_batch_size`, so each pass pads to similar lengths, and every caller
+    receives only its own vectors in its original order.
+
+    Items need not be strings: `sort_key` gives the length used for ordering (the reranker
+    batches (query, passage) pairs the same way).
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[list[str]], list[Vector]],
+        max_texts: int,
+        max_wait_ms: float,
+        forward_batch_size: int,
+        sort_key: Callable = len,
+        name: str = "embed",
+    ) -> None:
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._embed_fn = embed_fn
+        self._max_texts = max_texts
+        self._max_wait = max_wait_ms / 1000
+        self._forward_batch_size = forward_batch_size
+        self._sort_key = sort_key
+        self._name = name
+        self._queue: asyncio.Queue[_Pending] = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+        self._queued_texts = 0
+        self.stats = BatcherStats()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued_texts
+
+    async def embed(self, texts: list[str]) -> list[Vector]:
+        if not texts:
+            return []
+        future = asyncio.get_running_loop().create_future()
+        self._queued_texts += len(texts)
+        QUEUED_ITEMS.labels(self._name).set(self._queued_texts)
+        await self._queue.put(_Pending(texts=texts, future=future))
+        return await future
+
+    async def _collect(self) -> list[_Pending]:
+        first = await self._queue.get()
+        pending = [first]
+        size = len(first.texts)
+        deadline = time.monotonic() + self._max_wait
+        while size < self._max_texts:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            pending.append(item)
+            size += len(item.texts)
+        return pending
+
+    async def _loop(self) -> None:
+        while True:
+            pending = await self._collect()
+            texts = [text for item in pending for text in item.texts]
+            self._queued_texts -= len(texts)
+            QUEUED_ITEMS.labels(self._name).set(self._queued_texts)
+            try:
+                vectors = await asyncio.to_thread(self._embed_sorted, texts)
+            except Exception as e:
+                self.logger.exception("Batched embedding of %d texts failed", len(texts))
+                for item in pending:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                continue
+
+            offset = 0
+            for item in pending:
+                if not item.future.done():
+                    item.future.set_result(vectors[offset : offset + len(item.texts)])
+                offset += len(item.texts)
+            self._record(len(texts))
+
+    def _embed_sorted(self, texts: list[str]) -> list[Vector]:
+        order = sorted(range(len(texts)), key=lambda i: self._sort_key(texts[i]))
+        vectors: list[Vector | None] = [None] * len(texts)
+        for start in range(0, len(order), self._forward_batch_size):
+            bucket = order[start : start + self._forward_batch_size]
+            with FORWARD_SECONDS.time(self._name):
+                computed = self._embed_fn([texts[i] for i in bucket])
+            for i, vector in zip(bucket, computed):
+                vectors[i] = vector
+        return vectors
+
+    def _record(self, batch_size: int) -> None:
+        self.stats.batches += 1
+        self.stats.texts += batch_size
+        self.stats.last_batch_size = batch_size
+        self.stats.max_batch_size = max(self.stats.max_batch_size, batch_size)
+        self.logger.debug("Embedded batch of %d texts (queue depth %d)", batch_size, self.queue_depth)
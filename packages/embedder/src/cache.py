@@ -0,0 +1,109 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+SQLITE_LOOKUP_BATCH = 500
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+@dataclass
+class CacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / total if total else 0.0
+
+
+class EmbeddingCache:
+    """Two-level embedding cache: an in-memory LRU in front of a SQLite table.
+
+    Keys are the SHA-256 of the model name and whitespace-normalized text, so switching models
+    never returns stale vectors. Vectors are stored as float32 bytes.
+    """
+
+    def __init__(self, path: Path, model_name: str, max_memory_items: int) -> None:
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._model_name = model_name
+        self._max_memory_items = max_memory_items
+        self._memory: OrderedDict[bytes, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)")
+        self._db.commit()
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self._model_name}\0{normalize(text)}".encode()).digest()
+
+    def _remember(self, key: bytes, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, texts: list[str]) -> list[np.ndarray | None]:
+        keys = [self._key(t) for t in texts]
+        results: list[np.ndarray | None] = [None] * len(texts)
+        disk_lookup: dict[bytes, list[int]] = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = vector
+                    self.stats.memory_hits += 1
+                else:
+                    disk_lookup.setdefault(key, []).append(i)
+
+            lookup_keys = list(disk_lookup)
+            for start in range(0, len(lookup_keys), SQLITE_LOOKUP_BATCH):
+                batch = lookup_keys[start : start + SQLITE_LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    self._remember(key, vector)
+                    for i in disk_lookup[key]:
+                        results[i] = vector
+                        self.stats.disk_hits += 1
+
+            self.stats.misses += sum(1 for r in results if r is None)
+        return results
+
+    def put_many(self, texts: list[str], vectors) -> None:
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                vector = np.asarray(vector, dtype=np.float32)
+                key = self._key(text)
+                self._remember(key, vector)
+                rows.append((key, vector.tobytes()))
+            self._db.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+            self._db.commit()
+
+    @property
+    def memory_size(self) -> int:
+        return len(self._memory)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -1,29 +1,114 @@
+import asyncio
 import logging
+import time
 from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
 
-from fastapi import FastAPI
-from langchain_huggingface import HuggingFaceEmbeddings
+from fastapi import FastAPI, Header, Response
 from pydantic import BaseModel, Field
-from shared.config import config
+from backends import BACKENDS, EmbeddingBackend, create_backend
+from batcher import DynamicBatcher
+from cache import EmbeddingCache
+from shared import embedding_codec, metrics
+from shared.config import config, resolve_path
+from shared.tracing import instrument
+
+if TYPE_CHECKING:
+    from sentence_transformers import CrossEncoder
 
 logging.basicConfig(level="INFO")
 
 MODEL_NAME = config.embedding.model_name
 
 logger = logging.getLogger("embedder")
-model: HuggingFaceEmbeddings | None = None
+
+STAGE_SECONDS = metrics.histogram("embedder_stage_seconds", "Time per /embed and /rerank stage", ("stage",))
+model: EmbeddingBackend | None = None
+model_task: asyncio.Task | None = None
+batcher: DynamicBatcher | None = None
+cache: EmbeddingCache | None = None
+reranker: "CrossEncoder | None" = None
+reranker_task: asyncio.Task | None = None
+rerank_batcher: DynamicBatcher | None = None
+
+
+def _create_model() -> EmbeddingBackend:
+    return create_backend(config.embedding.backend, MODEL_NAME, config.embedding.num_threads)
+
+
+async def _load_model() -> None:
+    global model
+    logger.info("Loading model %s with the %s backend...", MODEL_NAME, config.embedding.backend)
+    started = time.perf_counter()
+    model = await asyncio.to_thread(_create_model)
+    logger.info("Model loaded in %.1fs.", time.perf_counter() - started)
+
+
+def _embed_documents(texts: list[str]) -> list:
+    return model.embed_documents(texts)
+
+
+def _create_reranker() -> "CrossEncoder":
+    from sentence_transformers import CrossEncoder
+
+    return CrossEncoder(config.rerank.model_name, max_length=config.rerank.max_length)
+
+
+async def _load_reranker() -> None:
+    global reranker
+    logger.info("Loading reranker %s...", config.rerank.model_name)
+    started = time.perf_counter()
+    reranker = await asyncio.to_thread(_create_reranker)
+    logger.info("Reranker loaded in %.1fs.", time.perf_counter() - started)
+
+
+def _score_pairs(pairs: list[tuple[str, str]]) -> list[float]:
+    return reranker.predict(pairs, batch_size=len(pairs), show_progress_bar=False).tolist()
+
+
+def _pair_length(pair: tuple[str, str]) -> int:
+    return len(pair[0]) + len(pair[1])
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global model
-    logger.info(f"Loading model {MODEL_NAME}...")
-    model = HuggingFaceEmbeddings(model_name=MODEL_NAME, show_progress=True)
-    logger.info("Model loaded.")
+    global model_task, batcher, cache, reranker_task, rerank_batcher
+    # The model warms up in the background so /status answers immediately; /embed waits for it.
+    model_task = asyncio.create_task(_load_model())
+    batcher = DynamicBatcher(
+        embed_fn=_embed_documents,
+        max_texts=config.embedding.coalesce_max_texts,
+        max_wait_ms=config.embedding.coalesce_max_wait_ms,
+        forward_batch_size=config.embedding.forward_batch_size,
+        name="embed",
+    )
+    batcher.start()
+    rerank_batcher = DynamicBatcher(
+        embed_fn=_score_pairs,
+        max_texts=config.embedding.coalesce_max_texts,
+        max_wait_ms=config.embedding.coalesce_max_wait_ms,
+        forward_batch_size=config.rerank.batch_size,
+        sort_key=_pair_length,
+        name="rerank",
+    )
+    rerank_batcher.start()
+    if config.rerank.enabled:
+        reranker_task = asyncio.create_task(_load_reranker())
+    if config.embedding.cache_enabled:
+        cache_key = BACKENDS[config.embedding.backend].cache_key(MODEL_NAME)
+        cache = EmbeddingCache(resolve_path(config.embedding.cache_path), cache_key, config.embedding.cache_memory_items)
     yield
+    model_task.cancel()
+    if reranker_task is not None:
+        reranker_task.cancel()
+    await batcher.stop()
+    await rerank_batcher.stop()
+    if cache is not None:
+        cache.close()
 
 
 app = FastAPI(title="Embedder", description="Text embedding service", lifespan=lifespan)
+instrument(app)
 
 
 class EmbedRequest(BaseModel):
@@ -34,15 +119,113 @@ class EmbedResponse(BaseModel):
     embeddings: list[list[float]]
 
 
-class StatusResponse(BaseModel):
-    status: str = Field(examples=["ok"])
+class RerankRequest(BaseModel):
+    query: str = Field(examples=["What is a vector database?"])
+    passages: list[str] = Field(examples=[["Qdrant stores vectors.", "Bananas are yellow."]])
 
 
-@app.get("/status", response_model=StatusResponse)
-def status() -> StatusResponse:
-    return StatusResponse(status="ok")
+class RerankResponse(BaseModel):
+    scores: list[float] = Field(description="Relevance of each passage, in input order; higher is better.")
 
 
-@app.post("/embed", response_model=EmbedResponse)
-def embed(request: EmbedRequest) -> EmbedResponse:
-    return EmbedResponse(embeddings=model.embed_documents(request.inputs))
+class StatusResponse(BaseModel):
+    status: str = Field(examples=["ok"])
+    backend: str = Field(default=config.embedding.backend, examples=["langchain", "onnx"])
+    queue_depth: int = 0
+    batches: int = 0
+    texts: int = 0
+    avg_batch_size: float = 0.0
+    last_batch_size: int = 0
+    max_batch_size: int = 0
+    cache_memory_hits: int = 0
+    cache_disk_hits: int = 0
+    cache_misses: int = 0
+    cache_hit_rate: float = 0.0
+    cache_memory_items: int = 0
+    reranker: str = Field(default="off", examples=["off", "loading", "ok"])
+    rerank_batches: int = 0
+    rerank_pairs: int = 0
+
+
+@app.get("/status", response_model=StatusResponse, responses={503: {"model": StatusResponse}})
+def status(http_response: Response) -> StatusResponse:
+    """503 until the model is loaded, so services waiting on the embedder do not start too early."""
+    response = StatusResponse(status="ok" if model is not None else "loading")
+    if model is None:
+        http_response.status_code = 503
+    if batcher is not None:
+        stats = batcher.stats
+        response.queue_depth = batcher.queue_depth
+        response.batches = stats.batches
+        response.texts = stats.texts
+        response.avg_batch_size = stats.avg_batch_size
+        response.last_batch_size = stats.last_batch_size
+        response.max_batch_size = stats.max_batch_size
+    if cache is not None:
+        response.cache_memory_hits = cache.stats.memory_hits
+        response.cache_disk_hits = cache.stats.disk_hits
+        response.cache_misses = cache.stats.misses
+        response.cache_hit_rate = cache.stats.hit_rate
+        response.cache_memory_items = cache.memory_size
+    if reranker_task is not None:
+        response.reranker = "ok" if reranker is not None else "loading"
+    if rerank_batcher is not None:
+        response.rerank_batches = rerank_batcher.stats.batches
+        response.rerank_pairs = rerank_batcher.stats.texts
+    return response
+
+
+async def _embed_texts(texts: list[str]) -> list:
+    """Serve cached vectors and send only the misses to the model."""
+    if cache is None:
+        await model_task
+        with STAGE_SECONDS.time("model"):
+            return await batcher.embed(texts)
+
+    with STAGE_SECONDS.time("cache_lookup"):
+        vectors = await asyncio.to_thread(cache.get_many, texts)
+    missing = [i for i, v in enumerate(vectors) if v is None]
+    if missing:
+        missing_texts = [texts[i] for i in missing]
+        await model_task
+        with STAGE_SECONDS.time("model"):
+            computed = await batcher.embed(missing_texts)
+        with STAGE_SECONDS.time("cache_store"):
+            await asyncio.to_thread(cache.put_many, missing_texts, computed)
+        for i, vector in zip(missing, computed):
+            vectors[i] = vector
+    return vectors
+
+
+@app.post(
+    "/embed",
+    response_model=EmbedResponse,
+    responses={
+        200: {
+            "content": {
+                embedding_codec.FLOAT32_MEDIA_TYPE: {},
+                embedding_codec.FLOAT16_MEDIA_TYPE: {},
+            },
+            "description": "JSON by default; a packed matrix when requested via the Accept header.",
+        }
+    },
+)
+async def embed(request: EmbedRequest, accept: str | None = Header(default=None)) -> EmbedResponse | Response:
+    embeddings = await _embed_texts(request.inputs)
+    media_type = embedding_codec.negotiate(accept)
+    with STAGE_SECONDS.time("encode"):
+        if media_type == embedding_codec.JSON_MEDIA_TYPE:
+            return EmbedResponse(embeddings=[list(map(float, v)) for v in embeddings])
+        return Response(content=embedding_codec.encode(embeddings, media_type), media_type=media_type)
+
+
+@app.post("/rerank", response_model=RerankResponse)
+async def rerank(request: RerankRequest) -> RerankResponse:
+    """Score (query, passage) pairs with the cross-encoder; pairs from concurrent requests share forward passes."""
+    global reranker_task
+    if reranker_task is None:
+        reranker_task = asyncio.create_task(_load_reranker())
+    await reranker_task
+    with STAGE_SECONDS.time("rerank"):
+        scores = await rerank_batcher.embed([(request.query, passage) for passage in request.passages])
+    return RerankResponse(scores=scores)
@@ -1,10 +1,86 @@
+import bisect
 import logging
+from collections.abc import Iterable
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from shared.types.Chunk import Chunk
+from shared.types.TextSegment import TextSegment
 from shared.config import config
 
+# How much text a stream buffers before splitting, relative to the chunk size.
+STREAM_FLUSH_FACTOR = 8
+
+
+class ChunkStream:
+    """Incremental splitter for one source.
+
+    Segments are appended to a buffer; once it exceeds the flush size the buffer is split and
+    every piece but the last is emitted. The last piece stays buffered and is re-split together
+    with the following text, so overlap is carried across page boundaries. Chunk boundaries near
+    the points where the buffer was flushed may differ from a split of the whole document; the
+    size and overlap limits hold everywhere. Each chunk records the page its text starts on.
+    """
+
+    def __init__(self, splitter: RecursiveCharacterTextSplitter, source: str, flush_size: int) -> None:
+        self._splitter = splitter
+        self._source = source
+        self._flush_size = flush_size
+        self._buffer = ""
+        self._page_offsets: list[int] = []
+        self._pages: list[int | None] = []
+        self._next_index = 0
+        self.characters = 0
+
+    def feed(self, segments: Iterable[TextSegment]) -> list[Chunk]:
+        for segment in segments:
+            self._page_offsets.append(len(self._buffer))
+            self._pages.append(segment.page)
+            self._buffer += segment.text + "\n"
+            self.characters += len(segment.text)
+        if len(self._buffer) < self._flush_size:
+            return []
+        return self._emit(final=False)
+
+    def finish(self) -> list[Chunk]:
+        return self._emit(final=True)
+
+    @property
+    def chunk_count(self) -> int:
+        return self._next_index
+
+    def _page_at(self, offset: int) -> int | None:
+        i = bisect.bisect_right(self._page_offsets, offset) - 1
+        return self._pages[i] if i >= 0 else None
+
+    def _emit(self, final: bool) -> list[Chunk]:
+        docs = self._splitter.create_documents([self._buffer])
+        keep_from = len(self._buffer)
+        if not final:
+            if len(docs) < 2:
+                return []
+            keep_from = docs[-1].metadata["start_index"]
+            docs = docs[:-1]
+
+        chunks = [
+            Chunk(
+                text=doc.page_content,
+                source=self._source,
+                index=self._next_index + i,
+                page=self._page_at(doc.metadata["start_index"]),
+            )
+            for i, doc in enumerate(docs)
+        ]
+        self._next_index += len(chunks)
+        self._trim(keep_from)
+        return chunks
+
+    def _trim(self, keep_from: int) -> None:
+        first = max(bisect.bisect_right(self._page_offsets, keep_from) - 1, 0)
+        self._page_offsets = [max(offset - keep_from, 0) for offset in self._page_offsets[first:]]
+        self._pages = self._pages[first:]
+        self._buffer = self._buffer[keep_from:]
+
 
 class Chunker:
     def __init__(self):
@@ -13,14 +89,11 @@ class Chunker:
         self._splitter = RecursiveCharacterTextSplitter(
             chunk_size=config.chunking.size,
             chunk_overlap=config.chunking.overlap,
+            add_start_index=True,
         )
 
-    def split(self, text: str, source: str) -> list[Chunk]:
-        pieces = self._splitter.split_text(text)
-        chunks = [Chunk(text=piece, source=source, index=i) for i, piece in enumerate(pieces)]
-
-        self.logger.info("Split '%s' into %d chunks", source, len(chunks))
-        return chunks
+    def stream(self, source: str) -> ChunkStream:
+        return ChunkStream(self._splitter, source, flush_size=config.chunking.size * STREAM_FLUSH_FACTOR)
 
 
 chunker = Chunker()
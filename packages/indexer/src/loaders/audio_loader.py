@@ -1,23 +1,48 @@
 import logging
+import threading
+from collections.abc import Iterator
 from pathlib import Path
-
-from faster_whisper import WhisperModel, BatchedInferencePipeline
+from typing import TYPE_CHECKING
 
 from shared.config import config
+from shared.types.TextSegment import TextSegment
+
+if TYPE_CHECKING:
+    from faster_whisper import BatchedInferencePipeline
 
 logger = logging.getLogger(__name__)
-model = WhisperModel(config.whisper.model)
-batched_model = BatchedInferencePipeline(model=model)
+_batched_model: "BatchedInferencePipeline | None" = None
+_model_lock = threading.Lock()
+
+
+def _get_model() -> "BatchedInferencePipeline":
+    """Load Whisper on first use so indexing PDF-only knowledge bases never pays for it."""
+    global _batched_model
+    with _model_lock:
+        if _batched_model is None:
+            from faster_whisper import BatchedInferencePipeline, WhisperModel
+
+            logger.info("Loading Whisper model %s...", config.whisper.model)
+            _batched_model = BatchedInferencePipeline(model=WhisperModel(config.whisper.model))
+    return _batched_model
 
 
+def plan(file_path: Path) -> list[tuple]:
+    """Transcription runs as a single part; the chunker receives the whole transcript at once."""
+    return [()]
 
-def load(file_path: Path) -> str:
-    segments, info = batched_model.transcribe(str(file_path), batch_size=config.whisper.batch_size)
+
+def load(file_path: Path) -> Iterator[TextSegment]:
+    segments, info = _get_model().transcribe(str(file_path), batch_size=config.whisper.batch_size)
     logger.debug("Transcription started for %s (language: %s, duration: %.1fs)",
                  file_path.name, info.language, info.duration)
-    
-    segments = list(segments)
-    text = "".join(seg.text for seg in segments)
-    logger.debug("Transcription completed for %s (total segments: %d, total text length: %d)",
-                 file_path.name, len(segments), len(text))
-    return text
+
+    count = 0
+    for seg in segments:
+        count += 1
+        yield TextSegment(text=seg.text)
+    logger.debug("Transcription completed for %s (total segments: %d)", file_path.name, count)
+
+
+def load_part(file_path: Path) -> list[TextSegment]:
+    return list(load(file_path))
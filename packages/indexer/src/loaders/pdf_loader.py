@@ -1,21 +1,28 @@
 import logging
+from collections.abc import Iterator
 from pathlib import Path
 
-from langchain_community.document_loaders import FileSystemBlobLoader
-from langchain_community.document_loaders.generic import GenericLoader
-from langchain_community.document_loaders.parsers import PyPDFParser
+from pypdf import PdfReader
+
+from shared.config import config
+from shared.types.TextSegment import TextSegment
 
 logger = logging.getLogger(__name__)
 
 
-def load(file_path: Path) -> str:
-    loader = GenericLoader(
-        blob_loader=FileSystemBlobLoader(
-            path=str(file_path.parent),
-            glob=file_path.name,
-        ),
-        blob_parser=PyPDFParser(),
-    )
-    docs = loader.load()
-    logger.info("Loaded %d pages from %s", len(docs), file_path.name)
-    return "\n".join(doc.page_content for doc in docs)
+def plan(file_path: Path) -> list[tuple[int, int]]:
+    """Split the document into page ranges that can be extracted independently."""
+    page_count = len(PdfReader(str(file_path)).pages)
+    step = config.indexer.pdf_pages_per_part
+    logger.info("Found %d pages in %s", page_count, file_path.name)
+    return [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+
+
+def load_part(file_path: Path, start: int, stop: int) -> list[TextSegment]:
+    reader = PdfReader(str(file_path))
+    return [TextSegment(text=reader.pages[i].extract_text() or "", page=i + 1) for i in range(start, stop)]
+
+
+def load(file_path: Path) -> Iterator[TextSegment]:
+    for part in plan(file_path):
+        yield from load_part(file_path, *part)
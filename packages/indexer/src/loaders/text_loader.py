@@ -0,0 +1,20 @@
+from collections.abc import Iterator
+from pathlib import Path
+
+from shared.types.TextSegment import TextSegment
+
+
+def plan(file_path: Path) -> list[tuple]:
+    """Plain text files are small enough to read as a single part."""
+    return [()]
+
+
+def load(file_path: Path) -> Iterator[TextSegment]:
+    text = file_path.read_text(encoding="utf-8", errors="replace")
+    for paragraph in text.split("\n\n"):
+        if paragraph.strip():
+            yield TextSegment(text=paragraph.strip())
+
+
+def load_part(file_path: Path) -> list[TextSegment]:
+    return list(load(file_path))
@@ -5,8 +5,11 @@ from fastapi import FastAPI
 from pydantic import BaseModel
 from rich.logging import RichHandler
 
+from pipeline import shutdown_load_pool
+from progress import ProgressSnapshot
 from runner import indexer, IndexingStatus
 from shared.config import config
+from shared.tracing import instrument
 
 logging.basicConfig(
     level="INFO",
@@ -20,21 +23,24 @@ async def lifespan(app: FastAPI):
         indexer.start()
     yield
     indexer.stop()
+    shutdown_load_pool()
 
 
 app = FastAPI(title="Indexer", description="Knowledge base indexing service", lifespan=lifespan)
+instrument(app)
 
 
 class StatusResponse(BaseModel):
     status: IndexingStatus
+    progress: ProgressSnapshot | None = None
 
 
 @app.get("/status", response_model=StatusResponse)
 def status() -> StatusResponse:
-    return StatusResponse(status=indexer.get_status())
+    return StatusResponse(status=indexer.get_status(), progress=indexer.get_progress())
 
 
 @app.post("/index", response_model=StatusResponse)
-def index() -> StatusResponse:
-    indexer.start()
-    return StatusResponse(status=indexer.get_status())
+def index(full: bool = False) -> StatusResponse:
+    indexer.start(full=full)
+    return StatusResponse(status=indexer.get_status(), progress=indexer.get_progress())
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from shared.config import config, resolve_path
+
+HASH_BLOCK_SIZE = 1024 * 1024
+# Bump when the chunker or point payload changes in a way that requires re-indexing.
+PIPELINE_VERSION = 2
+
+
+def pipeline_fingerprint() -> dict:
+    """Settings that change the produced points; a mismatch forces re-indexing of the file."""
+    return {
+        "version": PIPELINE_VERSION,
+        "chunk_size": config.chunking.size,
+        "chunk_overlap": config.chunking.overlap,
+        "embedding_model": config.embedding.model_name,
+        "hybrid": config.retrieval.hybrid_enabled,
+        "text_store": config.storage.backend == "qdrant" and config.storage.text_store,
+    }
+
+
+def hash_file(file_path: Path) -> str:
+    digest = hashlib.sha256()
+    with file_path.open("rb") as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass
+class ManifestEntry:
+    content_hash: str
+    size: int
+    mtime: float
+    fingerprint: dict
+    point_ids: list[int] = field(default_factory=list)
+
+
+class IndexManifest:
+    """Per-file record of what is currently stored in the collection, persisted as JSON.
+
+    Changes are written at most every `manifest_save_seconds` and by `flush` at the end of a run.
+    Point ids are derived from source and chunk index, so files whose record was lost in a crash
+    are simply indexed again over the same points.
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._path = path or resolve_path(config.indexer.manifest_path)
+        self._entries: dict[str, ManifestEntry] = {}
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self.load()
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def sources(self) -> set[str]:
+        return set(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, source: str) -> ManifestEntry | None:
+        return self._entries.get(source)
+
+    def load(self) -> None:
+        self._entries = {}
+        if not self._path.exists():
+            return
+        try:
+            raw = json.loads(self._path.read_text(encoding="utf-8"))
+            self._entries = {source: ManifestEntry(**entry) for source, entry in raw.get("files", {}).items()}
+        except (OSError, ValueError, TypeError) as e:
+            self.logger.warning("Ignoring unreadable manifest %s: %s", self._path, e)
+        self.logger.info("Loaded manifest with %d files from %s", len(self._entries), self._path)
+
+    def save(self) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"files": {source: asdict(entry) for source, entry in self._entries.items()}}
+        tmp_path = self._path.with_suffix(self._path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp_path, self._path)
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    def flush(self) -> None:
+        """Write changes that are not saved yet."""
+        if self._dirty:
+            self.save()
+
+    def _changed(self) -> None:
+        self._dirty = True
+        if time.monotonic() - self._saved_at >= config.indexer.manifest_save_seconds:
+            self.save()
+
+    def clear(self) -> None:
+        self._entries = {}
+        self.save()
+
+    def move_to(self, path: Path) -> None:
+        """Replace the manifest file at `path` with this one, e.g. when a rebuilt index goes live."""
+        self.save()
+        os.replace(self._path, path)
+        self._path = path
+
+    def delete(self) -> None:
+        self._entries = {}
+        self._dirty = False
+        self._path.unlink(missing_ok=True)
+
+    def is_up_to_date(self, file_path: Path) -> bool:
+        """Check whether the stored points for a file still match its content and the pipeline settings.
+
+        Size and mtime are compared first so unchanged files are not re-hashed; a touched but
+        identical file only gets its mtime refreshed.
+        """
+        entry = self._entries.get(file_path.name)
+        if entry is None or entry.fingerprint != pipeline_fingerprint():
+            return False
+
+        stat = file_path.stat()
+        if stat.st_size == entry.size and stat.st_mtime == entry.mtime:
+            return True
+        if stat.st_size != entry.size or hash_file(file_path) != entry.content_hash:
+            return False
+
+        entry.mtime = stat.st_mtime
+        self._changed()
+        return True
+
+    def record(self, file_path: Path, point_ids: list[int]) -> None:
+        stat = file_path.stat()
+        self._entries[file_path.name] = ManifestEntry(
+            content_hash=hash_file(file_path),
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            fingerprint=pipeline_fingerprint(),
+            point_ids=point_ids,
+        )
+        self._changed()
+
+    def remove(self, source: str) -> None:
+        if self._entries.pop(source, None) is not None:
+            self._changed()
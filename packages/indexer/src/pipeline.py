@@ -0,0 +1,358 @@
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import ModuleType
+
+import numpy as np
+
+from chunker import ChunkStream, chunker
+from manifest import IndexManifest
+from progress import IndexingProgress
+from shared.config import config
+from shared.services.embedder import embedder
+from shared.services.knowledge_storage import KnowledgeStorage
+from shared.types.Chunk import Chunk
+from shared.types.TextSegment import TextSegment
+
+QUEUE_POLL_INTERVAL = 0.5
+# Loader parts of one file submitted to the process pool ahead of the one being consumed.
+LOAD_LOOKAHEAD = 2
+
+_DONE = object()
+
+_load_pool: ProcessPoolExecutor | None = None
+_load_pool_lock = threading.Lock()
+
+
+def _submit_load(fn: Callable, *args) -> Future:
+    """Run a loader call in the service's process pool, started on first use and kept until shutdown."""
+    global _load_pool
+    with _load_pool_lock:
+        if _load_pool is None:
+            mp_context = multiprocessing.get_context("spawn")
+            _load_pool = ProcessPoolExecutor(max_workers=config.indexer.load_workers, mp_context=mp_context)
+        try:
+            return _load_pool.submit(fn, *args)
+        except BrokenProcessPool:
+            # A loader process died (out of memory, a crashing parser); start a fresh pool.
+            _load_pool.shutdown(wait=False, cancel_futures=True)
+            _load_pool = None
+    return _submit_load(fn, *args)
+
+
+def shutdown_load_pool() -> None:
+    global _load_pool
+    with _load_pool_lock:
+        if _load_pool is not None:
+            _load_pool.shutdown(wait=False, cancel_futures=True)
+            _load_pool = None
+
+
+@dataclass
+class FileTask:
+    file_path: Path
+    loader: ModuleType
+    size: int = 0
+
+
+@dataclass
+class LoadedPart:
+    file_path: Path
+    segments: list[TextSegment]
+    is_last: bool
+    file_size: int = 0
+
+
+@dataclass
+class _ChunkState:
+    stream: ChunkStream
+    pending: list[Chunk] = field(default_factory=list)
+    batch_index: int = 0
+
+
+@dataclass
+class ChunkBatch:
+    file_path: Path
+    batch_index: int
+    chunks: list[Chunk]
+    is_last: bool
+    file_size: int = 0
+    vectors: np.ndarray | None = None
+
+
+@dataclass
+class _UpsertState:
+    received: int = 0
+    total: int | None = None
+    point_ids: list[int] = field(default_factory=list)
+
+
+class IndexingPipeline:
+    """Load -> chunk -> embed -> upsert stages connected by bounded queues.
+
+    Loaders run in a process pool, embedding in a thread pool, chunking and upserting in one
+    thread each. Files are loaded in parts (page ranges for PDFs) and chunked as a stream, so
+    chunks reach the embedder before the whole document is parsed. Every queue holds at most
+    `queue_size` items (loaded parts or chunk batches), which bounds memory on any corpus.
+    """
+
+    def __init__(
+        self,
+        stop_event: threading.Event,
+        storage: KnowledgeStorage,
+        manifest: IndexManifest,
+        progress: IndexingProgress,
+    ) -> None:
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._stop_event = stop_event
+        self._storage = storage
+        self._manifest = manifest
+        self._progress = progress
+        self._lock = threading.Lock()
+        self._files_done = 0
+        self._upsert_states: dict[Path, _UpsertState] = {}
+        self._chunk_states: dict[Path, _ChunkState] = {}
+        # Files that failed in some stage; their remaining parts and batches are dropped.
+        self._failed: set[Path] = set()
+        self._load_futures: set[Future] = set()
+
+    def run(self, tasks: list[FileTask]) -> int:
+        """Process all tasks and return the number of files fully indexed."""
+        if not tasks:
+            return 0
+
+        settings = config.indexer
+        load_workers = min(settings.load_workers, len(tasks))
+        task_queue: queue.Queue = queue.Queue()
+        loaded_queue: queue.Queue = queue.Queue(maxsize=settings.queue_size)
+        chunked_queue: queue.Queue = queue.Queue(maxsize=settings.queue_size)
+        embedded_queue: queue.Queue = queue.Queue(maxsize=settings.queue_size)
+
+        for task in tasks:
+            task_queue.put(task)
+        task_queue.put(_DONE)
+
+        stages = [
+            ("load", task_queue, loaded_queue, self._load, load_workers),
+            ("chunk", loaded_queue, chunked_queue, self._chunk, 1),
+            ("embed", chunked_queue, embedded_queue, self._embed, settings.embed_workers),
+            ("upsert", embedded_queue, None, self._upsert, 1),
+        ]
+        threads = []
+        for name, inbox, outbox, handler, workers in stages:
+            remaining = [workers]
+            for i in range(workers):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(name, inbox, outbox, handler, remaining),
+                    name=f"indexer-{name}-{i}",
+                    daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+
+        for thread in threads:
+            thread.join()
+
+        # Parts read ahead for a stopped run would otherwise occupy the shared pool.
+        with self._lock:
+            pending = list(self._load_futures)
+        for future in pending:
+            future.cancel()
+        return self._files_done
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        future = _submit_load(fn, *args)
+        with self._lock:
+            self._load_futures.add(future)
+        future.add_done_callback(self._forget_future)
+        return future
+
+    def _forget_future(self, future: Future) -> None:
+        with self._lock:
+            self._load_futures.discard(future)
+
+    def _worker(
+        self,
+        stage: str,
+        inbox: queue.Queue,
+        outbox: queue.Queue | None,
+        handler: Callable,
+        remaining: list[int],
+    ) -> None:
+        while True:
+            item = self._get(inbox)
+            if item is _DONE or item is None:
+                # Hand the marker on to sibling workers; the last one out closes the next stage.
+                self._put(inbox, _DONE)
+                with self._lock:
+                    remaining[0] -= 1
+                    is_last_worker = remaining[0] == 0
+                if is_last_worker and outbox is not None:
+                    self._put(outbox, _DONE)
+                return
+
+            if item.file_path in self._failed:
+                continue
+            try:
+                self._run_handler(stage, handler, item, outbox)
+            except Exception as e:
+                self.logger.exception("Failed to index %s", item.file_path.name)
+                self._fail_file(item.file_path, e)
+
+    def _fail_file(self, file_path: Path, error: Exception) -> None:
+        """Remove everything of a file that failed part way, so no partial document stays searchable.
+
+        Points are derived from source and chunk index, so the ones written so far may have
+        replaced points of the previous version; that version is removed too and the file is
+        indexed again on the next run.
+        """
+        with self._lock:
+            if file_path in self._failed:
+                return
+            self._failed.add(file_path)
+            self._chunk_states.pop(file_path, None)
+            state = self._upsert_states.pop(file_path, None)
+        point_ids = set(state.point_ids) if state is not None else set()
+        previous = self._manifest.get(file_path.name)
+        if previous is not None:
+            point_ids.update(previous.point_ids)
+            self._manifest.remove(file_path.name)
+        self._storage.delete_points(sorted(point_ids))
+        self._progress.file_failed(file_path, error)
+
+    def _run_handler(self, stage: str, handler: Callable, item, outbox: queue.Queue | None) -> None:
+        """Drive a stage handler, timing only the work inside it and not the waits on the next queue."""
+        started = time.perf_counter()
+        results = iter(handler(item))
+        while True:
+            try:
+                result = next(results)
+            except StopIteration:
+                return
+            finally:
+                self._progress.add_stage_time(stage, time.perf_counter() - started)
+            if outbox is not None and not self._put(outbox, result):
+                return
+            started = time.perf_counter()
+
+    def _get(self, q: queue.Queue):
+        while not self._stop_event.is_set():
+            try:
+                return q.get(timeout=QUEUE_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return None
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        while not self._stop_event.is_set():
+            try:
+                q.put(item, timeout=QUEUE_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _load(self, task: FileTask) -> Iterator[LoadedPart]:
+        self.logger.info("Processing %s", task.file_path.name)
+        parts = self._submit(task.loader.plan, task.file_path).result()
+        if not parts:
+            self._progress.add_loaded(task.size)
+            yield LoadedPart(file_path=task.file_path, segments=[], is_last=True, file_size=task.size)
+            return
+
+        futures = deque()
+        for part in parts:
+            if task.file_path in self._failed:
+                return
+            futures.append(self._submit(task.loader.load_part, task.file_path, *part))
+            if len(futures) > LOAD_LOOKAHEAD:
+                segments = futures.popleft().result()
+                yield LoadedPart(file_path=task.file_path, segments=segments, is_last=False, file_size=task.size)
+        while futures:
+            segments = futures.popleft().result()
+            if not futures:
+                self._progress.add_loaded(task.size)
+            yield LoadedPart(file_path=task.file_path, segments=segments, is_last=not futures, file_size=task.size)
+
+    def _chunk(self, part: LoadedPart) -> Iterator[ChunkBatch]:
+        state = self._chunk_states.get(part.file_path)
+        if state is None:
+            state = self._chunk_states[part.file_path] = _ChunkState(stream=chunker.stream(part.file_path.name))
+
+        self._progress.add_characters(sum(len(segment.text) for segment in part.segments))
+        new_chunks = state.stream.feed(part.segments)
+        if part.is_last:
+            new_chunks += state.stream.finish()
+        self._progress.add_chunks(len(new_chunks))
+        state.pending.extend(new_chunks)
+        if part.is_last:
+            del self._chunk_states[part.file_path]
+            self.logger.info(
+                "Split '%s' (%d characters) into %d chunks",
+                part.file_path.name,
+                state.stream.characters,
+                state.stream.chunk_count,
+            )
+
+        batch_size = config.indexer.pipeline_batch_size
+        while len(state.pending) >= batch_size and not (part.is_last and len(state.pending) == batch_size):
+            yield self._next_batch(part, state, batch_size, is_last=False)
+        if part.is_last:
+            yield self._next_batch(part, state, batch_size, is_last=True)
+
+    def _next_batch(self, part: LoadedPart, state: _ChunkState, size: int, is_last: bool) -> ChunkBatch:
+        batch = ChunkBatch(
+            file_path=part.file_path,
+            batch_index=state.batch_index,
+            chunks=state.pending[:size],
+            is_last=is_last,
+            file_size=part.file_size,
+        )
+        state.pending = state.pending[size:]
+        state.batch_index += 1
+        return batch
+
+    def _embed(self, batch: ChunkBatch) -> Iterable[ChunkBatch]:
+        batch.vectors = embedder.embed_chunks(batch.chunks)
+        return [batch]
+
+    def _upsert(self, batch: ChunkBatch) -> Iterable[None]:
+        point_ids = self._storage.add_chunks(batch.chunks, batch.vectors)
+        self._progress.add_vectors(len(point_ids))
+
+        with self._lock:
+            failed = batch.file_path in self._failed
+            if not failed:
+                state = self._upsert_states.setdefault(batch.file_path, _UpsertState())
+                state.received += 1
+                state.point_ids.extend(point_ids)
+                if batch.is_last:
+                    state.total = batch.batch_index + 1
+                done = state.received == state.total
+                if done:
+                    del self._upsert_states[batch.file_path]
+        if failed:
+            # The file failed in another stage while this batch was being written.
+            self._storage.delete_points(point_ids)
+        elif done:
+            self._finish_file(batch, state.point_ids)
+        return []
+
+    def _finish_file(self, batch: ChunkBatch, point_ids: list[int]) -> None:
+        file_path = batch.file_path
+        previous = self._manifest.get(file_path.name)
+        if previous is not None:
+            self._storage.delete_points(sorted(set(previous.point_ids) - set(point_ids)))
+        self._manifest.record(file_path, point_ids)
+        self._files_done += 1
+        self._progress.file_done(batch.file_size)
+        self.logger.info("Indexed %s (%d points)", file_path.name, len(point_ids))
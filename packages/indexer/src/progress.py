@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from shared import metrics
+
+STAGE_SECONDS = metrics.histogram("indexer_stage_seconds", "Work time per pipeline stage and item", ("stage",))
+# Key in `last_errors` of an error that ended the whole run rather than one file.
+RUN_ERROR_KEY = "(run)"
+
+
+class ProgressSnapshot(BaseModel):
+    files_total: int = 0
+    files_done: int = 0
+    files_skipped: int = 0
+    files_failed: int = 0
+    files_remaining: int = 0
+    bytes_total: int = 0
+    bytes_read: int = 0
+    characters_extracted: int = 0
+    chunks_produced: int = 0
+    vectors_upserted: int = 0
+    elapsed_seconds: float = 0.0
+    stage_seconds: dict[str, float] = {}
+    chunks_per_second: float = 0.0
+    eta_seconds: float | None = None
+    last_errors: dict[str, str] = {}
+
+
+class IndexingProgress:
+    """Counters for the current run, updated by the pipeline threads and read by /status.
+
+    Updates are a few integer additions under a lock, so reading a snapshot mid-run is cheap.
+    Stage times are summed across the workers of a stage, so they can exceed wall time.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._finished: float | None = None
+        self._files_total = 0
+        self._files_done = 0
+        self._files_skipped = 0
+        self._bytes_total = 0
+        self._bytes_done = 0
+        self._bytes_read = 0
+        self._characters = 0
+        self._chunks = 0
+        self._vectors = 0
+        self._stage_seconds: dict[str, float] = defaultdict(float)
+        self._errors: dict[str, str] = {}
+        self._run_error: str | None = None
+
+    def set_plan(self, file_sizes: list[int], skipped: int) -> None:
+        with self._lock:
+            self._files_total = len(file_sizes)
+            self._bytes_total = sum(file_sizes)
+            self._files_skipped = skipped
+
+    def add_loaded(self, file_size: int) -> None:
+        with self._lock:
+            self._bytes_read += file_size
+
+    def add_characters(self, count: int) -> None:
+        with self._lock:
+            self._characters += count
+
+    def add_chunks(self, count: int) -> None:
+        with self._lock:
+            self._chunks += count
+
+    def add_vectors(self, count: int) -> None:
+        with self._lock:
+            self._vectors += count
+
+    def add_stage_time(self, stage: str, seconds: float) -> None:
+        STAGE_SECONDS.labels(stage).observe(seconds)
+        with self._lock:
+            self._stage_seconds[stage] += seconds
+
+    def file_done(self, file_size: int) -> None:
+        with self._lock:
+            self._files_done += 1
+            self._bytes_done += file_size
+
+    def file_failed(self, file_path: Path, error: BaseException) -> None:
+        with self._lock:
+            self._errors[file_path.name] = f"{type(error).__name__}: {error}"
+
+    def run_failed(self, error: BaseException) -> None:
+        with self._lock:
+            self._run_error = f"{type(error).__name__}: {error}"
+
+    def finish(self) -> None:
+        with self._lock:
+            self._finished = time.monotonic()
+
+    def snapshot(self) -> ProgressSnapshot:
+        with self._lock:
+            elapsed = (self._finished or time.monotonic()) - self._started
+            files_failed = len(self._errors)
+            errors = dict(self._errors)
+            if self._run_error is not None:
+                errors[RUN_ERROR_KEY] = self._run_error
+            eta = None
+            if self._finished is None and self._bytes_done and elapsed > 0:
+                bytes_remaining = max(self._bytes_total - self._bytes_done, 0)
+                eta = bytes_remaining / (self._bytes_done / elapsed)
+            return ProgressSnapshot(
+                files_total=self._files_total,
+                files_done=self._files_done,
+                files_skipped=self._files_skipped,
+                files_failed=files_failed,
+                files_remaining=max(self._files_total - self._files_done - files_failed, 0),
+                bytes_total=self._bytes_total,
+                bytes_read=self._bytes_read,
+                characters_extracted=self._characters,
+                chunks_produced=self._chunks,
+                vectors_upserted=self._vectors,
+                elapsed_seconds=round(elapsed, 3),
+                stage_seconds={stage: round(s, 3) for stage, s in self._stage_seconds.items()},
+                chunks_per_second=round(self._vectors / elapsed, 2) if elapsed > 0 else 0.0,
+                eta_seconds=round(eta, 1) if eta is not None else None,
+                last_errors=errors,
+            )
@@ -3,17 +3,24 @@ import threading
 from enum import Enum
 from pathlib import Path
 
-from chunker import chunker
+from shared.config import config
 from shared.services.knowledge_storage import KnowledgeStorage
-from shared.services.embedder import embedder
 from shared.services.file_manager import file_manager
-from loaders import audio_loader, pdf_loader
+from loaders import audio_loader, pdf_loader, text_loader
+from manifest import IndexManifest
+from pipeline import FileTask, IndexingPipeline
+from progress import IndexingProgress, ProgressSnapshot
 
 
 LOADERS = {
-    ".pdf": pdf_loader.load,
-    ".mp3": audio_loader.load,
-    ".mp4": audio_loader.load,
+    ".pdf": pdf_loader,
+    ".mp3": audio_loader,
+    ".mp4": audio_loader,
+}
+# Only indexed with `indexer.text_files_enabled`, which the end-to-end benchmark turns on.
+TEXT_LOADERS = {
+    ".txt": text_loader,
+    ".md": text_loader,
 }
 
 
@@ -22,6 +29,7 @@ class IndexingStatus(str, Enum):
     RUNNING = "indexing"
     DONE = "done"
     STOPPED = "stopped"
+    FAILED = "failed"
 
 
 class IndexerRunner:
@@ -34,16 +42,22 @@ class IndexerRunner:
             cls._instance._thread = None
             cls._instance._stop_event = threading.Event()
             cls._instance.logger = logging.getLogger(cls.__name__)
-            cls._instance._knowledge_storage = KnowledgeStorage()
+            cls._instance._knowledge_storage = None
+            cls._instance._manifest = IndexManifest()
+            # Set while a rebuild is written next to the live index: the manifest of that live index.
+            cls._instance._live_manifest = None
+            # Failed files of the last dropped rebuild with their (size, mtime); None if it went live.
+            cls._instance._dropped_rebuild = None
+            cls._instance._progress = None
         return cls._instance
 
-    def start(self) -> None:
+    def start(self, full: bool = False) -> None:
         if self._status == IndexingStatus.RUNNING:
             self.logger.warning("Indexer is already running.")
             return
         self._stop_event.clear()
         self._status = IndexingStatus.RUNNING
-        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread = threading.Thread(target=self._run, args=(full,), daemon=True)
         self._thread.start()
 
     def stop(self) -> None:
@@ -53,41 +67,177 @@ class IndexerRunner:
     def get_status(self) -> IndexingStatus:
         return self._status
 
+    def get_progress(self) -> ProgressSnapshot | None:
+        return self._progress.snapshot() if self._progress is not None else None
+
     def get_loader(self, file_path: Path):
         ext = file_path.suffix.lower()
         loader = LOADERS.get(ext)
+        if loader is None and config.indexer.text_files_enabled:
+            loader = TEXT_LOADERS.get(ext)
         return loader
 
-    def _run(self) -> None:
-        files_processed = 0
-
-        self._knowledge_storage.reset_storage()  # Clear existing data before indexing
-
-        for file_path in file_manager.iter_files():
-            if self._stop_event.is_set():
-                self.logger.info("Indexing interrupted.")
-                return
+    def _prepare_run(self, full: bool) -> bool:
+        """Returns True if the index is rebuilt from scratch."""
+        if full:
+            self._begin_rebuild()
+            return True
+
+        if self._needs_lexical_rebuild():
+            # Sparse vectors cannot be added to an existing collection, so it is rebuilt once.
+            self.logger.warning("Collection has no lexical index, rebuilding it for hybrid retrieval.")
+            self._begin_rebuild()
+            return True
+
+        if len(self._manifest) and self._knowledge_storage.count() == 0:
+            self.logger.warning("Collection is empty but manifest lists %d files, rebuilding.", len(self._manifest))
+            self._manifest.clear()
+        return False
+
+    @staticmethod
+    def _file_state(file_path: Path) -> tuple[int, int] | None:
+        try:
+            stat = file_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def _needs_lexical_rebuild(self) -> bool:
+        return config.retrieval.hybrid_enabled and not self._knowledge_storage.has_lexical_index()
+
+    def _rebuild_would_be_dropped_again(self) -> bool:
+        if self._dropped_rebuild is None:
+            return False
+        return all(self._file_state(path) == state for path, state in self._dropped_rebuild.items())
+
+    def _begin_rebuild(self) -> None:
+        if self._knowledge_storage.begin_rebuild():
+            # Chat keeps reading the old index, so its manifest stays in place until the new one is live.
+            self._live_manifest = self._manifest
+            live_path = self._live_manifest.path
+            self._manifest = IndexManifest(live_path.with_name(f"{live_path.stem}.rebuild{live_path.suffix}"))
+        self._manifest.clear()
+
+    def _end_rebuild(self, commit: bool) -> bool:
+        """Returns True if the rebuilt index went live."""
+        if self._live_manifest is None:
+            return False
+        committed = commit and self._knowledge_storage.commit_rebuild(self._stop_event)
+        if committed:
+            self._manifest.move_to(self._live_manifest.path)
+        else:
+            self._knowledge_storage.abort_rebuild()
+            self._manifest.delete()
+            self._manifest = self._live_manifest
+        self._live_manifest = None
+        return committed
+
+    def _remove_deleted_sources(self, present: set[str]) -> int:
+        removed = self._manifest.sources - present
+        for source in removed:
+            entry = self._manifest.get(source)
+            self._knowledge_storage.delete_points(entry.point_ids)
+            self._manifest.remove(source)
+            self.logger.info("Removed %d points of deleted file %s", len(entry.point_ids), source)
+        return len(removed)
+
+    def _run(self, full: bool = False) -> None:
+        progress = self._progress = IndexingProgress()
+        try:
+            if self._knowledge_storage is None:
+                # Connected here rather than at import so the service starts without waiting on Qdrant.
+                self._knowledge_storage = KnowledgeStorage()
+            self._index(full, progress)
+        except Exception as e:
+            self.logger.exception("Indexing failed.")
+            progress.run_failed(e)
+            self._status = IndexingStatus.FAILED
+        finally:
+            progress.finish()
+            if self._status == IndexingStatus.RUNNING:
+                self._status = IndexingStatus.IDLE
+
+    def _index(self, full: bool, progress: IndexingProgress) -> None:
+        files_skipped = 0
+        tasks: list[FileTask] = []
+
+        if not full and self._needs_lexical_rebuild() and self._rebuild_would_be_dropped_again():
+            # Hybrid points cannot be written to this collection either, so the run has nothing to do.
+            self.logger.warning(
+                "Collection has no lexical index and the files that failed its last rebuild are unchanged, skipping."
+            )
+            self._status = IndexingStatus.DONE
+            return
 
-            self.logger.info("Processing %s", file_path.name)
+        cleared = self._prepare_run(full)
+        rebuilding = self._live_manifest is not None
+        files = list(file_manager.iter_files())
+        removed = self._remove_deleted_sources({f.name for f in files})
 
+        for file_path in files:
             loader = self.get_loader(file_path)
             if loader is None:
                 self.logger.warning("Unsupported file type: %s", file_path.name)
                 continue
 
-            text = loader(file_path)
-            self.logger.info("Extracted %d characters from %s", len(text), file_path.name)
+            if self._manifest.is_up_to_date(file_path):
+                self.logger.debug("Skipping unchanged %s", file_path.name)
+                files_skipped += 1
+                continue
 
-            chunks = chunker.split(text, source=file_path.name)
-            vectors = embedder.embed_chunks(chunks)
-            self._knowledge_storage.add_chunks(chunks, vectors)
-            files_processed += 1
+            tasks.append(FileTask(file_path=file_path, loader=loader, size=file_path.stat().st_size))
+
+        progress.set_plan([task.size for task in tasks], skipped=files_skipped)
+        pipeline = IndexingPipeline(self._stop_event, self._knowledge_storage, self._manifest, progress)
+        try:
+            if tasks:
+                with self._knowledge_storage.bulk_load():
+                    files_processed = pipeline.run(tasks)
+            else:
+                files_processed = 0
+        except Exception:
+            self._end_rebuild(commit=False)
+            self._manifest.flush()
+            raise
+        files_failed = len(tasks) - files_processed
+        failed_files = [task.file_path for task in tasks if self._manifest.get(task.file_path.name) is None]
+        # Failed files are missing from a rebuild and retried by the next run, like on an incremental
+        # one. A rebuild that was stopped half way or lost too many files is dropped instead.
+        commit = (
+            not self._stop_event.is_set()
+            and files_failed <= config.indexer.rebuild_max_failed_ratio * len(tasks)
+        )
+        committed = self._end_rebuild(commit=commit)
+        self._manifest.flush()
+        if committed:
+            self._dropped_rebuild = None
+        elif rebuilding and not commit and not self._stop_event.is_set():
+            # Rebuilding on its own again is pointless until one of these files changes.
+            self._dropped_rebuild = {path: self._file_state(path) for path in failed_files}
+            self.logger.warning(
+                "Rebuild dropped after %d of %d files failed, the previous index stays live.",
+                files_failed,
+                len(tasks),
+            )
+
+        # Chat caches are keyed by generation; only bump it when the live index changed.
+        if committed or (not rebuilding and (cleared or removed or files_processed)):
+            self._knowledge_storage.bump_generation()
+
+        if self._stop_event.is_set():
+            self.logger.info("Indexing interrupted.")
+            return
 
-        if files_processed == 0:
+        if files_processed + files_skipped == 0:
             self.logger.warning("No files found in knowledge base directory.")
 
         self._status = IndexingStatus.DONE
-        self.logger.info("Indexing complete.")
+        self.logger.info(
+            "Indexing complete: %d files indexed, %d unchanged, %d failed.",
+            files_processed,
+            files_skipped,
+            files_failed,
+        )
 
 
 indexer = IndexerRunner()
@@ -1,26 +1,98 @@
 from pathlib import Path
+from typing import Literal
 
 from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-ENV_CONFIG_FILE = Path(__file__).parent.parent.parent / ".env"
+ROOT_DIR = Path(__file__).parent.parent.parent
+ENV_CONFIG_FILE = ROOT_DIR / ".env"
+
+
+def resolve_path(path: str | Path) -> Path:
+    """A configured path; relative paths are taken from the repository root."""
+    path = Path(path)
+    return path if path.is_absolute() else ROOT_DIR / path
 
 
 class QdrantConfig(BaseModel):
     search_k: int = 10
-    host: str
-    port: int
-    collection: str
+    host: str = "localhost"
+    port: int = 6333
+    grpc_port: int = 6334
+    prefer_grpc: bool = False
+    collection: str = "knowledge_base"
+    # Upserts are split into batches sent upsert_parallel at a time. Without upsert_wait Qdrant
+    # acknowledges a batch once it is in its WAL; the indexer waits for all of them at the end of a run.
+    upsert_batch_size: int = 256
+    upsert_parallel: int = 4
+    upsert_wait: bool = False
+    # Build no HNSW index while the indexer loads files and index everything once afterwards.
+    pause_indexing_during_bulk: bool = False
+    # A rebuilt collection goes live once Qdrant has indexed it, or after this long regardless.
+    rebuild_index_timeout_seconds: float = 1800.0
+
+
+class QuantizationConfig(BaseModel):
+    mode: Literal["none", "scalar", "binary"] = "none"
+    always_ram: bool = True
+    originals_on_disk: bool = True
+    scalar_quantile: float = 0.99
+    oversampling: float = 2.0
+    rescore: bool = True
+
+
+class StorageConfig(BaseModel):
+    backend: Literal["qdrant", "numpy"] = "qdrant"
+    path: str = "data/vectors"
+    search_block_rows: int = 65536
+    ivf_enabled: bool = False
+    ivf_min_points: int = 50_000
+    ivf_lists: int = 0  # 0 picks sqrt(point count)
+    ivf_probes: int = 8
+    # Retrain the IVF centroids in the background once this share of the points has changed.
+    ivf_retrain_fraction: float = 0.2
+    # Qdrant backend: keep chunk text in a local store and search for ids and scores only.
+    text_store: bool = False
+    text_store_path: str = "data/chunk_text.sqlite"
 
 
 class EmbeddingConfig(BaseModel):
     model_name: str = "Qwen/Qwen3-Embedding-0.6B"
     vector_size: int = 1024
     public_url: str
+    # Embedder service model runtime; see packages/embedder/src/backends.py.
+    backend: Literal["langchain", "sentence_transformers", "torch_int8", "onnx"] = "langchain"
+    num_threads: int = 0  # 0 keeps the runtime default
+    onnx_path: str = "data/onnx"
+    batch_size: int = 32
+    max_concurrency: int = 4
+    max_retries: int = 3
+    retry_backoff: float = 0.5
+    timeout: float = 60.0
+    wire_format: Literal["json", "float32", "float16"] = "float32"
+    coalesce_max_texts: int = 128
+    coalesce_max_wait_ms: float = 5.0
+    forward_batch_size: int = 32
+    cache_enabled: bool = True
+    cache_path: str = "data/embedding_cache.sqlite"
+    cache_memory_items: int = 50_000
 
 
 class IndexerConfig(BaseModel):
     start_on_startup: bool = True
+    knowledge_base_dir: str = "knowledge_base"
+    manifest_path: str = "data/index_manifest.json"
+    # During a run the manifest is written at most this often, and once more when the run ends.
+    manifest_save_seconds: float = 10.0
+    load_workers: int = 2
+    embed_workers: int = 2
+    queue_size: int = 4
+    pipeline_batch_size: int = 64
+    pdf_pages_per_part: int = 16
+    # Plain text and Markdown files; off in production, where the knowledge base is PDFs and media.
+    text_files_enabled: bool = False
+    # A rebuild goes live unless more than this share of its files failed; those are retried next run.
+    rebuild_max_failed_ratio: float = 0.5
 
 
 class ChunkingConfig(BaseModel):
@@ -38,6 +110,58 @@ class OpenAIConfig(BaseModel):
     api_key: str
 
 
+class RetrievalConfig(BaseModel):
+    # Turning this on adds a lexical index, which rebuilds an existing collection once.
+    hybrid_enabled: bool = False
+    dense_weight: float = 1.0
+    lexical_weight: float = 1.0
+    rrf_k: int = 60
+    bm25_k1: float = 1.2
+    bm25_b: float = 0.75
+    bm25_avg_doc_length: float = 90.0
+    # Follow-ups in a conversation are rewritten into up to this many stand-alone queries.
+    max_sub_queries: int = 3
+    history_messages: int = 6
+    # Search the raw message while the rewrite runs; keep those results when the rewrite is close
+    # to the message (token Jaccard) or took longer than speculative_accept_after_ms (0 = never).
+    speculative_enabled: bool = False
+    speculative_similarity: float = 0.6
+    speculative_accept_after_ms: float = 0.0
+
+
+class RewriteConfig(BaseModel):
+    cache_size: int = 1024
+    cache_ttl_seconds: float = 3600.0
+    heuristics_enabled: bool = True
+    min_passthrough_words: int = 3
+    max_passthrough_words: int = 20
+
+
+class AnswerCacheConfig(BaseModel):
+    enabled: bool = True
+    similarity_threshold: float = 0.95
+    max_entries: int = 2048
+    ttl_seconds: float = 24 * 3600
+    generation_check_seconds: float = 5.0
+
+
+class RerankConfig(BaseModel):
+    enabled: bool = False
+    model_name: str = "BAAI/bge-reranker-base"
+    # Defaults to /rerank next to embedding.public_url.
+    public_url: str | None = None
+    batch_size: int = 16
+    max_length: int = 512
+    candidates: int = 30
+    top_n: int = 5
+
+
+class ContextConfig(BaseModel):
+    token_budget: int = 1500
+    # Token counts are estimated from characters; about 4 per token for English text.
+    chars_per_token: float = 4.0
+
+
 class ServerConfig(BaseModel):
     display_name: str = "RAG Assistant"
     log_level: str = "INFO"
@@ -45,12 +169,19 @@ class ServerConfig(BaseModel):
 
 
 class Config(BaseSettings):
-    qdrant: QdrantConfig
+    qdrant: QdrantConfig = QdrantConfig()
+    storage: StorageConfig = StorageConfig()
+    quantization: QuantizationConfig = QuantizationConfig()
     embedding: EmbeddingConfig
     indexer: IndexerConfig = IndexerConfig()
     chunking: ChunkingConfig = ChunkingConfig()
     whisper: WhisperConfig = WhisperConfig()
     openai: OpenAIConfig
+    retrieval: RetrievalConfig = RetrievalConfig()
+    rewrite: RewriteConfig = RewriteConfig()
+    answer_cache: AnswerCacheConfig = AnswerCacheConfig()
+    rerank: RerankConfig = RerankConfig()
+    context: ContextConfig = ContextConfig()
     server: ServerConfig
 
     model_config = SettingsConfigDict(env_file=ENV_CONFIG_FILE, env_file_encoding="utf-8", env_nested_delimiter="__")
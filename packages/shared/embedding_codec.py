@@ -0,0 +1,53 @@
+"""Binary wire format for embedding matrices exchanged between the embedder service and its clients.
+
+Layout (little-endian): 4-byte magic ``EMB1``, uint8 dtype code, 3 padding bytes, uint32 rows,
+uint32 columns, followed by the row-major matrix. The 16-byte header keeps the payload aligned,
+so a client can wrap the response body in a NumPy array without copying it.
+"""
+
+import struct
+
+import numpy as np
+
+JSON_MEDIA_TYPE = "application/json"
+FLOAT32_MEDIA_TYPE = "application/x-embedding-float32"
+FLOAT16_MEDIA_TYPE = "application/x-embedding-float16"
+
+MEDIA_TYPES = {
+    "json": JSON_MEDIA_TYPE,
+    "float32": FLOAT32_MEDIA_TYPE,
+    "float16": FLOAT16_MEDIA_TYPE,
+}
+
+_MAGIC = b"EMB1"
+_HEADER = struct.Struct("<4sB3xII")
+_DTYPES = {1: np.dtype("<f4"), 2: np.dtype("<f2")}
+_DTYPE_CODES = {FLOAT32_MEDIA_TYPE: 1, FLOAT16_MEDIA_TYPE: 2}
+
+
+def negotiate(accept: str | None) -> str:
+    """Pick the response media type from an Accept header, falling back to JSON."""
+    if accept:
+        for part in accept.split(","):
+            media_type = part.split(";")[0].strip()
+            if media_type in _DTYPE_CODES:
+                return media_type
+    return JSON_MEDIA_TYPE
+
+
+def encode(vectors, media_type: str) -> bytes:
+    code = _DTYPE_CODES[media_type]
+    matrix = np.ascontiguousarray(vectors, dtype=_DTYPES[code])
+    if matrix.ndim != 2:
+        # An empty batch has no rows to infer the width from; it travels as (0, 0).
+        matrix = matrix.reshape(len(matrix), -1 if matrix.size else 0)
+    rows, cols = matrix.shape
+    return _HEADER.pack(_MAGIC, code, rows, cols) + matrix.tobytes()
+
+
+def decode(body: bytes) -> np.ndarray:
+    """Return a read-only (rows, cols) view over the body in its wire dtype."""
+    magic, code, rows, cols = _HEADER.unpack_from(body)
+    if magic != _MAGIC or code not in _DTYPES:
+        raise ValueError("Not an embedding matrix payload")
+    return np.frombuffer(body, dtype=_DTYPES[code], count=rows * cols, offset=_HEADER.size).reshape(rows, cols)
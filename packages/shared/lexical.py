@@ -0,0 +1,45 @@
+"""Lexical (BM25-style) sparse vectors for hybrid retrieval.
+
+Tokens are hashed into a 32-bit index space. Documents carry BM25 term-frequency saturation
+weights; the IDF part is applied by Qdrant through the sparse vector's IDF modifier, so the
+collection itself acts as the inverted index and stays consistent with the dense points.
+"""
+
+import re
+import zlib
+from collections import Counter
+
+from qdrant_client.models import SparseVector
+
+from shared.config import config
+
+# Keeps identifiers such as "cs-101", "v1.2" or "gpt-4o" whole; their parts are indexed as well.
+TOKEN_PATTERN = re.compile(r"\w+(?:[-./]\w+)*")
+SUB_TOKEN_PATTERN = re.compile(r"[-./]")
+
+
+def tokenize(text: str) -> list[str]:
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        if SUB_TOKEN_PATTERN.search(token):
+            tokens.extend(part for part in SUB_TOKEN_PATTERN.split(token) if part)
+    return tokens
+
+
+def _token_id(token: str) -> int:
+    return zlib.crc32(token.encode())
+
+
+def document_vector(text: str) -> SparseVector:
+    settings = config.retrieval
+    counts = Counter(_token_id(t) for t in tokenize(text))
+    length_norm = 1 - settings.bm25_b + settings.bm25_b * sum(counts.values()) / settings.bm25_avg_doc_length
+    indices = list(counts)
+    values = [tf * (settings.bm25_k1 + 1) / (tf + settings.bm25_k1 * length_norm) for tf in counts.values()]
+    return SparseVector(indices=indices, values=values)
+
+
+def query_vector(text: str) -> SparseVector:
+    indices = sorted({_token_id(t) for t in tokenize(text)})
+    return SparseVector(indices=indices, values=[1.0] * len(indices))
@@ -0,0 +1,200 @@
+"""In-process metrics rendered in the Prometheus text format.
+
+Histograms and gauges are registered once at import time in `REGISTRY`, optionally with
+label names; observing a value is a lock, a bisect and two additions, cheap enough to stay on in
+production. `shared.tracing.instrument` serves the registry at `/metrics`.
+"""
+
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+# Upper bounds in seconds, chosen for request latencies from tens of milliseconds to seconds.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; quantiles are reported as the upper bound of their bucket."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self._bounds = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._counts[bisect.bisect_left(self._bounds, seconds)] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self._bounds + (float("inf"),), self._counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def cumulative_counts(self) -> list[tuple[float, int]]:
+        """(upper bound, observations <= bound) pairs, ending with +inf."""
+        result, total = [], 0
+        for bound, count in zip(self._bounds + (float("inf"),), self._counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": round(self.sum / self.count, 3) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": {_format_value(bound): n for bound, n in self.cumulative_counts()},
+        }
+
+
+class _Value:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Family(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...]) -> None:
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self._children: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _new_child(self): ...
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} expects labels {self.label_names}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    @abstractmethod
+    def _samples(self) -> Iterator[str]: ...
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def _new_child(self) -> LatencyHistogram:
+        return LatencyHistogram()
+
+    @contextmanager
+    def time(self, *values: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.labels(*values).observe(time.perf_counter() - started)
+
+    def _samples(self) -> Iterator[str]:
+        for values, child in list(self._children.items()):
+            for bound, count in child.cumulative_counts():
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_label_text(self.label_names, values, le)} {count}"
+            labels = _label_text(self.label_names, values)
+            yield f"{self.name}_sum{labels} {child.sum}"
+            yield f"{self.name}_count{labels} {child.count}"
+
+
+class Gauge(_Family):
+    kind = "gauge"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    @contextmanager
+    def track(self, *values: str) -> Iterator[None]:
+        """Count the block as in flight while it runs."""
+        child = self.labels(*values)
+        child.inc()
+        try:
+            yield
+        finally:
+            child.dec()
+
+    def _samples(self) -> Iterator[str]:
+        for values, child in list(self._children.items()):
+            yield f"{self.name}{_label_text(self.label_names, values)} {child.value}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._families: dict[str, _Family] = {}
+        self._lock = threading.Lock()
+
+    def register(self, family: _Family) -> _Family:
+        with self._lock:
+            existing = self._families.get(family.name)
+            if existing is not None:
+                if type(existing) is not type(family) or existing.label_names != family.label_names:
+                    raise ValueError(f"Metric {family.name} is already registered differently")
+                return existing
+            self._families[family.name] = family
+            return family
+
+    def render(self) -> str:
+        return "\n".join(family.render() for family in list(self._families.values())) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def histogram(name: str, help_text: str, labels: tuple[str, ...] = ()) -> Histogram:
+    return REGISTRY.register(Histogram(name, help_text, labels))
+
+
+def gauge(name: str, help_text: str, labels: tuple[str, ...] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, help_text, labels))
@@ -0,0 +1,13 @@
+"""Qdrant point ids in SQLite tables.
+
+Point ids are unsigned 64-bit integers and SQLite integers are signed, so ids at or above 2**63
+are stored shifted into the negative range.
+"""
+
+
+def to_sql_id(point_id: int) -> int:
+    return point_id - (1 << 64) if point_id >= 1 << 63 else point_id
+
+
+def from_sql_id(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
@@ -0,0 +1,104 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+
+from shared.config import config, resolve_path
+from shared.point_ids import from_sql_id, to_sql_id
+from shared.types.Chunk import Chunk
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS texts (hash BLOB PRIMARY KEY, text TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS points (
+    collection TEXT NOT NULL, id INTEGER NOT NULL, hash BLOB NOT NULL, source TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL, page INTEGER, PRIMARY KEY (collection, id)
+);
+CREATE INDEX IF NOT EXISTS points_hash ON points (hash);
+CREATE TABLE IF NOT EXISTS live (slot INTEGER PRIMARY KEY CHECK (slot = 0), collection TEXT NOT NULL);
+"""
+# SQLite caps bound parameters per statement; look ids up in slices of this size.
+FETCH_SLICE = 500
+
+
+class ChunkTextStore:
+    """Chunk payloads kept next to the services instead of in the vector database.
+
+    Texts are content-addressed (sha256), so identical chunks are stored once; points map a
+    (collection, point id) to its text hash plus source, index and page. The indexer writes,
+    chat reads the rows of the collection marked live, so a collection being rebuilt under new
+    texts never changes what chat sees until `set_live` switches to it.
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.logger = logging.getLogger(self.__class__.__name__)
+        path = path or resolve_path(config.storage.text_store_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    @property
+    def live_collection(self) -> str | None:
+        with self._lock:
+            row = self._db.execute("SELECT collection FROM live").fetchone()
+        return row[0] if row else None
+
+    def set_live(self, collection: str) -> None:
+        """Serve the texts of `collection` from now on."""
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO live (slot, collection) VALUES (0, ?)", (collection,))
+            self._db.commit()
+
+    def put_many(self, collection: str, items: list[tuple[int, Chunk]]) -> None:
+        if not items:
+            return
+        texts = {hashlib.sha256(c.text.encode()).digest(): c.text for _, c in items}
+        rows = [
+            (collection, to_sql_id(point_id), hashlib.sha256(c.text.encode()).digest(), c.source, c.index, c.page)
+            for point_id, c in items
+        ]
+        with self._lock:
+            self._db.executemany("INSERT OR IGNORE INTO texts (hash, text) VALUES (?, ?)", texts.items())
+            self._db.executemany(
+                "INSERT OR REPLACE INTO points (collection, id, hash, source, chunk_index, page) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._db.commit()
+
+    def get_many(self, point_ids: list[int]) -> dict[int, dict]:
+        """Payloads ({text, source, index, page}) of the live collection for the ids that are stored."""
+        payloads: dict[int, dict] = {}
+        with self._lock:
+            for start in range(0, len(point_ids), FETCH_SLICE):
+                ids = [to_sql_id(i) for i in point_ids[start:start + FETCH_SLICE]]
+                cursor = self._db.execute(
+                    "SELECT p.id, t.text, p.source, p.chunk_index, p.page FROM points p JOIN texts t ON t.hash = p.hash "
+                    "WHERE p.collection = (SELECT collection FROM live) "
+                    f"AND p.id IN ({','.join('?' * len(ids))})",
+                    ids,
+                )
+                for point_id, text, source, index, page in cursor:
+                    payloads[from_sql_id(point_id)] = {"text": text, "source": source, "index": index, "page": page}
+        return payloads
+
+    def delete_many(self, collection: str, point_ids: list[int]) -> None:
+        if not point_ids:
+            return
+        with self._lock:
+            self._db.executemany(
+                "DELETE FROM points WHERE collection = ? AND id = ?", [(collection, to_sql_id(i)) for i in point_ids]
+            )
+            self._db.execute("DELETE FROM texts WHERE hash NOT IN (SELECT hash FROM points)")
+            self._db.commit()
+
+    def drop_collection(self, collection: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM points WHERE collection = ?", (collection,))
+            self._db.execute("DELETE FROM texts WHERE hash NOT IN (SELECT hash FROM points)")
+            self._db.commit()
+        self.logger.info("Chunk texts of '%s' deleted", collection)
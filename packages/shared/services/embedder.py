@@ -1,31 +1,150 @@
+import asyncio
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import httpx
+import numpy as np
 
+from shared import embedding_codec, metrics
+from shared.tracing import request_headers
 from shared.types.Chunk import Chunk
 from shared.config import config
 
 SERVICE_ENDPOINT = config.embedding.public_url
+RERANK_ENDPOINT = config.rerank.public_url or SERVICE_ENDPOINT.rsplit("/", 1)[0] + "/rerank"
+BATCH_SIZE = config.embedding.batch_size
+MAX_CONCURRENCY = config.embedding.max_concurrency
+MAX_RETRIES = config.embedding.max_retries
+RETRY_BACKOFF = config.embedding.retry_backoff
+TIMEOUT = httpx.Timeout(config.embedding.timeout, connect=5.0)
+LIMITS = httpx.Limits(max_connections=MAX_CONCURRENCY, max_keepalive_connections=MAX_CONCURRENCY)
+
+REQUEST_HEADERS = {"Accept": embedding_codec.MEDIA_TYPES[config.embedding.wire_format]}
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+CLIENT_SECONDS = metrics.histogram(
+    "embedder_client_request_seconds", "Embedder service call duration, retries included", ("operation",)
+)
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, httpx.TransportError)
+
+
+def _parse_response(response: httpx.Response) -> np.ndarray:
+    if response.headers.get("content-type", "").startswith(embedding_codec.JSON_MEDIA_TYPE):
+        return np.asarray(response.json()["embeddings"], dtype=np.float32)
+    return embedding_codec.decode(response.content)
+
+
+def _concat(batches: list[np.ndarray]) -> np.ndarray:
+    return batches[0] if len(batches) == 1 else np.concatenate(batches)
+
+
+def _split_batches(texts: list[str]) -> list[list[str]]:
+    return [texts[i : i + BATCH_SIZE] for i in range(0, len(texts), BATCH_SIZE)]
 
 
 class Embedder:
+    """Client for the embedder service.
+
+    Inputs are split into micro-batches of `batch_size` texts that are sent concurrently over a
+    shared keep-alive connection pool and retried with exponential backoff; results keep input order.
+    Vectors are returned as a (n, dim) NumPy array decoded from the binary wire format selected by
+    `embedding.wire_format`; a single batch is returned as a view over the response body.
+    """
+
     def __init__(self) -> None:
         self.logger = logging.getLogger(self.__class__.__name__)
+        self._client = httpx.Client(timeout=TIMEOUT, limits=LIMITS)
+        self._async_client: httpx.AsyncClient | None = None
+        self._executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="embedder")
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the event loop of the service that uses it.
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(timeout=TIMEOUT, limits=LIMITS)
+        return self._async_client
+
+    def _post_batch(self, texts: list[str]) -> np.ndarray:
+        with CLIENT_SECONDS.time("embed"):
+            return self._post_batch_with_retries(texts)
+
+    def _post_batch_with_retries(self, texts: list[str]) -> np.ndarray:
+        headers = REQUEST_HEADERS | request_headers()
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                response = self._client.post(SERVICE_ENDPOINT, json={"inputs": texts}, headers=headers)
+                response.raise_for_status()
+                return _parse_response(response)
+            except httpx.HTTPError as e:
+                if attempt == MAX_RETRIES or not _is_retryable(e):
+                    raise
+                delay = RETRY_BACKOFF * 2**attempt
+                self.logger.warning("Embedding batch failed (%s), retrying in %.1fs", e, delay)
+                time.sleep(delay)
+
+    async def _apost(
+        self, url: str, body: dict, semaphore: asyncio.Semaphore, headers: dict | None = None
+    ) -> httpx.Response:
+        client = self._get_async_client()
+        headers = (headers or {}) | request_headers()
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                async with semaphore:
+                    response = await client.post(url, json=body, headers=headers)
+                response.raise_for_status()
+                return response
+            except httpx.HTTPError as e:
+                if attempt == MAX_RETRIES or not _is_retryable(e):
+                    raise
+                delay = RETRY_BACKOFF * 2**attempt
+                self.logger.warning("Request to %s failed (%s), retrying in %.1fs", url, e, delay)
+                await asyncio.sleep(delay)
+
+    async def _apost_batch(self, texts: list[str], semaphore: asyncio.Semaphore) -> np.ndarray:
+        with CLIENT_SECONDS.time("embed"):
+            response = await self._apost(SERVICE_ENDPOINT, {"inputs": texts}, semaphore, REQUEST_HEADERS)
+        return _parse_response(response)
+
+    def embed_texts(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, config.embedding.vector_size), dtype=np.float32)
+        batches = _split_batches(texts)
+        if len(batches) == 1:
+            return self._post_batch(batches[0])
+        return _concat(list(self._executor.map(self._post_batch, batches)))
+
+    async def aembed_texts(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, config.embedding.vector_size), dtype=np.float32)
+        semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+        return _concat(await asyncio.gather(*(self._apost_batch(batch, semaphore) for batch in _split_batches(texts))))
+
+    def embed_chunks(self, chunks: list[Chunk]) -> np.ndarray:
+        return self.embed_texts([c.text for c in chunks])
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self.embed_texts([text])[0]
+
+    async def aembed_chunks(self, chunks: list[Chunk]) -> np.ndarray:
+        return await self.aembed_texts([c.text for c in chunks])
+
+    async def aembed_query(self, text: str) -> np.ndarray:
+        return (await self.aembed_texts([text]))[0]
 
-    def embed_chunks(self, chunks: list[Chunk]) -> list[list[float]]:
-        if not chunks:
-            return []
-        texts = [c.text for c in chunks]
-        response = httpx.post(
-            SERVICE_ENDPOINT,
-            json={"inputs": texts},
-            timeout=60.0,
-        )
-        response.raise_for_status()
-        return response.json()["embeddings"]
-
-    def embed_query(self, text: str) -> list[float]:
-        return self.embed_chunks([Chunk(text=text, source="", index=0)])[0]
+    async def arerank(self, query: str, passages: list[str]) -> np.ndarray:
+        """Cross-encoder relevance of each passage to the query, in input order."""
+        if not passages:
+            return np.empty(0, dtype=np.float32)
+        body = {"query": query, "passages": passages}
+        with CLIENT_SECONDS.time("rerank"):
+            response = await self._apost(RERANK_ENDPOINT, body, asyncio.Semaphore(MAX_CONCURRENCY))
+        return np.asarray(response.json()["scores"], dtype=np.float32)
 
 
 embedder = Embedder()
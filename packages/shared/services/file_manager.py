@@ -3,7 +3,7 @@ from pathlib import Path
 from typing import Iterator
 from urllib.parse import quote
 
-from shared.config import config
+from shared.config import config, resolve_path
 
 
 class FileManager:
@@ -13,7 +13,7 @@ class FileManager:
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._instance.logger = logging.getLogger(cls.__name__)
-            cls._instance._knowledge_base_dir = Path(__file__).parent.parent.parent.parent / "knowledge_base"
+            cls._instance._knowledge_base_dir = resolve_path(config.indexer.knowledge_base_dir)
         return cls._instance
 
     @property
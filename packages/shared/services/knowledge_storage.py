@@ -1,67 +1,619 @@
+import asyncio
 import hashlib
 import logging
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import cached_property
 
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, PointStruct, ScoredPoint, VectorParams, FilterSelector, Filter
+import numpy as np
 
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    CollectionStatus,
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+    Disabled,
+    Distance,
+    Filter,
+    FilterSelector,
+    HasIdCondition,
+    Modifier,
+    OptimizersConfigDiff,
+    PointIdsList,
+    PointStruct,
+    QuantizationSearchParams,
+    QueryRequest,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    ScoredPoint,
+    SearchParams,
+    SparseVectorParams,
+    VectorParams,
+    VectorParamsDiff,
+)
+
+from shared import lexical, metrics
 from shared.config import config
+from shared.services.chunk_store import ChunkTextStore
 from shared.types.Chunk import Chunk
 
 QRANT_HOST = config.qdrant.host
 QRANT_PORT = config.qdrant.port
+QRANT_GRPC_PORT = config.qdrant.grpc_port
+PREFER_GRPC = config.qdrant.prefer_grpc
+# An alias of the live versioned collection (<collection>_v<n>); all queries go through it.
 QRANT_COLLECTION_NAME = config.qdrant.collection
+VERSIONED_COLLECTION = re.compile(rf"^{re.escape(QRANT_COLLECTION_NAME)}_v(\d+)$")
+# Holds a single point whose payload carries the index generation shared with the chat service.
+META_COLLECTION_NAME = f"{QRANT_COLLECTION_NAME}_meta"
+GENERATION_POINT_ID = 0
 
 DEFAULT_SEARCH_LIMIT = config.qdrant.search_k
 VECTOR_SIZE = config.embedding.vector_size
+DENSE_VECTOR_NAME = ""
+LEXICAL_VECTOR_NAME = "lexical"
+HYBRID_ENABLED = config.retrieval.hybrid_enabled
+QUANTIZATION = config.quantization
+# Qdrant's own default, restored when a paused collection has no earlier threshold to go back to.
+DEFAULT_INDEXING_THRESHOLD = 10000
 
+STORAGE_SECONDS = metrics.histogram("storage_operation_seconds", "Vector storage call duration", ("operation",))
 
-class KnowledgeStorage:
-    def __init__(self) -> None:
-        self.logger = logging.getLogger(self.__class__.__name__)
-        self._client = QdrantClient(host=QRANT_HOST, port=QRANT_PORT)
-        self._check_collection_on_init()
-
-    def _check_collection_on_init(self) -> None:
-        if self._client.collection_exists(collection_name=QRANT_COLLECTION_NAME):
-            return
 
-        self._client.create_collection(
-            collection_name=QRANT_COLLECTION_NAME,
-            vectors_config=VectorParams(size=VECTOR_SIZE, distance=Distance.COSINE),
+def _quantization_config() -> ScalarQuantization | BinaryQuantization | None:
+    if QUANTIZATION.mode == "scalar":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8,
+                quantile=QUANTIZATION.scalar_quantile,
+                always_ram=QUANTIZATION.always_ram,
+            )
         )
-        self.logger.info("Created collection '%s'", QRANT_COLLECTION_NAME)
+    if QUANTIZATION.mode == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=QUANTIZATION.always_ram))
+    return None
+
+
+def _search_params() -> SearchParams | None:
+    # Quantized vectors pick `limit * oversampling` candidates; rescoring re-ranks them with the originals.
+    if QUANTIZATION.mode == "none":
+        return None
+    return SearchParams(
+        quantization=QuantizationSearchParams(rescore=QUANTIZATION.rescore, oversampling=QUANTIZATION.oversampling)
+    )
+
+
+def _originals_on_disk() -> bool:
+    return QUANTIZATION.mode != "none" and QUANTIZATION.originals_on_disk
+
+
+def _same_quantization(current, desired) -> bool:
+    if desired is None or current is None:
+        return desired is None and current is None
+    if type(current) is not type(desired):
+        return False
+    # The server fills in defaults, so only compare what we set.
+    current_values = current.model_dump(exclude_none=True)
+    return all(
+        current_values.get(key, {}).get(field) == value
+        for key, fields in desired.model_dump(exclude_none=True).items()
+        for field, value in fields.items()
+    )
+
+
+class KnowledgeStorage(ABC):
+    """Vector storage; `KnowledgeStorage()` builds the backend selected by `storage.backend`.
+
+    Backends store points with a dense vector and the chunk payload, answer dense and lexical
+    top-k queries and keep the index generation read by the chat caches.
+    """
+
+    def __new__(cls) -> "KnowledgeStorage":
+        if cls is KnowledgeStorage:
+            if config.storage.backend == "numpy":
+                from shared.services.numpy_storage import NumpyStorage
+
+                cls = NumpyStorage
+            else:
+                cls = QdrantStorage
+        return super().__new__(cls)
+
+    def __init__(self) -> None:
+        self.logger = logging.getLogger(self.__class__.__name__)
 
     def _make_point_id(self, source: str, index: int) -> int:
         digest = hashlib.sha256(f"{source}:{index}".encode()).digest()
         return int.from_bytes(digest[:8], "big")
 
-    def add_chunks(self, chunks: list[Chunk], vectors: list[list[float]]) -> None:
+    def _point_vector(self, chunk: Chunk, vector: np.ndarray):
+        return vector
+
+    def _point_payload(self, chunk: Chunk) -> dict:
+        return {"text": chunk.text, "source": chunk.source, "index": chunk.index, "page": chunk.page}
+
+    def add_chunks(self, chunks: list[Chunk], vectors: np.ndarray) -> list[int]:
         if not chunks:
-            return
+            return []
         points = [
             PointStruct(
                 id=self._make_point_id(c.source, c.index),
-                vector=vectors[i],
-                payload={"text": c.text, "source": c.source, "index": c.index},
+                vector=self._point_vector(c, vectors[i]),
+                payload=self._point_payload(c),
             )
             for i, c in enumerate(chunks)
         ]
         self.upsert(points)
+        return [p.id for p in points]
+
+    @abstractmethod
+    def upsert(self, points: list[PointStruct]) -> None: ...
+
+    @contextmanager
+    def bulk_load(self) -> Iterator[None]:
+        """Wrap many `add_chunks` calls; a backend may defer applying them until the block exits.
+
+        Callers can only rely on the writes being applied after the block. The NumPy backend
+        writes them immediately, so this default does nothing.
+        """
+        yield
+
+    @abstractmethod
+    def delete_points(self, point_ids: list[int]) -> None: ...
+
+    @abstractmethod
+    def count(self) -> int: ...
+
+    @abstractmethod
+    def search(self, vector: np.ndarray, k: int = DEFAULT_SEARCH_LIMIT) -> list[ScoredPoint]: ...
+
+    @abstractmethod
+    def search_lexical(self, text: str, k: int = DEFAULT_SEARCH_LIMIT) -> list[ScoredPoint]: ...
+
+    async def asearch(self, vector: np.ndarray, k: int = DEFAULT_SEARCH_LIMIT) -> list[ScoredPoint]:
+        return await asyncio.to_thread(self.search, vector, k)
+
+    async def asearch_lexical(self, text: str, k: int = DEFAULT_SEARCH_LIMIT) -> list[ScoredPoint]:
+        return await asyncio.to_thread(self.search_lexical, text, k)
+
+    async def asearch_batch(
+        self, vectors: np.ndarray, texts: list[str] | None = None, k: int = DEFAULT_SEARCH_LIMIT
+    ) -> tuple[list[list[ScoredPoint]], list[list[ScoredPoint]]]:
+        """Dense results per vector and, when `texts` are given, lexical results per text."""
+        dense = await asyncio.gather(*(self.asearch(vector, k) for vector in vectors))
+        lexical_results = await asyncio.gather(*(self.asearch_lexical(text, k) for text in texts or []))
+        return list(dense), list(lexical_results)
+
+    def fetch_payloads(self, points: list[ScoredPoint]) -> list[ScoredPoint]:
+        """Fill in payloads for search results; backends that return them with the hits keep them as they are."""
+        return points
+
+    async def afetch_payloads(self, points: list[ScoredPoint]) -> list[ScoredPoint]:
+        return await asyncio.to_thread(self.fetch_payloads, points)
+
+    @abstractmethod
+    def has_lexical_index(self) -> bool: ...
+
+    @abstractmethod
+    def get_generation(self) -> int: ...
+
+    async def aget_generation(self) -> int:
+        return await asyncio.to_thread(self.get_generation)
+
+    @abstractmethod
+    def bump_generation(self) -> int:
+        """Mark the collection content as changed; caches derived from it compare generations."""
+
+    @abstractmethod
+    def reset_storage(self) -> None: ...
+
+    def begin_rebuild(self) -> bool:
+        """Start writing a complete new index that replaces the current one on `commit_rebuild`.
+
+        Returns False when the backend cannot build it next to the live index; the storage is
+        then reset instead and readers see it fill up.
+        """
+        self.reset_storage()
+        return False
+
+    def commit_rebuild(self, stop_event: threading.Event | None = None) -> bool:
+        """Make the index written since `begin_rebuild` the live one.
+
+        Returns False if it cannot go live; the caller then aborts the rebuild.
+        """
+        return True
+
+    def abort_rebuild(self) -> None:
+        """Drop the index written since `begin_rebuild`; the live one is left as it was."""
+
+
+class QdrantStorage(KnowledgeStorage):
+    def __init__(self) -> None:
+        super().__init__()
+        self._client = QdrantClient(
+            host=QRANT_HOST, port=QRANT_PORT, grpc_port=QRANT_GRPC_PORT, prefer_grpc=PREFER_GRPC
+        )
+        self._last_upserted: int | None = None
+        # Writes go to the shadow collection during a rebuild and through the alias otherwise.
+        self._write_collection = QRANT_COLLECTION_NAME
+        self._text_store = ChunkTextStore() if config.storage.text_store else None
+        self._check_collection_on_init()
+        if self._text_store is not None and self._text_store.live_collection is None:
+            self._text_store.set_live(self._live_collection())
+
+    @cached_property
+    def _async_client(self) -> AsyncQdrantClient:
+        # Created on first use from inside the event loop of the service that queries it.
+        return AsyncQdrantClient(host=QRANT_HOST, port=QRANT_PORT, grpc_port=QRANT_GRPC_PORT, prefer_grpc=PREFER_GRPC)
+
+    @cached_property
+    def _upsert_pool(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=config.qdrant.upsert_parallel, thread_name_prefix="qdrant-upsert")
+
+    def _check_collection_on_init(self) -> None:
+        if not self._client.collection_exists(collection_name=META_COLLECTION_NAME):
+            self._client.create_collection(
+                collection_name=META_COLLECTION_NAME,
+                vectors_config=VectorParams(size=1, distance=Distance.DOT),
+            )
+
+        if self._client.collection_exists(collection_name=QRANT_COLLECTION_NAME):
+            self._migrate_quantization()
+            return
+        first = self._next_collection_name()
+        self._create_collection(first)
+        self._point_alias(first)
+
+    def _live_collection(self) -> str:
+        """The collection behind the alias, or the name itself for a collection created before aliases."""
+        for alias in self._client.get_aliases().aliases:
+            if alias.alias_name == QRANT_COLLECTION_NAME:
+                return alias.collection_name
+        return QRANT_COLLECTION_NAME
+
+    def _next_collection_name(self) -> str:
+        versions = [
+            int(match.group(1))
+            for collection in self._client.get_collections().collections
+            if (match := VERSIONED_COLLECTION.match(collection.name))
+        ]
+        return f"{QRANT_COLLECTION_NAME}_v{max(versions, default=0) + 1}"
+
+    def _point_alias(self, collection: str) -> None:
+        """Move the alias to `collection` in one atomic request."""
+        operations = [
+            CreateAliasOperation(create_alias=CreateAlias(collection_name=collection, alias_name=QRANT_COLLECTION_NAME))
+        ]
+        if self._live_collection() != QRANT_COLLECTION_NAME:
+            operations.insert(0, DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=QRANT_COLLECTION_NAME)))
+        elif self._client.collection_exists(collection_name=QRANT_COLLECTION_NAME):
+            # A collection from before aliases holds the name. It has to go first, so this one
+            # switch leaves a moment without a collection.
+            self._drop_collection(QRANT_COLLECTION_NAME)
+        self._client.update_collection_aliases(change_aliases_operations=operations)
+        if self._text_store is not None:
+            self._text_store.set_live(collection)
+        self.logger.info("Alias '%s' now points to '%s'", QRANT_COLLECTION_NAME, collection)
+
+    def _drop_collection(self, collection: str) -> None:
+        self._client.delete_collection(collection_name=collection)
+        if self._text_store is not None:
+            self._text_store.drop_collection(collection)
+        self.logger.info("Dropped collection '%s'", collection)
+
+    def _text_collection(self) -> str:
+        """The collection whose chunk texts writes go to: the shadow during a rebuild, else the live one."""
+        if self._write_collection != QRANT_COLLECTION_NAME:
+            return self._write_collection
+        return self._text_store.live_collection or self._live_collection()
+
+    def _collect_garbage(self) -> None:
+        """Drop versioned collections that are neither live nor being written, e.g. left by an interrupted rebuild."""
+        live = self._live_collection()
+        for collection in self._client.get_collections().collections:
+            if VERSIONED_COLLECTION.match(collection.name) and collection.name not in (live, self._write_collection):
+                self._drop_collection(collection.name)
+
+    def begin_rebuild(self) -> bool:
+        """Create a new versioned collection and send all writes to it until the rebuild ends.
+
+        Chat keeps querying the old collection through the alias meanwhile, and the text store
+        keeps the new texts apart until the switch.
+        """
+        self._collect_garbage()
+        shadow = self._next_collection_name()
+        self._create_collection(shadow)
+        self._write_collection = shadow
+        return True
+
+    def _wait_until_indexed(self, collection: str, stop_event: threading.Event | None) -> bool:
+        """Wait for Qdrant's optimizer; False if the collection failed or the run was stopped."""
+        self.logger.info("Waiting for '%s' to finish indexing before switching to it", collection)
+        deadline = time.monotonic() + config.qdrant.rebuild_index_timeout_seconds
+        while True:
+            status = self._client.get_collection(collection_name=collection).status
+            if status == CollectionStatus.RED:
+                self.logger.error("Collection '%s' failed, keeping the current one", collection)
+                return False
+            # Grey means optimizations are pending but not started; the points are all searchable.
+            if status in (CollectionStatus.GREEN, CollectionStatus.GREY):
+                return True
+            if stop_event is not None and stop_event.is_set():
+                return False
+            if time.monotonic() >= deadline:
+                self.logger.warning("'%s' is still being indexed, switching to it anyway", collection)
+                return True
+            if stop_event is not None:
+                stop_event.wait(1.0)
+            else:
+                time.sleep(1.0)
+
+    def commit_rebuild(self, stop_event: threading.Event | None = None) -> bool:
+        """Switch the alias once the new collection is indexed, then drop the old one."""
+        shadow = self._write_collection
+        if not self._wait_until_indexed(shadow, stop_event):
+            return False
+        self._point_alias(shadow)
+        self._write_collection = QRANT_COLLECTION_NAME
+        self._collect_garbage()
+        return True
+
+    def abort_rebuild(self) -> None:
+        shadow = self._write_collection
+        self._write_collection = QRANT_COLLECTION_NAME
+        self._drop_collection(shadow)
+
+    def _create_collection(self, collection: str) -> None:
+        self._client.create_collection(
+            collection_name=collection,
+            vectors_config=VectorParams(size=VECTOR_SIZE, distance=Distance.COSINE, on_disk=_originals_on_disk()),
+            sparse_vectors_config=(
+                {LEXICAL_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)} if HYBRID_ENABLED else None
+            ),
+            quantization_config=_quantization_config(),
+        )
+        self.logger.info("Created collection '%s' (quantization: %s)", collection, QUANTIZATION.mode)
+
+    def _migrate_quantization(self) -> None:
+        """Bring an existing collection to the configured quantization without reindexing.
+
+        Qdrant builds (or drops) the quantized vectors in the background; queries keep working
+        against the original vectors meanwhile.
+        """
+        live = self._live_collection()
+        collection = self._client.get_collection(collection_name=live).config
+        desired = _quantization_config()
+        dense = collection.params.vectors
+        if isinstance(dense, dict):
+            dense = dense.get(DENSE_VECTOR_NAME)
+        on_disk = bool(dense.on_disk) if dense is not None else False
+        if _same_quantization(collection.quantization_config, desired) and on_disk == _originals_on_disk():
+            return
+
+        self._client.update_collection(
+            collection_name=live,
+            vectors_config={DENSE_VECTOR_NAME: VectorParamsDiff(on_disk=_originals_on_disk())},
+            quantization_config=desired if desired is not None else Disabled.DISABLED,
+        )
+        self.logger.info("Migrating collection '%s' to quantization: %s", live, QUANTIZATION.mode)
+
+    def has_lexical_index(self) -> bool:
+        params = self._client.get_collection(collection_name=self._live_collection()).config.params
+        return LEXICAL_VECTOR_NAME in (params.sparse_vectors or {})
+
+    def _point_vector(self, chunk: Chunk, vector: np.ndarray):
+        if not HYBRID_ENABLED:
+            return vector
+        return {DENSE_VECTOR_NAME: vector, LEXICAL_VECTOR_NAME: lexical.document_vector(chunk.text)}
+
+    def _point_payload(self, chunk: Chunk) -> dict:
+        # With the text store the point carries vectors only; the text is written by add_chunks.
+        return {} if self._text_store is not None else super()._point_payload(chunk)
+
+    def add_chunks(self, chunks: list[Chunk], vectors: np.ndarray) -> list[int]:
+        if self._text_store is not None:
+            # Text first, so a search never returns an id whose text is not stored yet.
+            self._text_store.put_many(
+                self._text_collection(), [(self._make_point_id(c.source, c.index), c) for c in chunks]
+            )
+        return super().add_chunks(chunks, vectors)
+
+    def _upsert_batch(self, points: list[PointStruct]) -> None:
+        self._client.upsert(collection_name=self._write_collection, points=points, wait=config.qdrant.upsert_wait)
 
     def upsert(self, points: list[PointStruct]) -> None:
         if not points:
             return
-        self._client.upsert(collection_name=QRANT_COLLECTION_NAME, points=points)
+        size = config.qdrant.upsert_batch_size
+        batches = [points[start : start + size] for start in range(0, len(points), size)]
+        with STORAGE_SECONDS.time("upsert"):
+            if len(batches) == 1 or config.qdrant.upsert_parallel <= 1:
+                for batch in batches:
+                    self._upsert_batch(batch)
+            else:
+                # Waits for every acknowledgement and re-raises the first failure.
+                list(self._upsert_pool.map(self._upsert_batch, batches))
+        self._last_upserted = points[-1].id
+
+    def flush(self) -> None:
+        """Block until every acknowledged upsert has been applied.
 
-    def search(self, vector: list[float], k: int = DEFAULT_SEARCH_LIMIT) -> list[ScoredPoint]:
-        result = self._client.query_points(
-            collection_name=QRANT_COLLECTION_NAME,
-            query=vector,
-            limit=k,
+        Qdrant applies a collection's updates in the order it acknowledged them, so one update
+        sent with wait=True after the others is a barrier for all of them. It sets an empty
+        payload through a filter, which leaves the point unchanged and matches nothing if the
+        point was deleted since.
+        """
+        if self._last_upserted is None or config.qdrant.upsert_wait:
+            return
+        with STORAGE_SECONDS.time("flush"):
+            self._client.set_payload(
+                collection_name=self._write_collection,
+                payload={},
+                points=Filter(must=[HasIdCondition(has_id=[self._last_upserted])]),
+                wait=True,
+            )
+        self._last_upserted = None
+
+    def _indexing_threshold(self, collection: str) -> int | None:
+        return self._client.get_collection(collection_name=collection).config.optimizer_config.indexing_threshold
+
+    def _set_indexing_threshold(self, collection: str, threshold: int) -> None:
+        self._client.update_collection(
+            collection_name=collection, optimizers_config=OptimizersConfigDiff(indexing_threshold=threshold)
         )
+
+    @contextmanager
+    def bulk_load(self) -> Iterator[None]:
+        """Flush at the end; with `pause_indexing_during_bulk` no HNSW index is built until then.
+
+        Segments written while indexing is paused are searched exhaustively, so results stay
+        correct but slower until Qdrant has indexed them after the load.
+        """
+        # Settings are changed on the collection itself rather than through the alias.
+        rebuilding = self._write_collection != QRANT_COLLECTION_NAME
+        collection = self._write_collection if rebuilding else self._live_collection()
+        restore = None
+        if config.qdrant.pause_indexing_during_bulk:
+            # 0 means a previous load was interrupted before it could restore the threshold.
+            restore = self._indexing_threshold(collection) or DEFAULT_INDEXING_THRESHOLD
+            self._set_indexing_threshold(collection, 0)
+            self.logger.info("Paused HNSW indexing of '%s' for the bulk load", collection)
+        try:
+            yield
+            self.flush()
+        finally:
+            if restore is not None:
+                self._set_indexing_threshold(collection, restore)
+                self.logger.info("Resumed HNSW indexing of '%s' (threshold %d KB)", collection, restore)
+
+    def delete_points(self, point_ids: list[int]) -> None:
+        if not point_ids:
+            return
+        self._client.delete(collection_name=self._write_collection, points_selector=PointIdsList(points=point_ids))
+        if self._text_store is not None:
+            self._text_store.delete_many(self._text_collection(), point_ids)
+
+    def count(self) -> int:
+        return self._client.count(collection_name=QRANT_COLLECTION_NAME, exact=True).count
+
+    def search(self, vector: np.ndarray, k: int = DEFAULT_SEARCH_LIMIT) -> list[ScoredPoint]:
+        with STORAGE_SECONDS.time("search"):
+            result = self._client.query_points(
+                collection_name=QRANT_COLLECTION_NAME,
+                query=vector,
+                limit=k,
+                search_params=_search_params(),
+                with_payload=self._text_store is None,
+            )
         return result.points
 
+    async def asearch(self, vector: np.ndarray, k: int = DEFAULT_SEARCH_LIMIT) -> list[ScoredPoint]:
+        with STORAGE_SECONDS.time("search"):
+            result = await self._async_client.query_points(
+                collection_name=QRANT_COLLECTION_NAME,
+                query=vector,
+                limit=k,
+                search_params=_search_params(),
+                with_payload=self._text_store is None,
+            )
+        return result.points
+
+    def search_lexical(self, text: str, k: int = DEFAULT_SEARCH_LIMIT) -> list[ScoredPoint]:
+        query = lexical.query_vector(text)
+        if not query.indices:
+            return []
+        with STORAGE_SECONDS.time("search_lexical"):
+            result = self._client.query_points(
+                collection_name=QRANT_COLLECTION_NAME,
+                query=query,
+                using=LEXICAL_VECTOR_NAME,
+                limit=k,
+                with_payload=self._text_store is None,
+            )
+        return result.points
+
+    async def asearch_lexical(self, text: str, k: int = DEFAULT_SEARCH_LIMIT) -> list[ScoredPoint]:
+        query = lexical.query_vector(text)
+        if not query.indices:
+            return []
+        with STORAGE_SECONDS.time("search_lexical"):
+            result = await self._async_client.query_points(
+                collection_name=QRANT_COLLECTION_NAME,
+                query=query,
+                using=LEXICAL_VECTOR_NAME,
+                limit=k,
+                with_payload=self._text_store is None,
+            )
+        return result.points
+
+    def fetch_payloads(self, points: list[ScoredPoint]) -> list[ScoredPoint]:
+        if self._text_store is None or not points:
+            return points
+        with STORAGE_SECONDS.time("fetch_payloads"):
+            return self._fetch_payloads(points)
+
+    def _fetch_payloads(self, points: list[ScoredPoint]) -> list[ScoredPoint]:
+        payloads = self._text_store.get_many([p.id for p in points])
+        missing = [p.id for p in points if p.id not in payloads]
+        if missing:
+            # Points indexed before the text store was enabled still carry their payload.
+            for record in self._client.retrieve(collection_name=QRANT_COLLECTION_NAME, ids=missing, with_payload=True):
+                if record.payload:
+                    payloads[record.id] = record.payload
+        return [p.model_copy(update={"payload": payloads[p.id]}) for p in points if p.id in payloads]
+
+    async def asearch_batch(
+        self, vectors: np.ndarray, texts: list[str] | None = None, k: int = DEFAULT_SEARCH_LIMIT
+    ) -> tuple[list[list[ScoredPoint]], list[list[ScoredPoint]]]:
+        # All dense and lexical queries go to Qdrant in a single round trip.
+        with_payload = self._text_store is None
+        requests = [
+            QueryRequest(query=vector, limit=k, params=_search_params(), with_payload=with_payload)
+            for vector in vectors
+        ]
+        lexical_queries = [lexical.query_vector(text) for text in texts or []]
+        requests += [
+            QueryRequest(query=query, using=LEXICAL_VECTOR_NAME, limit=k, with_payload=with_payload)
+            for query in lexical_queries
+            if query.indices
+        ]
+        with STORAGE_SECONDS.time("search_batch"):
+            responses = iter(await self._async_client.query_batch_points(
+                collection_name=QRANT_COLLECTION_NAME, requests=requests
+            ))
+        dense = [next(responses).points for _ in vectors]
+        lexical_results = [next(responses).points if query.indices else [] for query in lexical_queries]
+        return dense, lexical_results
+
+    def get_generation(self) -> int:
+        points = self._client.retrieve(collection_name=META_COLLECTION_NAME, ids=[GENERATION_POINT_ID])
+        return points[0].payload.get("generation", 0) if points else 0
+
+    async def aget_generation(self) -> int:
+        points = await self._async_client.retrieve(collection_name=META_COLLECTION_NAME, ids=[GENERATION_POINT_ID])
+        return points[0].payload.get("generation", 0) if points else 0
+
+    def bump_generation(self) -> int:
+        generation = self.get_generation() + 1
+        self._client.upsert(
+            collection_name=META_COLLECTION_NAME,
+            points=[PointStruct(id=GENERATION_POINT_ID, vector=[1.0], payload={"generation": generation})],
+        )
+        self.logger.info("Index generation is now %d", generation)
+        return generation
+
     def reset_storage(self) -> None:
-        self._client.delete(collection_name=QRANT_COLLECTION_NAME, points_selector=FilterSelector(filter=Filter()))
+        self._client.delete(collection_name=self._write_collection, points_selector=FilterSelector(filter=Filter()))
+        if self._text_store is not None:
+            self._text_store.drop_collection(self._text_collection())
 
-        self.logger.info("Knowledge storage reset: all points deleted from collection '%s'", QRANT_COLLECTION_NAME)
+        self.logger.info("Knowledge storage reset: all points deleted from collection '%s'", self._write_collection)
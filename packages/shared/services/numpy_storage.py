@@ -0,0 +1,387 @@
+"""In-process vector storage: a memory-mapped float32 matrix with a SQLite payload sidecar.
+
+Layout under `<storage.path>/<collection>/`:
+
+- `vectors.f32` - row-major float32 matrix of L2-normalized vectors, grown in place.
+- `points.sqlite` - point id -> row, payloads, free rows, an FTS5 table for lexical search and
+  a meta table holding the index generation and a revision counter.
+
+Every write bumps the revision; the writer applies its own changes to the in-memory row mapping,
+other processes (the chat service reads what the indexer wrote) compare the revision before
+searching and reload the mapping when it changed. The IVF index is trained in a background
+thread; new rows are assigned to its lists as they arrive and searches scan exhaustively until
+the first training is done.
+"""
+
+import json
+import sqlite3
+import threading
+
+import numpy as np
+from qdrant_client.models import PointStruct, ScoredPoint
+
+from shared import lexical
+from shared.config import config, resolve_path
+from shared.point_ids import from_sql_id, to_sql_id
+from shared.services.knowledge_storage import (
+    DEFAULT_SEARCH_LIMIT,
+    DENSE_VECTOR_NAME,
+    QRANT_COLLECTION_NAME,
+    STORAGE_SECONDS,
+    VECTOR_SIZE,
+    KnowledgeStorage,
+)
+
+INITIAL_CAPACITY = 1024
+IVF_TRAIN_SAMPLE = 50_000
+IVF_ITERATIONS = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS points (row INTEGER PRIMARY KEY, id INTEGER NOT NULL UNIQUE, payload TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS free_rows (row INTEGER PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE VIRTUAL TABLE IF NOT EXISTS lexical USING fts5(text);
+"""
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class _IvfIndex:
+    """Coarse k-means partition of the rows; a query scores only the rows of its closest lists."""
+
+    def __init__(self, vectors: np.ndarray, rows: np.ndarray, n_lists: int) -> None:
+        rng = np.random.default_rng(0)
+        sample = vectors[rng.choice(rows, size=min(len(rows), IVF_TRAIN_SAMPLE), replace=False)]
+        self.centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(IVF_ITERATIONS):
+            assignment = np.argmax(sample @ self.centroids.T, axis=1)
+            for i in range(n_lists):
+                members = sample[assignment == i]
+                if len(members):
+                    self.centroids[i] = members.mean(axis=0)
+            self.centroids = _normalize(self.centroids)
+
+        assignment = np.concatenate([
+            np.argmax(vectors[rows[i:i + IVF_TRAIN_SAMPLE]] @ self.centroids.T, axis=1)
+            for i in range(0, len(rows), IVF_TRAIN_SAMPLE)
+        ])
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(n_lists + 1))
+        self.lists = [rows[order[bounds[i]:bounds[i + 1]]] for i in range(n_lists)]
+
+    def add(self, vectors: np.ndarray, rows: np.ndarray) -> None:
+        """Assign new or rewritten rows to their closest list; stale entries are filtered at search."""
+        if not len(rows):
+            return
+        assignment = np.argmax(vectors[rows] @ self.centroids.T, axis=1)
+        for i in np.unique(assignment):
+            self.lists[i] = np.concatenate([self.lists[i], rows[assignment == i]])
+
+    def candidates(self, query: np.ndarray, probes: int) -> np.ndarray:
+        probes = min(probes, len(self.lists))
+        closest = np.argpartition(-(self.centroids @ query), probes - 1)[:probes]
+        return np.concatenate([self.lists[i] for i in closest])
+
+
+class NumpyStorage(KnowledgeStorage):
+    """Exact top-k over a memory-mapped matrix, with an optional IVF coarse index for large corpora."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._settings = config.storage
+        self._dir = resolve_path(self._settings.path) / QRANT_COLLECTION_NAME
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._vectors_path = self._dir / "vectors.f32"
+
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(self._dir / "points.sqlite", check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+        self._revision: int | None = None
+        self._vectors: np.memmap | None = None
+        # Row -> point id and liveness, allocated to the matrix capacity; `_size` rows are in use.
+        self._ids = np.empty(0, dtype=np.uint64)
+        self._valid = np.empty(0, dtype=bool)
+        self._size = 0
+        self._ivf: _IvfIndex | None = None
+        self._ivf_changes = 0  # rows written since the current IVF index was trained
+        self._ivf_pending: list[np.ndarray] | None = None  # rows written while it is retrained
+        self._ivf_epoch = 0  # bumped when the rows are replaced wholesale; a running training is dropped
+        self._refresh()
+        self.logger.info("Vector storage at %s (%d points)", self._dir, self.count())
+
+    # --- bookkeeping -------------------------------------------------------------------------
+
+    def _meta(self, key: str) -> int:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def _set_meta(self, key: str, value: int) -> None:
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _commit(self, rows: list[int], ids: list[int | None]) -> None:
+        """Bump the revision, commit the write transaction and apply it to the row mapping.
+
+        `ids[i]` is the point now stored in `rows[i]`, or None if that row was freed.
+        """
+        revision = self._meta("revision")
+        self._set_meta("revision", revision + 1)
+        self._db.commit()
+        if revision != self._revision:
+            # Another process wrote since the last refresh; reload everything.
+            self._refresh()
+            return
+        self._revision = revision + 1
+        size = self._meta("rows")
+        if size < self._size:
+            self._replace_rows(np.zeros(len(self._vectors), dtype=np.uint64), np.zeros(len(self._vectors), dtype=bool))
+        self._reserve(len(self._vectors))
+        self._size = size
+        if rows:
+            changed = np.asarray(rows, dtype=np.int64)
+            live = np.asarray([point_id is not None for point_id in ids])
+            self._ids[changed[live]] = [point_id for point_id in ids if point_id is not None]
+            self._valid[changed] = live
+            self._rows_changed(changed)
+
+    def _reserve(self, capacity: int) -> None:
+        if len(self._valid) < capacity:
+            self._ids = np.concatenate([self._ids, np.zeros(capacity - len(self._ids), dtype=np.uint64)])
+            self._valid = np.concatenate([self._valid, np.zeros(capacity - len(self._valid), dtype=bool)])
+
+    def _replace_rows(self, ids: np.ndarray, valid: np.ndarray) -> None:
+        """Swap in a new row mapping and drop the IVF index, which no longer matches it."""
+        self._ids, self._valid = ids, valid
+        self._ivf, self._ivf_pending, self._ivf_changes = None, None, 0
+        self._ivf_epoch += 1
+
+    def _rows_changed(self, rows: np.ndarray) -> None:
+        self._ivf_changes += len(rows)
+        if self._ivf_pending is not None:
+            self._ivf_pending.append(rows)
+        if self._ivf is not None:
+            self._ivf.add(self._vectors, rows[self._valid[rows]])
+
+    def _open_vectors(self, capacity: int) -> None:
+        if self._vectors is not None:
+            self._vectors.flush()
+        size = capacity * VECTOR_SIZE * 4
+        if not self._vectors_path.exists() or self._vectors_path.stat().st_size < size:
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(size)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, VECTOR_SIZE))
+
+    def _refresh(self) -> None:
+        """Reload row mapping and matrix when another writer (or this one) changed the storage."""
+        with self._lock:
+            revision = self._meta("revision")
+            if revision == self._revision:
+                return
+            rows = self._meta("rows")
+            capacity = max(INITIAL_CAPACITY, rows)
+            if self._vectors is None or len(self._vectors) < capacity:
+                file_rows = self._vectors_path.stat().st_size // (VECTOR_SIZE * 4) if self._vectors_path.exists() else 0
+                self._open_vectors(max(capacity, file_rows))
+
+            ids = np.zeros(len(self._vectors), dtype=np.uint64)
+            valid = np.zeros(len(self._vectors), dtype=bool)
+            for row, point_id in self._db.execute("SELECT row, id FROM points"):
+                ids[row] = from_sql_id(point_id)
+                valid[row] = True
+            old_size, self._size, self._revision = self._size, rows, revision
+            if rows < old_size:
+                self._replace_rows(ids, valid)
+                return
+            # Rows whose point changed; a vector rewritten under the same id keeps its IVF list.
+            self._reserve(len(ids))
+            changed = np.flatnonzero((ids[:rows] != self._ids[:rows]) | (valid[:rows] != self._valid[:rows]))
+            self._ids, self._valid = ids, valid
+            self._rows_changed(changed)
+
+    def _allocate_row(self) -> int:
+        free = self._db.execute("SELECT row FROM free_rows LIMIT 1").fetchone()
+        if free:
+            self._db.execute("DELETE FROM free_rows WHERE row = ?", free)
+            return free[0]
+        row = self._meta("rows")
+        self._set_meta("rows", row + 1)
+        if row >= len(self._vectors):
+            self._open_vectors(len(self._vectors) * 2)
+        return row
+
+    def _dense_vector(self, vector) -> np.ndarray:
+        if isinstance(vector, dict):
+            vector = vector[DENSE_VECTOR_NAME]
+        return _normalize(np.asarray(vector, dtype=np.float32))
+
+    # --- writes ------------------------------------------------------------------------------
+
+    def upsert(self, points: list[PointStruct]) -> None:
+        if not points:
+            return
+        with self._lock, STORAGE_SECONDS.time("upsert"):
+            self._refresh()
+            rows = []
+            for point in points:
+                sql_id = to_sql_id(point.id)
+                existing = self._db.execute("SELECT row FROM points WHERE id = ?", (sql_id,)).fetchone()
+                row = existing[0] if existing else self._allocate_row()
+                self._vectors[row] = self._dense_vector(point.vector)
+                payload = point.payload or {}
+                self._db.execute(
+                    "INSERT OR REPLACE INTO points (row, id, payload) VALUES (?, ?, ?)",
+                    (row, sql_id, json.dumps(payload)),
+                )
+                self._db.execute("DELETE FROM lexical WHERE rowid = ?", (row,))
+                self._db.execute("INSERT INTO lexical (rowid, text) VALUES (?, ?)", (row, payload.get("text", "")))
+                rows.append(row)
+            self._vectors.flush()
+            self._commit(rows, [point.id for point in points])
+
+    def delete_points(self, point_ids: list[int]) -> None:
+        if not point_ids:
+            return
+        with self._lock:
+            self._refresh()
+            rows = []
+            for point_id in point_ids:
+                found = self._db.execute("SELECT row FROM points WHERE id = ?", (to_sql_id(point_id),)).fetchone()
+                if not found:
+                    continue
+                self._db.execute("DELETE FROM points WHERE row = ?", found)
+                self._db.execute("DELETE FROM lexical WHERE rowid = ?", found)
+                self._db.execute("INSERT OR IGNORE INTO free_rows (row) VALUES (?)", found)
+                rows.append(found[0])
+            self._commit(rows, [None] * len(rows))
+
+    def reset_storage(self) -> None:
+        with self._lock:
+            for table in ("points", "free_rows", "lexical"):
+                self._db.execute(f"DELETE FROM {table}")
+            self._set_meta("rows", 0)
+            self._commit([], [])
+        self.logger.info("Knowledge storage reset: all points deleted from '%s'", self._dir)
+
+    def has_lexical_index(self) -> bool:
+        return True
+
+    def get_generation(self) -> int:
+        return self._meta("generation")
+
+    def bump_generation(self) -> int:
+        with self._lock:
+            generation = self._meta("generation") + 1
+            self._set_meta("generation", generation)
+            self._db.commit()
+        self.logger.info("Index generation is now %d", generation)
+        return generation
+
+    # --- reads -------------------------------------------------------------------------------
+
+    def count(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM points").fetchone()[0]
+
+    def _payloads(self, rows: list[int]) -> dict[int, dict]:
+        placeholders = ",".join("?" * len(rows))
+        cursor = self._db.execute(f"SELECT row, payload FROM points WHERE row IN ({placeholders})", rows)
+        return {row: json.loads(payload) for row, payload in cursor}
+
+    def _scored_points(self, rows: list[int], scores: list[float]) -> list[ScoredPoint]:
+        if not rows:
+            return []
+        payloads = self._payloads(rows)
+        return [
+            ScoredPoint(id=int(self._ids[row]), version=0, score=float(score), payload=payloads[row])
+            for row, score in zip(rows, scores)
+            if row in payloads
+        ]
+
+    def _ivf_index(self) -> _IvfIndex | None:
+        """The IVF index, (re)trained in the background when missing or stale; None means scan."""
+        valid_count = int(self._valid.sum())
+        if not self._settings.ivf_enabled or valid_count < self._settings.ivf_min_points:
+            return None
+        stale = self._ivf is None or self._ivf_changes > self._settings.ivf_retrain_fraction * valid_count
+        if stale and self._ivf_pending is None:
+            n_lists = self._settings.ivf_lists or int(np.sqrt(valid_count))
+            self._ivf_pending, self._ivf_changes = [], 0
+            threading.Thread(
+                target=self._train_ivf,
+                args=(self._vectors, np.flatnonzero(self._valid), n_lists, self._ivf_epoch),
+                name="ivf-train",
+                daemon=True,
+            ).start()
+        return self._ivf
+
+    def _train_ivf(self, vectors: np.ndarray, rows: np.ndarray, n_lists: int, epoch: int) -> None:
+        self.logger.info("Building IVF index: %d points, %d lists", len(rows), n_lists)
+        try:
+            index = _IvfIndex(vectors, rows, n_lists)
+        except Exception:
+            self.logger.exception("Building the IVF index failed")
+            index = None
+        with self._lock:
+            if epoch != self._ivf_epoch:
+                return
+            if index is not None:
+                for changed in self._ivf_pending:
+                    index.add(self._vectors, changed[self._valid[changed]])
+                self._ivf = index
+            self._ivf_pending = None
+
+    def _top_k(self, query: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        vectors, valid = self._vectors, self._valid[:self._size]
+        ivf = self._ivf_index()
+        if ivf is not None:
+            rows = np.unique(ivf.candidates(query, self._settings.ivf_probes))
+            rows = rows[valid[rows]]
+            scores = vectors[rows] @ query
+        else:
+            # Scan in blocks so the page cache, not a full copy of the matrix, backs the scores.
+            block = self._settings.search_block_rows
+            best_rows, best_scores = [], []
+            for start in range(0, len(valid), block):
+                stop = min(start + block, len(valid))
+                block_scores = vectors[start:stop] @ query
+                block_scores[~valid[start:stop]] = -np.inf
+                top = min(k, stop - start)
+                keep = np.argpartition(-block_scores, top - 1)[:top]
+                best_rows.append(keep + start)
+                best_scores.append(block_scores[keep])
+            if not best_rows:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            rows, scores = np.concatenate(best_rows), np.concatenate(best_scores)
+
+        top = min(k, len(rows))
+        if not top:
+            return rows, scores
+        keep = np.argpartition(-scores, top - 1)[:top]
+        keep = keep[np.argsort(-scores[keep])]
+        keep = keep[np.isfinite(scores[keep])]
+        return rows[keep], scores[keep]
+
+    def search(self, vector: np.ndarray, k: int = DEFAULT_SEARCH_LIMIT) -> list[ScoredPoint]:
+        self._refresh()
+        with self._lock, STORAGE_SECONDS.time("search"):
+            rows, scores = self._top_k(self._dense_vector(vector), k)
+            return self._scored_points(rows.tolist(), scores.tolist())
+
+    def search_lexical(self, text: str, k: int = DEFAULT_SEARCH_LIMIT) -> list[ScoredPoint]:
+        tokens = sorted(set(lexical.tokenize(text)))
+        if not tokens:
+            return []
+        self._refresh()
+        match = " OR ".join('"{}"'.format(token.replace('"', '""')) for token in tokens)
+        with self._lock, STORAGE_SECONDS.time("search_lexical"):
+            cursor = self._db.execute(
+                "SELECT rowid, bm25(lexical) FROM lexical WHERE lexical MATCH ? ORDER BY bm25(lexical) LIMIT ?",
+                (match, k),
+            )
+            found = cursor.fetchall()
+            # FTS5 bm25() is lower-is-better; flip it so scores rank like Qdrant's.
+            return self._scored_points([row for row, _ in found], [-score for _, score in found])
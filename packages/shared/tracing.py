@@ -0,0 +1,83 @@
+"""Request IDs and HTTP metrics shared by the FastAPI services.
+
+`instrument(app)` installs an ASGI middleware that takes the `X-Request-ID` header (or makes a
+new ID), exposes it to the request's code through `current_request_id`, echoes it on the
+response and records the duration per route and the number of requests in flight. Outgoing calls to other
+services add `request_headers()` so one ID follows a request across services. The duration
+of a streaming response runs until its last body chunk.
+"""
+
+import logging
+import time
+import uuid
+from contextvars import ContextVar
+
+from fastapi import FastAPI, Response
+
+from shared import metrics
+
+REQUEST_ID_HEADER = "X-Request-ID"
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+HTTP_SECONDS = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request duration until the last body chunk", ("route", "method", "status")
+)
+# Requests are routed inside the app, after the middleware has to count them, so this is not per route.
+HTTP_IN_FLIGHT = metrics.gauge("http_requests_in_flight", "HTTP requests being processed")
+
+logger = logging.getLogger("tracing")
+
+
+def current_request_id() -> str | None:
+    return _request_id.get()
+
+
+def request_headers() -> dict[str, str]:
+    request_id = _request_id.get()
+    return {REQUEST_ID_HEADER: request_id} if request_id else {}
+
+
+class _TracingMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        header = REQUEST_ID_HEADER.lower().encode()
+        request_id = next((v.decode() for k, v in scope["headers"] if k == header), None) or uuid.uuid4().hex
+        token = _request_id.set(request_id)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(header, request_id.encode())]
+            await send(message)
+
+        try:
+            with HTTP_IN_FLIGHT.track():
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            # The route template (not the raw path) keeps label cardinality bounded.
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_SECONDS.labels(route, scope["method"], str(status)).observe(duration)
+            logger.debug("%s %s %d %.3fs [%s]", scope["method"], scope["path"], status, duration, request_id)
+            _request_id.reset(token)
+
+
+def metrics_response() -> Response:
+    return Response(content=metrics.REGISTRY.render(), media_type=PROMETHEUS_MEDIA_TYPE)
+
+
+def instrument(app: FastAPI) -> None:
+    """Add request-ID propagation, HTTP metrics and a Prometheus `/metrics` endpoint to `app`."""
+    app.add_middleware(_TracingMiddleware)
+    app.add_api_route("/metrics", metrics_response, methods=["GET"], include_in_schema=False)
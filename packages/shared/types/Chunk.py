@@ -6,3 +6,4 @@ class Chunk:
     text: str
     source: str
     index: int
+    page: int | None = None
@@ -0,0 +1,7 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class TextSegment:
+    text: str
+    page: int | None = None
@@ -50,7 +50,6 @@ SERVICES = [
             os.path.join(ROOT, "packages", "chat", "src"),
             os.path.join(ROOT, "packages"),
         ],
-        "wait_for": "embedder",
         "health_url": "http://localhost:3001/status",
     },
 ]
@@ -112,10 +111,15 @@ def run_service(service: dict, statuses: dict):
 
 def check_health(url: str) -> str | None:
     try:
-        resp = urllib.request.urlopen(url, timeout=2)
-        if resp.status == 200:
-            body = json.loads(resp.read().decode())
-            return body.get("status", "ok")
+        try:
+            resp = urllib.request.urlopen(url, timeout=2)
+        except urllib.error.HTTPError as e:
+            # A service that is still starting answers 503 with its status in the body.
+            if e.code != 503:
+                raise
+            resp = e
+        body = json.loads(resp.read().decode())
+        return body.get("status", "ok")
     except (urllib.error.URLError, OSError, json.JSONDecodeError, UnicodeDecodeError):
         pass
     return None
@@ -0,0 +1,14 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# Settings the services get from .env; the tests never reach these endpoints.
+os.environ.setdefault("OPENAI__API_KEY", "test")
+os.environ.setdefault("EMBEDDING__PUBLIC_URL", "http://localhost:3003/embed")
+os.environ.setdefault("SERVER__PUBLIC_URL", "http://localhost:3001")
+
+# Each service runs with its own src directory on the path (see start.py); the tests import from all of them.
+for path in ("packages", "packages/indexer/src", "packages/chat/src", "packages/embedder/src"):
+    sys.path.insert(0, str(ROOT / path))
@@ -0,0 +1,89 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import answer_cache as answer_cache_module
+from answer_cache import SemanticAnswerCache
+from context import context
+from shared.config import config
+from shared.services.embedder import embedder
+
+VECTORS = {
+    "What is RAG?": [1.0, 0.0, 0.0],
+    "what is rag": [0.99, 0.1, 0.0],
+    "How do I cook rice?": [0.0, 1.0, 0.0],
+}
+
+
+class FakeStorage:
+    def __init__(self) -> None:
+        self.generation = 0
+
+    async def aget_generation(self) -> int:
+        return self.generation
+
+
+@pytest.fixture
+def storage(monkeypatch) -> FakeStorage:
+    storage = FakeStorage()
+
+    async def embed_query(question):
+        return np.array(VECTORS[question], dtype=np.float32)
+
+    monkeypatch.setattr(embedder, "aembed_query", embed_query)
+    monkeypatch.setattr(context, "_storage", storage)
+    monkeypatch.setattr(config.answer_cache, "generation_check_seconds", 0)
+    monkeypatch.setattr(config.embedding, "vector_size", 3)
+    return storage
+
+
+def ask(cache: SemanticAnswerCache, question: str, instructions: str = "") -> str | None:
+    lookup, answer = asyncio.run(cache.find(question, instructions))
+    if answer is None:
+        cache.store(lookup, f"answer to {question}")
+    return answer
+
+
+def test_similar_questions_hit_and_others_miss(storage):
+    cache = SemanticAnswerCache()
+    assert ask(cache, "What is RAG?") is None
+    assert ask(cache, "what is rag") == "answer to What is RAG?"
+    assert ask(cache, "How do I cook rice?") is None
+    assert cache.stats.as_dict()["hits"] == 1
+    assert cache.stats.as_dict()["misses"] == 2
+
+
+def test_answers_are_kept_apart_per_system_prompt(storage):
+    cache = SemanticAnswerCache()
+    assert ask(cache, "What is RAG?", "Answer in French.") is None
+    assert ask(cache, "What is RAG?") is None
+    assert ask(cache, "What is RAG?", "Answer in French.") == "answer to What is RAG?"
+
+
+def test_new_generation_drops_cached_answers(storage):
+    cache = SemanticAnswerCache()
+    ask(cache, "What is RAG?")
+    storage.generation += 1
+    assert ask(cache, "What is RAG?") is None
+    assert cache.stats.invalidations == 1
+
+
+def test_answer_produced_before_a_generation_change_is_not_stored(storage):
+    cache = SemanticAnswerCache()
+    lookup, _ = asyncio.run(cache.find("What is RAG?"))
+    storage.generation += 1
+    # Another request notices the new generation while the first answer is still being produced.
+    asyncio.run(cache.find("How do I cook rice?"))
+    cache.store(lookup, "answer from the old index")
+    assert len(cache) == 0
+
+
+def test_disabled_cache_does_not_embed(storage, monkeypatch):
+    monkeypatch.setattr(config.answer_cache, "enabled", False)
+    monkeypatch.setattr(answer_cache_module, "embedder", None)
+    cache = SemanticAnswerCache()
+    lookup, answer = asyncio.run(cache.find("What is RAG?"))
+    assert lookup.vector is None and answer is None
+    cache.store(lookup, "answer")
+    assert len(cache) == 0
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from batcher import DynamicBatcher
+
+
+class RecordingModel:
+    def __init__(self) -> None:
+        self.passes: list[list[str]] = []
+
+    def __call__(self, texts: list[str]) -> list[list[float]]:
+        self.passes.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+
+async def embed_concurrently(batcher: DynamicBatcher, requests: list[list[str]]) -> list[list[list[float]]]:
+    batcher.start()
+    try:
+        return await asyncio.gather(*(batcher.embed(texts) for texts in requests))
+    finally:
+        await batcher.stop()
+
+
+def test_concurrent_requests_share_length_sorted_forward_passes():
+    model = RecordingModel()
+    batcher = DynamicBatcher(model, max_texts=64, max_wait_ms=50, forward_batch_size=2)
+    requests = [["ccc", "a"], ["dddd"], ["bb", "eeeee"]]
+
+    results = asyncio.run(embed_concurrently(batcher, requests))
+    assert results == [[[3.0], [1.0]], [[4.0]], [[2.0], [5.0]]]
+    assert model.passes == [["a", "bb"], ["ccc", "dddd"], ["eeeee"]]
+    assert batcher.stats.batches == 1
+    assert batcher.stats.max_batch_size == 5
+
+
+def test_collection_stops_at_max_texts():
+    model = RecordingModel()
+    batcher = DynamicBatcher(model, max_texts=2, max_wait_ms=50, forward_batch_size=8)
+
+    asyncio.run(embed_concurrently(batcher, [["a"], ["b"], ["c"]]))
+    assert model.passes == [["a", "b"], ["c"]]
+    assert batcher.stats.batches == 2
+    assert batcher.queue_depth == 0
+
+
+def test_model_error_fails_every_request_of_the_batch():
+    def broken(texts):
+        raise RuntimeError("out of memory")
+
+    batcher = DynamicBatcher(broken, max_texts=64, max_wait_ms=50, forward_batch_size=8)
+    with pytest.raises(RuntimeError, match="out of memory"):
+        asyncio.run(embed_concurrently(batcher, [["a"], ["b"]]))
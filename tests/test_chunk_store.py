@@ -0,0 +1,42 @@
+import pytest
+
+from shared.services.chunk_store import ChunkTextStore
+from shared.types.Chunk import Chunk
+
+
+@pytest.fixture
+def store(tmp_path) -> ChunkTextStore:
+    return ChunkTextStore(tmp_path / "chunks.sqlite")
+
+
+def chunk(text: str, index: int = 0) -> Chunk:
+    return Chunk(text=text, source="doc.pdf", index=index, page=3)
+
+
+def test_reads_come_from_the_live_collection_only(store):
+    store.put_many("kb_v1", [(1, chunk("old text"))])
+    store.set_live("kb_v1")
+    # A rebuild writes the same ids under new texts next to the live collection.
+    store.put_many("kb_v2", [(1, chunk("new text")), (2, chunk("added", 1))])
+    assert store.get_many([1, 2]) == {1: {"text": "old text", "source": "doc.pdf", "index": 0, "page": 3}}
+
+    store.set_live("kb_v2")
+    assert {point_id: p["text"] for point_id, p in store.get_many([1, 2]).items()} == {1: "new text", 2: "added"}
+    assert store.live_collection == "kb_v2"
+
+
+def test_ids_above_the_signed_range_round_trip(store):
+    store.set_live("kb_v1")
+    store.put_many("kb_v1", [(2**64 - 1, chunk("edge"))])
+    assert store.get_many([2**64 - 1])[2**64 - 1]["text"] == "edge"
+
+
+def test_deleting_and_dropping_keep_shared_texts(store):
+    store.set_live("kb_v1")
+    store.put_many("kb_v1", [(1, chunk("same")), (2, chunk("same", 1))])
+    store.put_many("kb_v2", [(1, chunk("same"))])
+
+    store.delete_many("kb_v1", [1])
+    store.drop_collection("kb_v2")
+    assert list(store.get_many([1, 2])) == [2]
+    assert store.get_many([2])[2]["text"] == "same"
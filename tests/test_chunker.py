@@ -0,0 +1,54 @@
+import pytest
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from chunker import ChunkStream
+from shared.types.TextSegment import TextSegment
+
+CHUNK_SIZE = 100
+OVERLAP = 20
+
+
+@pytest.fixture
+def splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=OVERLAP, add_start_index=True)
+
+
+def make_pages(count: int = 12, words: int = 60) -> list[TextSegment]:
+    return [
+        TextSegment(text=" ".join(f"p{page}w{i}" for i in range(words)), page=page)
+        for page in range(1, count + 1)
+    ]
+
+
+def stream_all(splitter: RecursiveCharacterTextSplitter, pages: list[TextSegment], flush_size: int) -> list:
+    stream = ChunkStream(splitter, "doc", flush_size=flush_size)
+    chunks = []
+    for page in pages:
+        chunks += stream.feed([page])
+    return chunks + stream.finish()
+
+
+def test_stream_below_flush_size_matches_whole_document_split(splitter):
+    pages = make_pages(count=2)
+    chunks = stream_all(splitter, pages, flush_size=10_000)
+    whole = splitter.split_text("".join(page.text + "\n" for page in pages))
+    assert [chunk.text for chunk in chunks] == whole
+
+
+def test_stream_respects_size_and_keeps_every_word_in_order(splitter):
+    pages = make_pages()
+    chunks = stream_all(splitter, pages, flush_size=3 * CHUNK_SIZE)
+
+    assert all(len(chunk.text) <= CHUNK_SIZE for chunk in chunks)
+    assert [chunk.index for chunk in chunks] == list(range(len(chunks)))
+    # Chunks overlap, so drop each word already seen; what remains is the document in order.
+    words = []
+    for chunk in chunks:
+        words += [word for word in chunk.text.split() if word not in words]
+    assert words == " ".join(page.text for page in pages).split()
+
+
+def test_stream_records_the_page_each_chunk_starts_on(splitter):
+    chunks = stream_all(splitter, make_pages(), flush_size=3 * CHUNK_SIZE)
+    for chunk in chunks:
+        assert chunk.page == int(chunk.text.split()[0][1:].split("w")[0])
@@ -0,0 +1,117 @@
+import asyncio
+
+import numpy as np
+import pytest
+from qdrant_client.models import ScoredPoint
+
+import context as context_module
+from context import Context
+from shared.config import config
+from shared.services.embedder import embedder
+
+
+class FakeStorage:
+    def __init__(self, lexical_index: bool) -> None:
+        self.lexical_index = lexical_index
+        self.generation = 0
+        self.searches: list[tuple[int, list[str] | None]] = []
+
+    def has_lexical_index(self) -> bool:
+        return self.lexical_index
+
+    async def aget_generation(self) -> int:
+        return self.generation
+
+    async def asearch_batch(self, vectors, texts, k):
+        self.searches.append((len(vectors), texts))
+        return [[] for _ in vectors], [[] for _ in texts or []]
+
+    async def afetch_payloads(self, points):
+        return points
+
+
+@pytest.fixture
+def embedded(monkeypatch) -> list[list[str]]:
+    calls = []
+
+    async def embed_texts(texts):
+        calls.append(list(texts))
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+    monkeypatch.setattr(embedder, "aembed_texts", embed_texts)
+    return calls
+
+
+def make_context(storage: FakeStorage) -> Context:
+    context = Context()
+    context._storage = storage
+    return context
+
+
+def test_hybrid_search_is_dense_only_until_the_lexical_index_exists(embedded, monkeypatch):
+    monkeypatch.setattr(config.retrieval, "hybrid_enabled", True)
+    monkeypatch.setattr(config.answer_cache, "generation_check_seconds", 0)
+    storage = FakeStorage(lexical_index=False)
+    context = make_context(storage)
+
+    asyncio.run(context._search(["query"], 5))
+    storage.lexical_index = True
+    # Checked once per generation: the rebuild that adds the index also bumps it.
+    asyncio.run(context._search(["query"], 5))
+    storage.generation += 1
+    asyncio.run(context._search(["query"], 5))
+    assert [texts for _, texts in storage.searches] == [None, None, ["query"]]
+
+
+def test_known_question_vector_is_not_embedded_again(embedded, monkeypatch):
+    async def passthrough(messages):
+        return [messages[-1]["content"].strip()]
+
+    monkeypatch.setattr(context_module.query_rewriter, "rewrite_conversation", passthrough)
+    monkeypatch.setattr(config.rerank, "enabled", False)
+    context = make_context(FakeStorage(lexical_index=False))
+
+    asyncio.run(context.get_chunks("What is Qdrant? ", np.zeros(4, dtype=np.float32)))
+    asyncio.run(context.get_chunks("What is Qdrant?"))
+    assert [texts for texts in embedded if texts] == [["What is Qdrant?"]]
+
+
+def test_rerank_keeps_the_best_score_over_all_sub_queries(monkeypatch):
+    async def rerank(query, passages):
+        return np.array([1.0 if query in passage else 0.0 for passage in passages])
+
+    monkeypatch.setattr(embedder, "arerank", rerank)
+    monkeypatch.setattr(config.rerank, "top_n", 2)
+    results = [
+        ScoredPoint(id=i, version=0, score=0.0, payload={"text": text})
+        for i, text in enumerate(["about fish", "about cats", "about dogs"])
+    ]
+    ranked = asyncio.run(make_context(FakeStorage(False))._rerank(["cats", "dogs"], results))
+    assert [point.payload["text"] for point in ranked] == ["about cats", "about dogs"]
+
+
+@pytest.mark.parametrize(
+    "rewrite, accept_after_ms, embedded_texts, outcome",
+    [
+        (["what is qdrant"], 0, [["What is Qdrant?"]], "accepted"),
+        (["Qdrant database overview"], 0, [["What is Qdrant?"], ["Qdrant database overview"]], "researched"),
+        (["Qdrant database overview"], 1, [["What is Qdrant?"]], "accepted"),
+        ([], 0, [["What is Qdrant?"]], "cancelled"),
+    ],
+)
+def test_speculative_search_keeps_or_replaces_the_raw_message_results(
+    embedded, monkeypatch, rewrite, accept_after_ms, embedded_texts, outcome
+):
+    async def slow_rewrite(messages):
+        await asyncio.sleep(0.01)
+        return rewrite
+
+    monkeypatch.setattr(context_module.query_rewriter, "rewrite_conversation", slow_rewrite)
+    monkeypatch.setattr(config.retrieval, "speculative_enabled", True)
+    monkeypatch.setattr(config.retrieval, "speculative_accept_after_ms", accept_after_ms)
+    monkeypatch.setattr(config.rerank, "enabled", False)
+    context = make_context(FakeStorage(lexical_index=False))
+
+    asyncio.run(context.get_chunks("What is Qdrant?"))
+    assert embedded == embedded_texts
+    assert context.speculation.as_dict()[outcome] == 1
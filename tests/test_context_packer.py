@@ -0,0 +1,42 @@
+from qdrant_client.models import ScoredPoint
+
+from context_packer import GAP_SEPARATOR, overlap_length, pack_context
+
+
+def hit(source: str, index: int, text: str, score: float) -> ScoredPoint:
+    return ScoredPoint(id=hash((source, index)) & 0xFFFF, version=0, score=score,
+                       payload={"source": source, "index": index, "text": text})
+
+
+def header(source: str) -> str:
+    return f"[{source}]"
+
+
+def test_overlap_length_finds_the_shared_text():
+    assert overlap_length("alpha beta gamma delta", "gamma delta epsilon") == len("gamma delta")
+    # Shorter coincidences are not treated as overlap.
+    assert overlap_length("ends with a", "a begins") == 0
+
+
+def test_consecutive_chunks_are_merged_without_their_overlap():
+    points = [
+        hit("a.pdf", 0, "The first chunk ends here and", 0.9),
+        hit("a.pdf", 1, "ends here and the second goes on", 0.8),
+        hit("a.pdf", 3, "A later chunk.", 0.7),
+    ]
+    assert pack_context(points, header, token_budget=1000) == [
+        "[a.pdf]\nThe first chunk ends here and the second goes on" + GAP_SEPARATOR + "A later chunk."
+    ]
+
+
+def test_blocks_follow_the_best_hit_of_each_source():
+    points = [hit("a.pdf", 0, "from a", 0.5), hit("b.pdf", 0, "from b", 0.9), hit("a.pdf", 5, "more a", 0.4)]
+    blocks = pack_context(points, header, token_budget=1000)
+    assert [block.split("\n")[0] for block in blocks] == ["[b.pdf]", "[a.pdf]"]
+
+
+def test_hits_that_do_not_fit_the_budget_are_skipped():
+    big, small = "x" * 400, "small"
+    points = [hit("a.pdf", 0, big, 0.9), hit("b.pdf", 0, small, 0.8)]
+    # 100 tokens for the big chunk would overflow; the smaller, lower scored hit still fits.
+    assert pack_context(points, header, token_budget=20) == ["[b.pdf]\nsmall"]
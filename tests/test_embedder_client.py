@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import httpx
+import numpy as np
+import pytest
+
+from shared import embedding_codec
+from shared.services import embedder as embedder_module
+from shared.services.embedder import Embedder
+
+
+def respond(texts: list[str]) -> httpx.Response:
+    vectors = np.array([[len(text), i] for i, text in enumerate(texts)], dtype=np.float32)
+    return httpx.Response(
+        200,
+        content=embedding_codec.encode(vectors, embedding_codec.FLOAT32_MEDIA_TYPE),
+        headers={"content-type": embedding_codec.FLOAT32_MEDIA_TYPE},
+    )
+
+
+@pytest.fixture
+def delays(monkeypatch) -> list[float]:
+    delays = []
+    monkeypatch.setattr(embedder_module, "MAX_RETRIES", 3)
+    monkeypatch.setattr(embedder_module, "RETRY_BACKOFF", 0.5)
+    monkeypatch.setattr(embedder_module.time, "sleep", delays.append)
+    return delays
+
+
+def make_embedder(handler) -> Embedder:
+    client = Embedder()
+    client._client = httpx.Client(transport=httpx.MockTransport(handler))
+    client._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def test_retryable_errors_are_retried_with_exponential_backoff(delays):
+    statuses = iter([503, 429])
+
+    def handler(request):
+        status = next(statuses, 200)
+        return respond(json.loads(request.content)["inputs"]) if status == 200 else httpx.Response(status)
+
+    vectors = make_embedder(handler).embed_texts(["alpha"])
+    assert vectors.tolist() == [[5.0, 0.0]]
+    assert delays == [0.5, 1.0]
+
+
+def test_client_errors_are_not_retried(delays):
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        return httpx.Response(400)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        make_embedder(handler).embed_texts(["alpha"])
+    assert len(attempts) == 1
+    assert delays == []
+
+
+def test_gives_up_after_the_last_retry(delays):
+    def handler(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    with pytest.raises(httpx.ConnectError):
+        make_embedder(handler).embed_texts(["alpha"])
+    assert delays == [0.5, 1.0, 2.0]
+
+
+def test_batches_are_sent_separately_and_keep_input_order(delays, monkeypatch):
+    monkeypatch.setattr(embedder_module, "BATCH_SIZE", 2)
+    monkeypatch.setattr(embedder_module, "RETRY_BACKOFF", 0)
+    batches = []
+    failed = set()
+
+    def handler(request):
+        texts = json.loads(request.content)["inputs"]
+        batches.append(texts)
+        # Every batch fails once, so retried batches finish out of order.
+        if texts[0] not in failed:
+            failed.add(texts[0])
+            return httpx.Response(502)
+        return respond(texts)
+
+    texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+    client = make_embedder(handler)
+    assert client.embed_texts(texts)[:, 0].tolist() == [1, 2, 3, 4, 5]
+    assert sorted(len(batch) for batch in batches) == [1, 1, 2, 2, 2, 2]
+
+    batches.clear()
+    failed.clear()
+    assert asyncio.run(client.aembed_texts(texts))[:, 0].tolist() == [1, 2, 3, 4, 5]
+    assert sorted(len(batch) for batch in batches) == [1, 1, 2, 2, 2, 2]
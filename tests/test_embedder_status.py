@@ -0,0 +1,22 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main as embedder_main
+
+
+@pytest.fixture
+def client() -> TestClient:
+    # Without entering the client the lifespan does not run, so no model is loaded.
+    return TestClient(embedder_main.app)
+
+
+def test_status_is_503_while_the_model_loads(client, monkeypatch):
+    monkeypatch.setattr(embedder_main, "model", None)
+    response = client.get("/status")
+    assert response.status_code == 503
+    assert response.json()["status"] == "loading"
+
+    monkeypatch.setattr(embedder_main, "model", object())
+    response = client.get("/status")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ok"
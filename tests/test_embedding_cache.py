@@ -0,0 +1,37 @@
+import numpy as np
+
+from cache import EmbeddingCache
+
+
+def vector(value: float) -> np.ndarray:
+    return np.full(3, value, dtype=np.float32)
+
+
+def test_memory_then_disk_then_miss(tmp_path):
+    cache = EmbeddingCache(tmp_path / "cache.sqlite", "model-a", max_memory_items=1)
+    cache.put_many(["alpha", "beta"], [vector(1), vector(2)])
+    assert cache.memory_size == 1
+
+    # "beta" is the only one still in memory; "alpha" comes from SQLite and is kept in memory again.
+    hits = cache.get_many(["beta", "alpha", "gamma"])
+    assert [h.tolist() if h is not None else None for h in hits] == [[2, 2, 2], [1, 1, 1], None]
+    assert (cache.stats.memory_hits, cache.stats.disk_hits, cache.stats.misses) == (1, 1, 1)
+    assert cache.get_many(["alpha"])[0].tolist() == [1, 1, 1]
+    assert cache.stats.memory_hits == 2
+
+
+def test_vectors_survive_a_restart_and_ignore_whitespace(tmp_path):
+    cache = EmbeddingCache(tmp_path / "cache.sqlite", "model-a", max_memory_items=8)
+    cache.put_many(["two  words"], [vector(1)])
+    cache.close()
+
+    reopened = EmbeddingCache(tmp_path / "cache.sqlite", "model-a", max_memory_items=8)
+    assert reopened.get_many([" two words\n"])[0].tolist() == [1, 1, 1]
+    assert reopened.stats.disk_hits == 1
+
+
+def test_another_model_does_not_see_cached_vectors(tmp_path):
+    EmbeddingCache(tmp_path / "cache.sqlite", "model-a", max_memory_items=8).put_many(["alpha"], [vector(1)])
+    other = EmbeddingCache(tmp_path / "cache.sqlite", "model-b", max_memory_items=8)
+    assert other.get_many(["alpha"]) == [None]
+    assert other.stats.hit_rate == 0.0
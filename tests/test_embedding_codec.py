@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from shared import embedding_codec as codec
+
+
+@pytest.mark.parametrize("media_type", [codec.FLOAT32_MEDIA_TYPE, codec.FLOAT16_MEDIA_TYPE])
+def test_round_trip(media_type):
+    vectors = np.random.default_rng(0).standard_normal((3, 5)).astype(np.float32)
+    decoded = codec.decode(codec.encode(vectors, media_type))
+    assert decoded.shape == (3, 5)
+    tolerance = 1e-3 if media_type == codec.FLOAT16_MEDIA_TYPE else 0
+    np.testing.assert_allclose(decoded.astype(np.float32), vectors, atol=tolerance)
+
+
+def test_empty_matrix_and_list_input():
+    assert codec.decode(codec.encode(np.empty((0, 4)), codec.FLOAT32_MEDIA_TYPE)).shape == (0, 4)
+    assert codec.decode(codec.encode([[1.0, 2.0]], codec.FLOAT32_MEDIA_TYPE)).tolist() == [[1.0, 2.0]]
+
+
+@pytest.mark.parametrize("media_type", [codec.FLOAT32_MEDIA_TYPE, codec.FLOAT16_MEDIA_TYPE])
+def test_empty_batch_round_trips_to_an_empty_list(media_type):
+    decoded = codec.decode(codec.encode([], media_type))
+    assert decoded.shape == (0, 0)
+    assert decoded.tolist() == []
+
+
+def test_decode_rejects_other_payloads():
+    with pytest.raises(ValueError):
+        codec.decode(b"JSON" + bytes(12))
+
+
+def test_negotiate_prefers_the_first_binary_type_and_falls_back_to_json():
+    accept = f"text/html, {codec.FLOAT16_MEDIA_TYPE};q=0.9, {codec.FLOAT32_MEDIA_TYPE}"
+    assert codec.negotiate(accept) == codec.FLOAT16_MEDIA_TYPE
+    assert codec.negotiate("application/json") == codec.JSON_MEDIA_TYPE
+    assert codec.negotiate(None) == codec.JSON_MEDIA_TYPE
@@ -0,0 +1,24 @@
+from qdrant_client.models import ScoredPoint
+
+from fusion import reciprocal_rank_fusion
+
+
+def hits(*ids: int) -> list[ScoredPoint]:
+    return [ScoredPoint(id=point_id, version=0, score=1.0) for point_id in ids]
+
+
+def test_points_found_by_several_lists_add_up():
+    fused = reciprocal_rank_fusion([hits(1, 2), hits(2, 3)], weights=[1.0, 1.0], k=60, limit=10)
+    assert [p.id for p in fused] == [2, 1, 3]
+    assert fused[0].score == 1 / 62 + 1 / 61
+    assert fused[1].score == 1 / 61
+
+
+def test_weights_scale_each_list():
+    fused = reciprocal_rank_fusion([hits(1), hits(2)], weights=[1.0, 3.0], k=60, limit=10)
+    assert [p.id for p in fused] == [2, 1]
+
+
+def test_limit_and_empty_lists():
+    assert [p.id for p in reciprocal_rank_fusion([hits(1, 2, 3), []], [1.0, 1.0], k=60, limit=2)] == [1, 2]
+    assert reciprocal_rank_fusion([[], []], [1.0, 1.0], k=60, limit=5) == []
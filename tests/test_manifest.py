@@ -0,0 +1,65 @@
+import json
+import os
+
+import pytest
+
+from manifest import IndexManifest
+from shared.config import config
+
+
+@pytest.fixture
+def manifest(tmp_path) -> IndexManifest:
+    return IndexManifest(tmp_path / "manifest.json")
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / "doc.txt"
+    path.write_text("some text")
+    return path
+
+
+def saved_sources(manifest: IndexManifest) -> set[str]:
+    return set(json.loads(manifest.path.read_text())["files"])
+
+
+def test_new_recorded_touched_and_changed_files(manifest, document):
+    assert not manifest.is_up_to_date(document)
+    manifest.record(document, [1, 2])
+    assert manifest.is_up_to_date(document)
+
+    # Same content with a new mtime is still up to date, and the new mtime is kept.
+    stat = document.stat()
+    os.utime(document, (stat.st_atime, stat.st_mtime + 10))
+    assert manifest.is_up_to_date(document)
+    assert manifest.get(document.name).mtime == stat.st_mtime + 10
+
+    document.write_text("other text")
+    assert not manifest.is_up_to_date(document)
+
+
+def test_changed_settings_invalidate_every_file(manifest, document, monkeypatch):
+    manifest.record(document, [1])
+    monkeypatch.setattr(config.chunking, "size", config.chunking.size + 1)
+    assert not manifest.is_up_to_date(document)
+
+
+def test_changes_are_saved_at_checkpoints_and_on_flush(manifest, document, monkeypatch):
+    monkeypatch.setattr(config.indexer, "manifest_save_seconds", 3600)
+    manifest.record(document, [1])
+    assert not manifest.path.exists()
+    manifest.flush()
+    assert saved_sources(manifest) == {"doc.txt"}
+
+    monkeypatch.setattr(config.indexer, "manifest_save_seconds", 0)
+    manifest.remove("doc.txt")
+    assert saved_sources(manifest) == set()
+
+
+def test_move_to_replaces_the_live_manifest(manifest, document, tmp_path):
+    live = IndexManifest(tmp_path / "live.json")
+    live.save()
+    manifest.record(document, [7])
+    manifest.move_to(live.path)
+    assert not (tmp_path / "manifest.json").exists()
+    assert IndexManifest(live.path).get("doc.txt").point_ids == [7]
@@ -0,0 +1,47 @@
+import pytest
+
+from shared import metrics
+from shared.metrics import Gauge, Histogram, LatencyHistogram, Registry
+
+
+def test_histogram_renders_cumulative_buckets_sum_and_count():
+    registry = Registry()
+    latency = registry.register(Histogram("request_seconds", "Request duration", ("route",)))
+    latency.labels("/chat").observe(0.004)
+    latency.labels("/chat").observe(0.3)
+    latency.labels("/chat").observe(12.0)
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP request_seconds Request duration", "# TYPE request_seconds histogram"]
+    assert 'request_seconds_bucket{route="/chat",le="0.005"} 1' in lines
+    assert 'request_seconds_bucket{route="/chat",le="0.3"} 2' in lines
+    assert 'request_seconds_bucket{route="/chat",le="10"} 2' in lines
+    assert 'request_seconds_bucket{route="/chat",le="+Inf"} 3' in lines
+    assert 'request_seconds_sum{route="/chat"} 12.304' in lines
+    assert 'request_seconds_count{route="/chat"} 3' in lines
+
+
+def test_gauge_tracks_in_flight_work_and_escapes_labels():
+    registry = Registry()
+    in_flight = registry.register(Gauge("in_flight", "Requests in flight", ("path",)))
+    with in_flight.track('say "hi"'):
+        assert 'in_flight{path="say \\"hi\\""} 1.0' in registry.render()
+    assert 'in_flight{path="say \\"hi\\""} 0.0' in registry.render()
+
+
+def test_quantiles_are_bucket_upper_bounds():
+    histogram = LatencyHistogram(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.05, 0.5, 2.0):
+        histogram.observe(seconds)
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1.0
+    assert histogram.quantile(1.0) == float("inf")
+
+
+def test_registering_a_name_twice_returns_the_same_family_unless_it_differs():
+    first = metrics.histogram("test_metrics_seconds", "Test", ("stage",))
+    assert metrics.histogram("test_metrics_seconds", "Test", ("stage",)) is first
+    with pytest.raises(ValueError):
+        metrics.gauge("test_metrics_seconds", "Test", ("stage",))
+    with pytest.raises(ValueError):
+        first.labels("a", "b")
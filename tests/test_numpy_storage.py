@@ -0,0 +1,69 @@
+import time
+
+import numpy as np
+import pytest
+from qdrant_client.models import PointStruct
+
+from shared.config import config
+from shared.services.knowledge_storage import VECTOR_SIZE
+from shared.services.numpy_storage import NumpyStorage
+
+
+@pytest.fixture
+def storage_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(config.storage, "path", str(tmp_path))
+    return tmp_path
+
+
+def points(vectors: np.ndarray, first_id: int = 1) -> list[PointStruct]:
+    return [
+        PointStruct(id=first_id + i, vector=vector.tolist(), payload={"text": f"text {first_id + i}"})
+        for i, vector in enumerate(vectors)
+    ]
+
+
+def vectors(count: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((count, VECTOR_SIZE)).astype(np.float32)
+
+
+def test_writes_update_the_row_mapping_without_reloading(storage_path):
+    storage = NumpyStorage()
+    data = vectors(10)
+    storage.upsert(points(data))
+    storage.delete_points([3])
+    storage.upsert(points(data[:1], first_id=2**64 - 1))
+
+    assert storage.count() == 10
+    assert storage.search(data[0], 1)[0].id in (1, 2**64 - 1)
+    assert 3 not in [p.id for p in storage.search(data[2], 10)]
+    # The mapping kept up to date in memory matches the one a new reader loads from SQLite.
+    fresh = NumpyStorage()
+    assert sorted(fresh._ids[fresh._valid].tolist()) == sorted(storage._ids[storage._valid].tolist())
+
+
+def test_reader_picks_up_writes_from_another_instance(storage_path):
+    writer, reader = NumpyStorage(), NumpyStorage()
+    data = vectors(5)
+    writer.upsert(points(data))
+    assert reader.search(data[4], 1)[0].id == 5
+    writer.reset_storage()
+    assert reader.search(data[4], 1) == []
+
+
+def test_ivf_is_trained_in_the_background(storage_path, monkeypatch):
+    monkeypatch.setattr(config.storage, "ivf_enabled", True)
+    monkeypatch.setattr(config.storage, "ivf_min_points", 100)
+    storage = NumpyStorage()
+    data = vectors(400)
+    storage.upsert(points(data))
+
+    # The first search scans exhaustively and starts the training.
+    assert storage.search(data[7], 1)[0].id == 8
+    deadline = time.monotonic() + 10
+    while storage._ivf is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert storage._ivf is not None
+
+    # Rows written after training join the index without a retrain.
+    storage.upsert(points(data[:1], first_id=1000))
+    assert 1000 in [p.id for p in storage.search(data[0], 2)]
@@ -0,0 +1,51 @@
+from pathlib import Path
+
+import pytest
+
+import progress as progress_module
+from progress import IndexingProgress
+
+
+@pytest.fixture
+def clock(monkeypatch) -> list[float]:
+    now = [100.0]
+    monkeypatch.setattr(progress_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_snapshot_reports_counts_throughput_and_eta(clock):
+    progress = IndexingProgress()
+    progress.set_plan([300, 100, 600], skipped=2)
+    progress.add_loaded(300)
+    progress.add_characters(1200)
+    progress.add_chunks(4)
+    progress.add_vectors(4)
+    progress.add_stage_time("embed", 1.5)
+    progress.add_stage_time("embed", 0.5)
+    progress.file_done(300)
+    progress.file_failed(Path("broken.pdf"), ValueError("not a pdf"))
+    clock[0] += 2.0
+
+    snapshot = progress.snapshot()
+    assert (snapshot.files_total, snapshot.files_done, snapshot.files_skipped) == (3, 1, 2)
+    assert (snapshot.files_failed, snapshot.files_remaining) == (1, 1)
+    assert (snapshot.bytes_read, snapshot.characters_extracted, snapshot.chunks_produced) == (300, 1200, 4)
+    assert snapshot.stage_seconds == {"embed": 2.0}
+    assert snapshot.chunks_per_second == 2.0
+    # 300 of 1000 bytes in 2 seconds leaves 700 bytes at 150 bytes per second.
+    assert snapshot.eta_seconds == pytest.approx(4.7)
+    assert snapshot.last_errors == {"broken.pdf": "ValueError: not a pdf"}
+
+
+def test_finished_run_stops_the_clock(clock):
+    progress = IndexingProgress()
+    progress.set_plan([100], skipped=0)
+    progress.file_done(100)
+    clock[0] += 1.0
+    progress.finish()
+    clock[0] += 60.0
+
+    snapshot = progress.snapshot()
+    assert snapshot.elapsed_seconds == 1.0
+    assert snapshot.eta_seconds is None
+    assert snapshot.files_remaining == 0
@@ -0,0 +1,83 @@
+import threading
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+
+from shared.config import config
+from shared.services import knowledge_storage
+from shared.services.knowledge_storage import QdrantStorage
+from shared.types.Chunk import Chunk
+
+
+@pytest.fixture
+def client(monkeypatch) -> QdrantClient:
+    client = QdrantClient(":memory:")
+    monkeypatch.setattr(knowledge_storage, "QdrantClient", lambda **kwargs: client)
+    return client
+
+
+@pytest.fixture
+def calls(client, monkeypatch) -> list[tuple]:
+    calls = []
+    upsert, set_payload = client.upsert, client.set_payload
+
+    def recording_upsert(**kwargs):
+        calls.append(("upsert", len(kwargs["points"]), kwargs["wait"], threading.current_thread().name))
+        return upsert(**kwargs)
+
+    def recording_set_payload(**kwargs):
+        calls.append(("set_payload", kwargs["wait"]))
+        return set_payload(**kwargs)
+
+    monkeypatch.setattr(client, "upsert", recording_upsert)
+    monkeypatch.setattr(client, "set_payload", recording_set_payload)
+    return calls
+
+
+def add_chunks(storage: QdrantStorage, count: int) -> list[int]:
+    chunks = [Chunk(text=f"chunk {i}", source="doc.txt", index=i) for i in range(count)]
+    return storage.add_chunks(chunks, np.ones((count, knowledge_storage.VECTOR_SIZE)))
+
+
+def test_upserts_are_split_into_parallel_batches_without_waiting(calls, monkeypatch):
+    monkeypatch.setattr(config.qdrant, "upsert_batch_size", 2)
+    monkeypatch.setattr(config.qdrant, "upsert_parallel", 2)
+    storage = QdrantStorage()
+
+    add_chunks(storage, 5)
+    assert sorted(size for _, size, _, _ in calls) == [1, 2, 2]
+    assert all(not wait and thread.startswith("qdrant-upsert") for _, _, wait, thread in calls)
+    storage.flush()
+    assert storage.count() == 5
+
+
+def test_flush_is_one_waiting_update_after_the_last_upsert(client, calls):
+    storage = QdrantStorage()
+    storage.flush()
+    assert calls == []
+
+    point_ids = add_chunks(storage, 3)
+    storage.flush()
+    storage.flush()
+    assert [call[0] for call in calls] == ["upsert", "set_payload"]
+    assert calls[-1] == ("set_payload", True)
+    # The barrier leaves the payload of the point it targets as it was.
+    payload = client.retrieve(collection_name=config.qdrant.collection, ids=point_ids[-1:])[0].payload
+    assert payload == storage._point_payload(Chunk(text="chunk 2", source="doc.txt", index=2))
+
+
+def test_bulk_load_pauses_indexing_and_flushes_at_the_end(client, calls, monkeypatch):
+    monkeypatch.setattr(config.qdrant, "pause_indexing_during_bulk", True)
+    storage = QdrantStorage()
+    thresholds = []
+    # The local client keeps no optimizer settings, so the calls that change them are recorded.
+    monkeypatch.setattr(storage, "_indexing_threshold", lambda collection: 20000)
+    monkeypatch.setattr(storage, "_set_indexing_threshold", lambda collection, value: thresholds.append(value))
+
+    with storage.bulk_load():
+        assert thresholds == [0]
+        add_chunks(storage, 1)
+        assert [call[0] for call in calls] == ["upsert"]
+    assert [call[0] for call in calls] == ["upsert", "set_payload"]
+    assert thresholds == [0, 20000]
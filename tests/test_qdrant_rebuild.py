@@ -0,0 +1,77 @@
+import threading
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import CollectionStatus
+
+from shared.config import config
+from shared.services import knowledge_storage
+from shared.services.knowledge_storage import QRANT_COLLECTION_NAME, QdrantStorage
+from shared.types.Chunk import Chunk
+
+
+@pytest.fixture
+def client(monkeypatch) -> QdrantClient:
+    client = QdrantClient(":memory:")
+    monkeypatch.setattr(knowledge_storage, "QdrantClient", lambda **kwargs: client)
+    return client
+
+
+def live_collection(client: QdrantClient) -> str:
+    return next(a.collection_name for a in client.get_aliases().aliases if a.alias_name == QRANT_COLLECTION_NAME)
+
+
+def fake_status(monkeypatch, client: QdrantClient, status: CollectionStatus) -> None:
+    get_collection = client.get_collection
+
+    def with_status(**kwargs):
+        return get_collection(**kwargs).model_copy(update={"status": status})
+
+    monkeypatch.setattr(client, "get_collection", with_status)
+
+
+def add_chunk(storage: QdrantStorage, text: str) -> None:
+    storage.add_chunks([Chunk(text=text, source="doc.txt", index=0)], np.ones((1, knowledge_storage.VECTOR_SIZE)))
+    storage.flush()
+
+
+def test_commit_switches_the_alias_and_drops_the_old_collection(client):
+    storage = QdrantStorage()
+    old = live_collection(client)
+    assert storage.begin_rebuild()
+    add_chunk(storage, "new")
+    assert storage.commit_rebuild(threading.Event())
+    assert live_collection(client) != old
+    assert old not in {c.name for c in client.get_collections().collections}
+    assert storage.count() == 1
+
+
+@pytest.mark.parametrize("status", [CollectionStatus.GREY, CollectionStatus.GREEN])
+def test_optimizations_pending_or_done_are_accepted(client, monkeypatch, status):
+    storage = QdrantStorage()
+    storage.begin_rebuild()
+    fake_status(monkeypatch, client, status)
+    assert storage.commit_rebuild(threading.Event())
+
+
+def test_failed_collection_is_not_switched_to(client, monkeypatch):
+    storage = QdrantStorage()
+    old = live_collection(client)
+    storage.begin_rebuild()
+    fake_status(monkeypatch, client, CollectionStatus.RED)
+    assert not storage.commit_rebuild(threading.Event())
+    storage.abort_rebuild()
+    assert live_collection(client) == old
+
+
+def test_wait_ends_on_stop_and_on_timeout(client, monkeypatch):
+    storage = QdrantStorage()
+    storage.begin_rebuild()
+    fake_status(monkeypatch, client, CollectionStatus.YELLOW)
+    stopped = threading.Event()
+    stopped.set()
+    assert not storage.commit_rebuild(stopped)
+
+    monkeypatch.setattr(config.qdrant, "rebuild_index_timeout_seconds", 0)
+    assert storage.commit_rebuild(threading.Event())
@@ -0,0 +1,19 @@
+from llm import _parse_queries
+
+
+def test_list_markers_are_stripped():
+    content = "1. first query\n2) second query\n- third\n* fourth\n• fifth"
+    assert _parse_queries(content, 10) == ["first query", "second query", "third", "fourth", "fifth"]
+
+
+def test_leading_digits_of_a_query_are_kept():
+    assert _parse_queries("2024 revenue by region\n3D printing costs\n1. 5G rollout", 5) == [
+        "2024 revenue by region",
+        "3D printing costs",
+        "5G rollout",
+    ]
+
+
+def test_skip_and_blank_lines_are_dropped_and_the_count_is_capped():
+    assert _parse_queries("SKIP", 3) == []
+    assert _parse_queries("\n- a\n\n- b\n- c\n- d\n", 2) == ["a", "b"]
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+import query_rewriter as query_rewriter_module
+from llm import llm
+from query_rewriter import QueryRewriter
+from shared.config import config
+
+
+@pytest.fixture
+def llm_calls(monkeypatch) -> list:
+    calls = []
+
+    async def extract_search_query(message):
+        calls.append(message)
+        return None if message == "lol" else f"query for {message}"
+
+    async def extract_search_queries(history, max_queries):
+        calls.append(history)
+        return ["first sub-query", "second sub-query"]
+
+    monkeypatch.setattr(llm, "extract_search_query", extract_search_query)
+    monkeypatch.setattr(llm, "extract_search_queries", extract_search_queries)
+    return calls
+
+
+def test_small_talk_and_plain_questions_skip_the_llm(llm_calls):
+    rewriter = QueryRewriter()
+    assert asyncio.run(rewriter.rewrite("Thanks!")) is None
+    assert asyncio.run(rewriter.rewrite("What is the refund policy?")) == "What is the refund policy?"
+    assert llm_calls == []
+    assert (rewriter.stats.heuristic_skips, rewriter.stats.heuristic_passthroughs) == (1, 1)
+
+
+def test_references_to_earlier_turns_go_to_the_llm(llm_calls):
+    rewriter = QueryRewriter()
+    assert asyncio.run(rewriter.rewrite("What does it cost?")) == "query for What does it cost?"
+    assert asyncio.run(rewriter.rewrite("refund policy details")) == "query for refund policy details"
+    assert len(llm_calls) == 2
+
+
+def test_llm_results_are_cached_by_normalized_message(llm_calls):
+    rewriter = QueryRewriter()
+    asyncio.run(rewriter.rewrite("refund policy details"))
+    assert asyncio.run(rewriter.rewrite("  Refund   policy details ")) == "query for refund policy details"
+    # A SKIP answer is cached as well.
+    assert asyncio.run(rewriter.rewrite("lol")) is None
+    assert asyncio.run(rewriter.rewrite("LOL")) is None
+    assert len(llm_calls) == 2
+    assert rewriter.stats.cache_hits == 2
+
+
+def test_expired_and_evicted_entries_are_rewritten_again(llm_calls, monkeypatch):
+    monkeypatch.setattr(config.rewrite, "cache_size", 1)
+    now = [0.0]
+    monkeypatch.setattr(query_rewriter_module.time, "monotonic", lambda: now[0])
+    rewriter = QueryRewriter()
+
+    asyncio.run(rewriter.rewrite("refund policy details"))
+    asyncio.run(rewriter.rewrite("shipping times"))
+    asyncio.run(rewriter.rewrite("refund policy details"))
+    assert len(llm_calls) == 3
+
+    now[0] += config.rewrite.cache_ttl_seconds + 1
+    asyncio.run(rewriter.rewrite("refund policy details"))
+    assert len(llm_calls) == 4
+
+
+def test_follow_ups_are_rewritten_with_their_history_once(llm_calls):
+    rewriter = QueryRewriter()
+    messages = [
+        {"role": "system", "content": "Be brief."},
+        {"role": "user", "content": "What is the refund policy?"},
+        {"role": "assistant", "content": "30 days."},
+        {"role": "user", "content": "And for sale items?"},
+    ]
+    assert asyncio.run(rewriter.rewrite_conversation(messages)) == ["first sub-query", "second sub-query"]
+    assert asyncio.run(rewriter.rewrite_conversation(messages)) == ["first sub-query", "second sub-query"]
+    assert len(llm_calls) == 1
+    assert [m["role"] for m in llm_calls[0]] == ["user", "assistant", "user"]
@@ -0,0 +1,153 @@
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+
+import runner
+from manifest import IndexManifest
+from progress import RUN_ERROR_KEY
+from shared.config import config
+from shared.services import knowledge_storage
+from shared.services.embedder import embedder
+from shared.services.file_manager import file_manager
+from shared.services.knowledge_storage import QRANT_COLLECTION_NAME, QdrantStorage
+
+
+@pytest.fixture
+def client(monkeypatch) -> QdrantClient:
+    client = QdrantClient(":memory:")
+    monkeypatch.setattr(knowledge_storage, "QdrantClient", lambda **kwargs: client)
+    return client
+
+
+@pytest.fixture
+def knowledge_base(tmp_path, monkeypatch):
+    path = tmp_path / "knowledge_base"
+    path.mkdir()
+    monkeypatch.setattr(file_manager, "_knowledge_base_dir", path)
+    return path
+
+
+@pytest.fixture
+def indexer(client, knowledge_base, tmp_path, monkeypatch) -> runner.IndexerRunner:
+    monkeypatch.setattr(
+        embedder, "embed_chunks", lambda chunks: np.ones((len(chunks), knowledge_storage.VECTOR_SIZE), np.float32)
+    )
+    indexer = runner.IndexerRunner()
+    monkeypatch.setattr(indexer, "_knowledge_storage", QdrantStorage())
+    monkeypatch.setattr(indexer, "_manifest", IndexManifest(tmp_path / "manifest.json"))
+    monkeypatch.setattr(indexer, "_dropped_rebuild", None)
+    monkeypatch.setattr(config.indexer, "text_files_enabled", True)
+    return indexer
+
+
+def live_collection(client: QdrantClient) -> str:
+    return next(a.collection_name for a in client.get_aliases().aliases if a.alias_name == QRANT_COLLECTION_NAME)
+
+
+def test_incremental_run_indexes_new_files_and_removes_deleted_ones(indexer, knowledge_base):
+    (knowledge_base / "a.txt").write_text("alpha")
+    (knowledge_base / "b.txt").write_text("beta")
+    indexer._run()
+    assert indexer._manifest.sources == {"a.txt", "b.txt"}
+    generation = indexer._knowledge_storage.get_generation()
+
+    (knowledge_base / "b.txt").unlink()
+    indexer._run()
+    assert indexer._manifest.sources == {"a.txt"}
+    assert indexer._knowledge_storage.count() == 1
+    assert indexer._knowledge_storage.get_generation() == generation + 1
+
+    # Nothing changed: the generation (and with it every chat cache) stays.
+    indexer._run()
+    assert indexer._knowledge_storage.get_generation() == generation + 1
+
+
+def test_rebuild_goes_live_with_a_few_failed_files(indexer, client, knowledge_base):
+    (knowledge_base / "a.txt").write_text("alpha")
+    (knowledge_base / "b.txt").write_text("beta")
+    indexer._run()
+    live, generation = live_collection(client), indexer._knowledge_storage.get_generation()
+
+    (knowledge_base / "broken.pdf").write_text("not a pdf")
+    indexer._run(full=True)
+    assert live_collection(client) != live
+    assert indexer._knowledge_storage.get_generation() == generation + 1
+    assert indexer._manifest.sources == {"a.txt", "b.txt"}
+    assert indexer._manifest.path.name == "manifest.json"
+    assert not list(indexer._manifest.path.parent.glob("*.rebuild.json"))
+    assert set(indexer.get_progress().last_errors) == {"broken.pdf"}
+
+
+def test_dropped_rebuild_is_not_retried_until_its_failed_files_change(indexer, client, knowledge_base, monkeypatch):
+    (knowledge_base / "a.txt").write_text("alpha")
+    indexer._run()
+    live, generation = live_collection(client), indexer._knowledge_storage.get_generation()
+
+    monkeypatch.setattr(config.indexer, "rebuild_max_failed_ratio", 0.0)
+    (knowledge_base / "broken.pdf").write_text("not a pdf")
+    indexer._run(full=True)
+    assert live_collection(client) == live
+    assert indexer._knowledge_storage.get_generation() == generation
+    assert indexer._manifest.sources == {"a.txt"}
+    assert indexer._manifest.path.name == "manifest.json"
+    assert not list(indexer._manifest.path.parent.glob("*.rebuild.json"))
+
+    # Turning on hybrid retrieval rebuilds a collection without a lexical index on its own.
+    storage = indexer._knowledge_storage
+    rebuilds = []
+    begin_rebuild = storage.begin_rebuild
+    monkeypatch.setattr(config.retrieval, "hybrid_enabled", True)
+    monkeypatch.setattr(storage, "has_lexical_index", lambda: False)
+    monkeypatch.setattr(storage, "begin_rebuild", lambda: rebuilds.append(1) or begin_rebuild())
+    indexer._run()
+    assert rebuilds == []
+    assert indexer.get_progress().files_total == 0
+
+    (knowledge_base / "broken.pdf").write_text("still not a pdf")
+    indexer._run()
+    assert rebuilds == [1]
+    assert live_collection(client) == live
+
+
+def test_file_failing_part_way_leaves_no_points(indexer, knowledge_base, monkeypatch):
+    (knowledge_base / "a.txt").write_text("alpha")
+    indexer._run()
+
+    monkeypatch.setattr(config.indexer, "pipeline_batch_size", 1)
+    calls = []
+
+    def embed_chunks(chunks):
+        calls.append(len(chunks))
+        if len(calls) == 2:
+            raise RuntimeError("embedder unavailable")
+        return np.ones((len(chunks), knowledge_storage.VECTOR_SIZE), np.float32)
+
+    monkeypatch.setattr(embedder, "embed_chunks", embed_chunks)
+    (knowledge_base / "a.txt").write_text("\n\n".join(f"Paragraph {i}. " + "word " * 150 for i in range(6)))
+    indexer._run()
+    assert indexer._knowledge_storage.count() == 0
+    assert indexer._manifest.sources == set()
+    assert "a.txt" in indexer.get_progress().last_errors
+
+
+def test_connection_error_ends_the_run_as_failed(indexer, monkeypatch):
+    def unreachable():
+        raise ConnectionError("qdrant unreachable")
+
+    monkeypatch.setattr(runner, "KnowledgeStorage", unreachable)
+    monkeypatch.setattr(indexer, "_knowledge_storage", None)
+    monkeypatch.setattr(indexer, "_status", runner.IndexingStatus.RUNNING)
+    indexer._run()
+    assert indexer.get_status() == runner.IndexingStatus.FAILED
+    assert indexer.get_progress().last_errors == {RUN_ERROR_KEY: "ConnectionError: qdrant unreachable"}
+
+
+def test_text_files_are_only_indexed_when_enabled(indexer, knowledge_base, monkeypatch):
+    (knowledge_base / "notes.md").write_text("alpha")
+    monkeypatch.setattr(config.indexer, "text_files_enabled", False)
+    indexer._run()
+    assert indexer._manifest.sources == set()
+
+    monkeypatch.setattr(config.indexer, "text_files_enabled", True)
+    indexer._run()
+    assert indexer._manifest.sources == {"notes.md"}